@@ -0,0 +1,62 @@
+from fastapi import APIRouter, HTTPException, Query
+import logging
+import traceback
+
+import loop_monitor
+import memory
+
+# 로깅 설정
+logger = logging.getLogger("stock-api.admin")
+
+# 라우터 생성
+router = APIRouter(
+    prefix="/api/admin",
+    tags=["admin"],
+)
+
+
+@router.get("/memory")
+def get_memory_usage(
+    top: int = Query(5, description="캐시별로 보여줄 큰 항목 수"),
+    enforce: bool = Query(False, description="예산을 넘었으면 바로 정리"),
+):
+    """
+    이 워커 프로세스의 캐시별 메모리 사용량과 RSS를 반환합니다.
+
+    - **top**: 캐시별로 보여줄 큰 항목 수
+    - **enforce**: true 이면 집계 전에 메모리 예산(MEMORY_BUDGET_MB)을 적용합니다.
+    """
+    try:
+        eviction = memory.enforce() if enforce else None
+        result = memory.report(max(0, top))
+        result["eviction"] = eviction
+        return {"status": "success", "data": result}
+
+    except Exception as e:
+        logger.error(f"메모리 사용량 조회 중 오류 발생: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500, detail=f"메모리 사용량 조회 중 오류 발생: {str(e)}"
+        )
+
+
+@router.get("/event-loop")
+def get_event_loop_status(
+    recent: int = Query(10, description="보여줄 최근 멈춤 기록 수"),
+    stacks: bool = Query(False, description="멈춤 기록에 루프 스레드 스택 포함"),
+):
+    """
+    이 워커 프로세스의 이벤트 루프 지연 분포와 루프를 막은 호출 기록을 반환합니다.
+
+    - **recent**: 보여줄 최근 멈춤 기록 수
+    - **stacks**: true 이면 멈춘 순간의 루프 스레드 스택을 함께 반환합니다.
+    """
+    try:
+        return {"status": "success", "data": loop_monitor.status(max(0, recent), stacks)}
+
+    except Exception as e:
+        logger.error(f"이벤트 루프 상태 조회 중 오류 발생: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(
+            status_code=500, detail=f"이벤트 루프 상태 조회 중 오류 발생: {str(e)}"
+        )
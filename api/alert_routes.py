@@ -0,0 +1,160 @@
+from fastapi import APIRouter, HTTPException, Query, Path
+from pydantic import BaseModel, Field
+from typing import List, Optional
+import logging
+import traceback
+
+import alerts
+
+# 로깅 설정
+logger = logging.getLogger("stock-api.alerts")
+
+# 라우터 생성
+router = APIRouter(
+    prefix="/api/alerts",
+    tags=["alerts"],
+    responses={404: {"description": "Not found"}},
+)
+
+
+# 알림 규칙 모델 정의
+class AlertRuleRequest(BaseModel):
+    symbol: str = Field(..., description="종목 코드")
+    user_id: Optional[str] = Field(None, description="알림을 받을 사용자 식별자")
+    window_days: int = Field(365, description="전고점 계산 기간 (일), 기본값 365일")
+    kind: str = Field(
+        "drop_pct", description="조건 종류 (drop_pct: 전고점 대비 하락률 %, price: 현재가)"
+    )
+    direction: str = Field(
+        "above", description="발동 방향 (above: 값이 기준 이상, below: 값이 기준 이하)"
+    )
+    threshold: float = Field(..., description="기준값 (하락률 % 또는 가격)")
+    hysteresis: Optional[float] = Field(
+        None, description="발동 후 다시 무장되기 위해 값이 기준에서 되돌아와야 하는 간격"
+    )
+
+
+class AlertRuleBulkRequest(BaseModel):
+    rules: List[AlertRuleRequest] = Field(..., description="등록할 알림 규칙 목록")
+
+
+def _validate_rule(rule: AlertRuleRequest) -> dict:
+    """요청 규칙 검증 후 저장 형태로 변환"""
+    if rule.kind not in alerts.KINDS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 조건 종류입니다: {rule.kind} (가능: {', '.join(alerts.KINDS)})",
+        )
+    if rule.direction not in alerts.DIRECTIONS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 발동 방향입니다: {rule.direction} (가능: {', '.join(alerts.DIRECTIONS)})",
+        )
+    if rule.window_days <= 0:
+        raise HTTPException(status_code=400, detail="전고점 계산 기간은 1일 이상이어야 합니다.")
+    if rule.hysteresis is not None and rule.hysteresis < 0:
+        raise HTTPException(status_code=400, detail="hysteresis는 0 이상이어야 합니다.")
+
+    hysteresis = rule.hysteresis
+    if hysteresis is None:
+        hysteresis = alerts.default_hysteresis(rule.kind, rule.threshold)
+
+    return {
+        "user_id": rule.user_id,
+        "symbol": rule.symbol.strip(),
+        "window_days": rule.window_days,
+        "kind": rule.kind,
+        "direction": rule.direction,
+        "threshold": rule.threshold,
+        "hysteresis": hysteresis,
+    }
+
+
+# 알림 규칙 등록 엔드포인트
+@router.post("/rules")
+async def create_alert_rule(request: AlertRuleRequest):
+    """
+    가격 알림 규칙을 등록합니다.
+
+    - **kind=drop_pct**: window_days 기간 전고점 대비 하락률(%)이 기준을 넘으면 발동
+    - **kind=price**: 현재가가 기준가 이상(above)/이하(below)가 되면 발동
+
+    발동된 규칙은 값이 기준에서 hysteresis 만큼 되돌아온 뒤에야 다시 발동합니다.
+    """
+    try:
+        rule = _validate_rule(request)
+        rule_id = alerts.store.add_rules([rule])[0]
+        logger.info(f"알림 규칙 등록: id={rule_id}, {rule}")
+        return {"status": "success", "data": {"id": rule_id, **rule}}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_msg = f"알림 규칙 등록 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=f"알림 규칙 등록 중 오류 발생: {str(e)}")
+
+
+# 알림 규칙 일괄 등록 엔드포인트
+@router.post("/rules/bulk")
+async def create_alert_rules(request: AlertRuleBulkRequest):
+    """여러 가격 알림 규칙을 한 번에 등록합니다."""
+    try:
+        rules = [_validate_rule(rule) for rule in request.rules]
+        ids = alerts.store.add_rules(rules)
+        logger.info(f"알림 규칙 일괄 등록: {len(ids)}개")
+        return {"status": "success", "data": {"ids": ids, "count": len(ids)}}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        error_msg = f"알림 규칙 일괄 등록 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=f"알림 규칙 일괄 등록 중 오류 발생: {str(e)}")
+
+
+# 알림 규칙 목록 엔드포인트
+@router.get("/rules")
+async def list_alert_rules(
+    user_id: Optional[str] = Query(None, description="사용자 식별자로 필터링"),
+    symbol: Optional[str] = Query(None, description="종목 코드로 필터링"),
+):
+    """등록된 가격 알림 규칙과 마지막 평가 상태를 반환합니다."""
+    try:
+        rules = alerts.store.list_rules(user_id=user_id, symbol=symbol)
+        for rule in rules:
+            rule["armed"] = bool(rule["armed"])
+        return {"status": "success", "data": rules, "count": len(rules)}
+
+    except Exception as e:
+        error_msg = f"알림 규칙 조회 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=f"알림 규칙 조회 중 오류 발생: {str(e)}")
+
+
+# 알림 규칙 삭제 엔드포인트
+@router.delete("/rules/{rule_id}")
+async def delete_alert_rule(rule_id: int = Path(..., description="알림 규칙 id")):
+    """가격 알림 규칙을 삭제합니다."""
+    if not alerts.store.delete_rule(rule_id):
+        raise HTTPException(status_code=404, detail=f"알림 규칙 {rule_id}을(를) 찾을 수 없습니다.")
+    return {"status": "success", "data": {"id": rule_id}}
+
+
+# 알림 일괄 평가 엔드포인트 (시세 조회가 많아 스레드 풀에서 실행되도록 동기 함수로 정의)
+@router.post("/evaluate")
+def evaluate_alert_rules():
+    """
+    등록된 모든 알림 규칙을 평가하고 이번에 발동된 알림 목록을 반환합니다.
+
+    규칙은 종목별로 묶여 종목당 시세를 한 번만 조회합니다.
+    주기적으로(예: 장 마감 후 또는 수 분 간격) 호출하는 것을 전제로 합니다.
+    """
+    try:
+        result = alerts.evaluate_rules(alerts.store)
+        return {"status": "success", "data": result}
+
+    except Exception as e:
+        error_msg = f"알림 평가 중 오류 발생: {str(e)}\n{traceback.format_exc()}"
+        logger.error(error_msg)
+        raise HTTPException(status_code=500, detail=f"알림 평가 중 오류 발생: {str(e)}")
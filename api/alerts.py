@@ -0,0 +1,313 @@
+"""
+가격 알림 규칙 저장소와 일괄 평가 엔진
+
+- 규칙은 SQLite(ALERTS_DB)에 저장하므로 여러 워커가 함께 사용할 수 있습니다.
+- 평가는 규칙을 종목별로 묶어 시세를 한 번만 불러오고,
+  모든 기간의 전고점을 역방향 누적 최대값으로 한 번에 계산합니다.
+- 발동된 규칙은 값이 기준에서 hysteresis 만큼 되돌아올 때까지 다시 발동하지 않습니다.
+"""
+import logging
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+import market_data
+from resilience import BATCH, priority
+
+logger = logging.getLogger("stock-api.alerts")
+
+KINDS = ["drop_pct", "price"]
+DIRECTIONS = ["above", "below"]
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_rules (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT,
+    symbol TEXT NOT NULL,
+    window_days INTEGER NOT NULL,
+    kind TEXT NOT NULL,
+    direction TEXT NOT NULL,
+    threshold REAL NOT NULL,
+    hysteresis REAL NOT NULL,
+    armed INTEGER NOT NULL DEFAULT 1,
+    last_value REAL,
+    last_evaluated_at TEXT,
+    last_triggered_at TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_symbol ON alert_rules(symbol);
+CREATE INDEX IF NOT EXISTS idx_alert_rules_user ON alert_rules(user_id);
+"""
+
+_RULE_COLUMNS = [
+    "id",
+    "user_id",
+    "symbol",
+    "window_days",
+    "kind",
+    "direction",
+    "threshold",
+    "hysteresis",
+    "armed",
+    "last_value",
+    "last_evaluated_at",
+    "last_triggered_at",
+    "created_at",
+]
+
+
+def default_hysteresis(kind: str, threshold: float) -> float:
+    """규칙 종류별 기본 재무장 간격 (하락률은 %p, 가격은 기준가의 %)"""
+    if kind == "drop_pct":
+        return config.ALERT_DROP_HYSTERESIS
+    return abs(threshold) * config.ALERT_PRICE_HYSTERESIS_PCT / 100.0
+
+
+# ======== 규칙 저장소 ========
+class AlertStore:
+    """SQLite 기반 알림 규칙 저장소"""
+
+    def __init__(self, path: str):
+        self.path = path
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def add_rules(self, rules: List[Dict]) -> List[int]:
+        """규칙 등록 후 id 목록 반환"""
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ids = []
+        with self._connect() as conn:
+            for rule in rules:
+                cursor = conn.execute(
+                    "INSERT INTO alert_rules (user_id, symbol, window_days, kind, direction, "
+                    "threshold, hysteresis, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        rule.get("user_id"),
+                        rule["symbol"],
+                        rule["window_days"],
+                        rule["kind"],
+                        rule["direction"],
+                        rule["threshold"],
+                        rule["hysteresis"],
+                        now,
+                    ),
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    def list_rules(self, user_id: Optional[str] = None, symbol: Optional[str] = None) -> List[Dict]:
+        query = f"SELECT {', '.join(_RULE_COLUMNS)} FROM alert_rules"
+        conditions, params = [], []
+        if user_id is not None:
+            conditions.append("user_id = ?")
+            params.append(user_id)
+        if symbol is not None:
+            conditions.append("symbol = ?")
+            params.append(symbol)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY id"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+        return [dict(zip(_RULE_COLUMNS, row)) for row in rows]
+
+    def delete_rule(self, rule_id: int) -> bool:
+        with self._connect() as conn:
+            cursor = conn.execute("DELETE FROM alert_rules WHERE id = ?", (rule_id,))
+            return cursor.rowcount > 0
+
+    def load_frame(self) -> pd.DataFrame:
+        """평가용으로 전체 규칙을 컬럼 배열 형태로 로드"""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, user_id, symbol, window_days, kind, direction, threshold, "
+                "hysteresis, armed FROM alert_rules"
+            ).fetchall()
+        return pd.DataFrame(
+            rows,
+            columns=[
+                "id",
+                "user_id",
+                "symbol",
+                "window_days",
+                "kind",
+                "direction",
+                "threshold",
+                "hysteresis",
+                "armed",
+            ],
+        )
+
+    def save_state(self, ids, armed, values, evaluated_at: str, triggered_ids) -> None:
+        """평가 결과(무장 상태, 마지막 값, 발동 시각) 저장"""
+        with self._connect() as conn:
+            conn.executemany(
+                "UPDATE alert_rules SET armed = ?, last_value = ?, last_evaluated_at = ? WHERE id = ?",
+                zip(
+                    armed.astype(int).tolist(),
+                    values.tolist(),
+                    [evaluated_at] * len(ids),
+                    ids.tolist(),
+                ),
+            )
+            conn.executemany(
+                "UPDATE alert_rules SET last_triggered_at = ? WHERE id = ?",
+                [(evaluated_at, int(rule_id)) for rule_id in triggered_ids],
+            )
+
+
+# ======== 평가 엔진 ========
+def _suffix_peaks(highs: np.ndarray):
+    """각 위치부터 끝까지의 최고가와 그 위치 (같으면 앞쪽)"""
+    reversed_highs = np.where(np.isnan(highs), -np.inf, highs)[::-1]
+    running_max = np.maximum.accumulate(reversed_highs)
+    positions = np.arange(len(reversed_highs))
+    latest = np.maximum.accumulate(np.where(reversed_highs >= running_max, positions, 0))
+    return running_max[::-1], (len(highs) - 1 - latest)[::-1]
+
+
+def evaluate_rules(store: "AlertStore") -> Dict:
+    """
+    전체 규칙 일괄 평가
+
+    종목별로 시세를 한 번만 불러와 모든 규칙의 기간별 전고점을 계산한 뒤,
+    조건과 무장 상태를 규칙 배열 전체에 대해 한 번에 갱신합니다.
+    """
+    started = time.monotonic()
+
+    # 여러 워커가 동시에 평가해 같은 알림이 두 번 발동하지 않도록 잠금 (시세 조회는 일괄 우선순위)
+    with priority(BATCH), market_data.cache.exclusive("alerts", "evaluate"):
+        rules = store.load_frame()
+        count = len(rules)
+        if count == 0:
+            return {"evaluated": 0, "triggered": [], "symbols": 0, "skipped_symbols": []}
+
+        today = pd.Timestamp(datetime.now().date())
+        window_days = rules["window_days"].to_numpy(dtype=np.int64)
+        window_starts = (today - pd.to_timedelta(window_days, unit="D")).values
+
+        peaks = np.full(count, np.nan)
+        peak_dates = np.full(count, np.datetime64("NaT"), dtype="datetime64[ns]")
+        closes = np.full(count, np.nan)
+        skipped = []
+
+        # 종목별로 규칙 묶기
+        symbol_codes, symbols = pd.factorize(rules["symbol"])
+        order = np.argsort(symbol_codes, kind="stable")
+        bounds = np.searchsorted(symbol_codes[order], np.arange(len(symbols) + 1))
+
+        for i, symbol in enumerate(symbols):
+            rows = order[bounds[i] : bounds[i + 1]]
+            start = (today - timedelta(days=int(window_days[rows].max()))).strftime("%Y-%m-%d")
+            try:
+                df = market_data.get_price_history(symbol, start)
+            except Exception as e:
+                logger.warning(f"알림 평가 중 심볼 {symbol} 시세 조회 실패: {str(e)}")
+                skipped.append(symbol)
+                continue
+            if df.empty:
+                skipped.append(symbol)
+                continue
+
+            dates = df.index.values
+            suffix_max, suffix_arg = _suffix_peaks(df["High"].to_numpy(dtype=np.float64))
+            lo = np.minimum(np.searchsorted(dates, window_starts[rows], "left"), len(dates) - 1)
+
+            peaks[rows] = suffix_max[lo]
+            peak_dates[rows] = dates[suffix_arg[lo]]
+            closes[rows] = float(df["Close"].iloc[-1])
+
+        # 규칙 배열 전체에 대한 조건 평가
+        evaluated = ~np.isnan(closes) & np.isfinite(peaks) & (peaks > 0)
+        is_drop = (rules["kind"] == "drop_pct").to_numpy()
+        is_above = (rules["direction"] == "above").to_numpy()
+        threshold = rules["threshold"].to_numpy(dtype=np.float64)
+        hysteresis = rules["hysteresis"].to_numpy(dtype=np.float64)
+        armed = rules["armed"].to_numpy().astype(bool)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            drop_pct = (peaks - closes) / peaks * 100.0
+        values = np.where(is_drop, drop_pct, closes)
+
+        met = np.where(is_above, values >= threshold, values <= threshold) & evaluated
+        rearm = np.where(is_above, values < threshold - hysteresis, values > threshold + hysteresis)
+
+        fired = armed & met
+        new_armed = np.where(evaluated, (armed & ~met) | (~armed & rearm), armed)
+
+        evaluated_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        ids = rules["id"].to_numpy()
+        store.save_state(
+            ids[evaluated],
+            new_armed[evaluated],
+            values[evaluated],
+            evaluated_at,
+            ids[fired],
+        )
+
+    fired_rows = np.flatnonzero(fired)
+    fired_rules = rules.iloc[fired_rows]
+    peak_date_strings = pd.DatetimeIndex(peak_dates[fired_rows]).strftime("%Y-%m-%d")
+    triggered = [
+        {
+            "rule_id": int(rule_id),
+            "user_id": user_id,
+            "symbol": symbol,
+            "kind": kind,
+            "direction": direction,
+            "threshold": rule_threshold,
+            "value": round(value, 4),
+            "current_price": close,
+            "peak_price": peak,
+            "peak_date": peak_date,
+            "window_days": window,
+            "triggered_at": evaluated_at,
+        }
+        for rule_id, user_id, symbol, kind, direction, rule_threshold, value, close, peak, peak_date, window in zip(
+            fired_rules["id"].tolist(),
+            fired_rules["user_id"].tolist(),
+            fired_rules["symbol"].tolist(),
+            fired_rules["kind"].tolist(),
+            fired_rules["direction"].tolist(),
+            threshold[fired_rows].tolist(),
+            values[fired_rows].tolist(),
+            closes[fired_rows].tolist(),
+            peaks[fired_rows].tolist(),
+            peak_date_strings.tolist(),
+            window_days[fired_rows].tolist(),
+        )
+    ]
+
+    elapsed_ms = (time.monotonic() - started) * 1000
+    logger.info(
+        f"알림 평가 완료: 규칙 {count}개, 종목 {len(symbols)}개, 발동 {len(triggered)}개, {elapsed_ms:.0f}ms"
+    )
+    return {
+        "evaluated": int(evaluated.sum()),
+        "triggered": triggered,
+        "symbols": len(symbols),
+        "skipped_symbols": skipped,
+        "elapsed_ms": round(elapsed_ms, 1),
+    }
+
+
+store = AlertStore(config.ALERTS_DB)
@@ -1,12 +1,36 @@
 from fastapi import FastAPI, HTTPException, Query, Path
-import FinanceDataReader as fdr
+from fastapi.responses import JSONResponse
 from pydantic import BaseModel
 from typing import List, Optional, Dict, Any
 from datetime import datetime, timedelta
+import asyncio
+import heapq
 import logging
 import re
 
+import config
+import ingest
+import loop_monitor
+import market_data
+import memory
+import popularity
+import tracing
+from autocomplete import get_prefix_index
+from fuzzy_search import get_fuzzy_index
+from resilience import (
+    DeadlineExceeded,
+    SymbolNotFound,
+    UpstreamUnavailable,
+    breaker_status,
+    deadline,
+    gather_within_deadline,
+    limiter_status,
+    request_budget,
+)
+from admin_routes import router as admin_router
+from alert_routes import router as alert_router
 from backtest_routes import router as backtest_router
+from quote_routes import router as quote_router
 
 # 로깅 설정
 logging.basicConfig(
@@ -15,13 +39,38 @@ logging.basicConfig(
 )
 logger = logging.getLogger("stock-api")
 
+class TracedJSONResponse(JSONResponse):
+    """JSON 직렬화 구간을 요청 trace 에 기록하는 응답"""
+
+    def render(self, content) -> bytes:
+        with tracing.span("serialize.json") as current:
+            body = super().render(content)
+            current.set("bytes", len(body))
+            return body
+
+
 app = FastAPI(
     title="Stock Data API",
     description="국내 및 해외 주식, ETF의 데이터를 제공하는 API",
     version="1.0.0",
+    default_response_class=TracedJSONResponse,
 )
+app.add_middleware(tracing.TracingMiddleware)
 
 app.include_router(backtest_router)
+app.include_router(alert_router)
+app.include_router(admin_router)
+app.include_router(quote_router)
+
+
+@app.on_event("startup")
+async def start_snapshot_refresh():
+    """워커 간 공유 스냅샷 갱신, 예약 수집, 메모리 예산 확인 스레드와 이벤트 루프 감시 시작 (쓰기 담당은 한 워커만 선출됨)"""
+    market_data.start_background_refresh()
+    ingest.start_scheduled_ingestion()
+    memory.start_memory_monitor()
+    loop_monitor.start_loop_monitor()
+
 
 # ======== 모델 정의 ========
 class StockSymbol(BaseModel):
@@ -34,11 +83,40 @@ class StocksListResponse(BaseModel):
     market: str
     stocks: List[StockSymbol]
     count: int
+    version: int
+
+# 종목 목록 변경분을 위한 모델 정의
+class ListingChange(BaseModel):
+    symbol: str
+    name: str
+    previous_name: Optional[str] = None
+
+class ListingChangesResponse(BaseModel):
+    market: str
+    version: int
+    since: int
+    full_resync: bool
+    added: List[ListingChange]
+    removed: List[ListingChange]
+    renamed: List[ListingChange]
+
+class SearchResult(StockSymbol):
+    distance: Optional[int] = None
 
 class SearchResponse(BaseModel):
+    query: str
+    results: List[SearchResult]
+    count: int
+    fuzzy: bool = False
+    partial: bool = False
+    skipped_markets: List[str] = []
+
+class AutocompleteResponse(BaseModel):
     query: str
     results: List[StockSymbol]
     count: int
+    partial: bool = False
+    skipped_markets: List[str] = []
 
 class StockData(BaseModel):
     symbol: str
@@ -75,48 +153,80 @@ def get_market_code(market: str) -> str:
 def get_stock_name(symbol: str, market: str) -> Optional[str]:
     """심볼에 해당하는 주식 이름 조회"""
     try:
-        if market in ["KOSPI", "KOSDAQ"]:
-            # 한국 주식
-            listings = fdr.StockListing(market)
-            name_col = next((col for col in ["Name", "Name(KOR)", "korean_name", "종목명"] if col in listings.columns), None)
-            code_col = next((col for col in ["Symbol", "Code", "code", "symbol", "티커"] if col in listings.columns), None)
-            
-            if name_col and code_col:
-                name_data = listings[listings[code_col] == symbol]
-                if not name_data.empty:
-                    return name_data.iloc[0][name_col]
-        elif market == "ETF":
-            # ETF
-            listings = fdr.StockListing("ETF")
-            name_col = next((col for col in ["Name", "종목명"] if col in listings.columns), None)
-            code_col = next((col for col in ["Symbol", "Code", "code", "symbol", "티커"] if col in listings.columns), None)
-            
-            if name_col and code_col:
-                name_data = listings[listings[code_col] == symbol]
-                if not name_data.empty:
-                    return name_data.iloc[0][name_col]
-        elif market in ["NASDAQ", "NYSE", "DOW"]:
-            # 미국 주식
-            listings = fdr.StockListing(market)
-            name_data = listings[listings['Symbol'] == symbol]
-            if not name_data.empty:
-                return name_data.iloc[0]['Name']
+        record = market_data.get_symbol_table(market).find(symbol)
+        if record is not None:
+            return record.name
     except Exception as e:
         logger.warning(f"종목명 조회 실패: {str(e)}")
-    
+
     return None
 
+def _collect(found: Dict[str, Any], markets: List[str], what: str) -> List[Any]:
+    """시장 순서대로 결과를 모음 (실패한 시장은 로그만 남기고 건너뜀)"""
+    collected = []
+    for market_order, market_name in enumerate(markets):
+        value = found.get(market_name)
+        if isinstance(value, Exception):
+            logger.error(f"시장 {market_name} {what} 중 오류 발생: {str(value)}")
+        elif value is not None:
+            collected.extend((market_order, item) for item in value)
+    return collected
+
+def _fuzzy_lookup(market: str, query: str):
+    table = market_data.get_symbol_table(market)
+    return [(row, distance, table) for row, distance in get_fuzzy_index(table).lookup(query).items()]
+
+async def fuzzy_search_markets(query: str, markets: List[str], limit: int):
+    """여러 시장에서 오타 허용 검색 후 편집 거리, 인기도 순으로 정렬 (결과, 시간 예산 안에 끝나지 못한 시장)"""
+    found, skipped = await gather_within_deadline([(m, _fuzzy_lookup, (m, query)) for m in markets])
+    candidates = [
+        (distance, market_order, row, table)
+        for market_order, (row, distance, table) in _collect(found, markets, "오타 허용 검색")
+    ]
+
+    ranked = heapq.nsmallest(
+        limit,
+        candidates,
+        key=lambda c: (c[0], -popularity.scores.score(c[3].symbols[c[2]]), c[1], c[2]),
+    )
+
+    result = []
+    for distance, _, row, table in ranked:
+        item = table.record(row).to_dict()
+        item["distance"] = distance
+        result.append(item)
+    return result, skipped
+
+def _search_market(market: str, query: str, limit: int) -> List[Dict[str, str]]:
+    return [record.to_dict() for record in market_data.get_symbol_table(market).search(query, limit)]
+
+def _complete_market(market: str, query: str, limit: int):
+    table = market_data.get_symbol_table(market)
+    return [(weight, row, table) for weight, row in get_prefix_index(table).complete(query, limit)]
+
+def _partial(skipped: List[str]) -> Dict[str, Any]:
+    if skipped:
+        logger.warning(f"시간 예산 초과로 건너뛴 시장: {', '.join(skipped)}")
+    return {"partial": bool(skipped), "skipped_markets": skipped}
+
 # ======== API 엔드포인트 ========
 @app.get("/")
 async def root():
     """서버 상태 확인 API"""
     return {"status": "online", "message": "주식 데이터 API 서버가 정상적으로 작동 중입니다."}
 
+@app.get("/api/upstream-status")
+async def upstream_status():
+    """이 워커의 업스트림 소스별 서킷 상태와 호출 제한 대기열/대기 시간 지표"""
+    return {"breakers": breaker_status(), "limiters": limiter_status()}
+
 @app.get("/api/search", response_model=SearchResponse)
 async def search_stocks(
     query: str = Query(..., description="검색할 주식 이름이나 심볼"),
     markets: Optional[str] = Query(None, description="검색할 시장 (쉼표로 구분, 예: KOSPI,NASDAQ,ETF/KR)"),
-    limit: int = Query(30, description="최대 결과 수")
+    limit: int = Query(30, description="최대 결과 수"),
+    mode: str = Query("auto", description="검색 방식 (exact: 부분 일치, fuzzy: 오타 허용, auto: 결과가 없으면 오타 허용)"),
+    timeout: Optional[float] = Query(None, gt=0, description="시간 예산 (초), 기본값 REQUEST_DEADLINE_SECONDS"),
 ):
     """
     주식 이름이나 심볼로 검색하여 관련 종목 목록을 반환합니다.
@@ -124,11 +234,15 @@ async def search_stocks(
     - **query**: 검색어 (주식 이름 또는 심볼의 일부)
     - **markets**: 검색할 시장 (쉼표로 구분, 지정하지 않으면 모든 시장에서 검색)
     - **limit**: 반환할 최대 결과 수
+    - **mode**: 검색 방식 (exact, fuzzy, auto)
+    - **timeout**: 시간 예산 (초)
     
     한국 주식, 미국 주식, ETF 모두 검색 가능합니다.
+    오타 허용 검색 결과는 편집 거리, 인기도 순으로 정렬됩니다.
+    시간 예산 안에 종목 목록을 불러오지 못한 시장은 건너뛰고 partial, skipped_markets 로 알려줍니다.
     """
     try:
-        logger.info(f"주식 검색 요청: 검색어={query}, 시장={markets}")
+        logger.info(f"주식 검색 요청: 검색어={query}, 시장={markets}, 방식={mode}")
 
         # 검색할 시장 목록 설정
         markets_to_search = []
@@ -140,100 +254,37 @@ async def search_stocks(
             # 기본 시장 목록 (DOW 제외)
             markets_to_search = ["KOSPI", "KOSDAQ", "NASDAQ", "NYSE", "AMEX", "ETF/KR", "ETF/US"]
 
-        result = []
-
-        # 각 시장별 검색
-        for market_name in markets_to_search:
-            try:
-                # ETF 시장인 경우 별도 처리
-                if market_name in ["ETF/KR", "ETF/US"]:
-                    try:
-                        # ETF 목록 가져오기
-                        etf_df = fdr.StockListing(market_name)
-
-                        # 컬럼 확인
-                        etf_columns = etf_df.columns.tolist()
-                        logger.info(f"{market_name} 컬럼: {etf_columns}")
-
-                        # ETF 목록에서 적절한 티커와 이름 컬럼 찾기
-                        ticker_col = next((col for col in ["티커", "Symbol", "Code", "code", "symbol"] if col in etf_columns), None)
-                        name_col = next((col for col in ["종목명", "Name", "name"] if col in etf_columns), None)
-
-                        if ticker_col and name_col:
-                            # 검색어로 필터링
-                            query_lower = query.lower()
-
-                            for _, row in etf_df.iterrows():
-                                # 티커에서 검색
-                                ticker_match = False
-                                if str(row[ticker_col]).lower().find(query_lower) >= 0:
-                                    ticker_match = True
-
-                                # 이름에서 검색
-                                name_match = False
-                                if str(row[name_col]).lower().find(query_lower) >= 0:
-                                    name_match = True
-
-                                # 티커 또는 이름이 일치하면 결과에 추가
-                                if ticker_match or name_match:
-                                    item = {
-                                        "symbol": str(row[ticker_col]),
-                                        "name": str(row[name_col]),
-                                        "market": market_name
-                                    }
-                                    result.append(item)
-                    except Exception as e:
-                        logger.error(f"ETF ({market_name}) 검색 중 오류 발생: {str(e)}")
-                else:
-                    # 일반 주식 목록 가져오기
-                    df = fdr.StockListing(market_name)
-
-                    # 컬럼 이름 확인
-                    columns = df.columns.tolist()
-
-                    # 가능한 심볼과 이름 컬럼 찾기
-                    symbol_col = next((col for col in ["Symbol", "Code", "code", "symbol"] if col in columns), None)
-                    name_cols = [col for col in ["Name", "Name(KOR)", "korean_name", "name"] if col in columns]
-
-                    if not symbol_col or not name_cols:
-                        logger.warning(f"시장 {market_name}에서 적절한 컬럼을 찾을 수 없습니다. 컬럼: {columns}")
-                        continue
-
-                    # 검색어로 필터링 (대소문자 구분 없이)
-                    query_lower = query.lower()
-
-                    for _, row in df.iterrows():
-                        # 심볼에서 검색
-                        symbol_match = False
-                        if symbol_col and str(row[symbol_col]).lower().find(query_lower) >= 0:
-                            symbol_match = True
-
-                        # 이름에서 검색
-                        name_match = False
-                        for name_col in name_cols:
-                            if name_col in row.index and str(row[name_col]).lower().find(query_lower) >= 0:
-                                name_match = True
-                                break
-
-                        # 심볼 또는 이름이 일치하면 결과에 추가
-                        if symbol_match or name_match:
-                            item = {
-                                "symbol": str(row[symbol_col]),
-                                "name": str(row[name_cols[0]]),
-                                "market": market_name
-                            }
-                            result.append(item)
-            except Exception as e:
-                # 특정 시장 검색 중 오류가 발생하면 로그만 남기고 계속 진행
-                logger.error(f"시장 {market_name} 검색 중 오류 발생: {str(e)}")
-                continue
-
-        # 결과가 너무 많으면 상위 N개만 반환
-        if len(result) > limit:
-            result = result[:limit]
+        with deadline(request_budget(timeout)):
+            if mode == "fuzzy":
+                result, skipped = await fuzzy_search_markets(query, markets_to_search, limit)
+                logger.info(f"오타 허용 검색 결과: {len(result)}개 항목 찾음")
+                return {"query": query, "results": result, "count": len(result), "fuzzy": True, **_partial(skipped)}
+
+            # 각 시장별 검색 (동시에 진행하고 시장 순서대로 합침)
+            found, skipped = await gather_within_deadline(
+                [(m, _search_market, (m, query, limit)) for m in markets_to_search]
+            )
+            result = [item for _, item in _collect(found, markets_to_search, "검색")]
+
+            # 결과가 너무 많으면 상위 N개만 반환
+            if len(result) > limit:
+                result = result[:limit]
+
+            # 일치하는 종목이 없으면 오타 허용 검색으로 재시도 (종목 목록을 불러온 시장만)
+            if not result and mode == "auto":
+                searched = [m for m in markets_to_search if m not in skipped]
+                result, fuzzy_skipped = await fuzzy_search_markets(query, searched, limit)
+                logger.info(f"오타 허용 검색 결과: {len(result)}개 항목 찾음")
+                return {
+                    "query": query,
+                    "results": result,
+                    "count": len(result),
+                    "fuzzy": True,
+                    **_partial([m for m in markets_to_search if m in skipped or m in fuzzy_skipped]),
+                }
 
         logger.info(f"검색 결과: {len(result)}개 항목 찾음")
-        return {"query": query, "results": result, "count": len(result)}
+        return {"query": query, "results": result, "count": len(result), **_partial(skipped)}
 
     except Exception as e:
         import traceback
@@ -242,6 +293,175 @@ async def search_stocks(
         raise HTTPException(status_code=500, detail=f"검색 중 오류 발생: {str(e)}")
 
 
+@app.get("/api/autocomplete", response_model=AutocompleteResponse)
+async def autocomplete_stocks(
+    query: str = Query(..., description="입력 중인 검색어 (심볼, 종목명, 초성 접두사)"),
+    markets: Optional[str] = Query(None, description="검색할 시장 (쉼표로 구분, 예: KOSPI,NASDAQ,ETF/KR)"),
+    limit: int = Query(config.AUTOCOMPLETE_LIMIT, description="최대 결과 수"),
+    timeout: Optional[float] = Query(None, gt=0, description="시간 예산 (초), 기본값 REQUEST_DEADLINE_SECONDS"),
+):
+    """
+    검색창 자동완성 결과를 반환합니다.
+
+    - **query**: 입력 중인 검색어 (예: 'sam', '삼성', 'ㅅㅅㅈㅈ')
+    - **markets**: 검색할 시장 (쉼표로 구분, 지정하지 않으면 모든 시장에서 검색)
+    - **limit**: 반환할 최대 결과 수
+    - **timeout**: 시간 예산 (초)
+
+    심볼, 종목명, 종목명의 단어, 한글 초성이 검색어로 시작하는 종목을 인기도 순으로 반환합니다.
+    시간 예산 안에 종목 목록을 불러오지 못한 시장은 건너뛰고 partial, skipped_markets 로 알려줍니다.
+    """
+    try:
+        if markets:
+            markets_to_search = [get_market_code(m.strip().upper()) for m in markets.split(",")]
+        else:
+            markets_to_search = config.ALL_MARKETS
+
+        with deadline(request_budget(timeout)):
+            found, skipped = await gather_within_deadline(
+                [(m, _complete_market, (m, query, limit)) for m in markets_to_search]
+            )
+        candidates = [
+            (weight, market_order, row, table)
+            for market_order, (weight, row, table) in _collect(found, markets_to_search, "자동완성")
+        ]
+
+        ranked = heapq.nsmallest(limit, candidates, key=lambda c: (-c[0], c[1], c[2]))
+        result = [table.record(row).to_dict() for _, _, row, table in ranked]
+        return {"query": query, "results": result, "count": len(result), **_partial(skipped)}
+
+    except Exception as e:
+        import traceback
+        error_detail = str(e) + "\n" + traceback.format_exc()
+        logger.error(f"자동완성 중 오류 발생: {error_detail}")
+        raise HTTPException(status_code=500, detail=f"자동완성 중 오류 발생: {str(e)}")
+
+
+def _stock_data(symbol: str, market: Optional[str], days: int) -> Dict[str, Any]:
+    """/api/stock-data 응답 구성 (시세 조회, 전고점, 시장/종목명 확인 - 스레드에서 실행)"""
+    # 시장 코드 변환 (제공된 경우)
+    determined_market = get_market_code(market) if market else None
+
+    # 데이터 가져오기
+    end_date = datetime.now()
+    start_date = end_date - timedelta(days=days)
+
+    # DataReader는 모든 종류(일반 주식, ETF)에 동일하게 사용
+    try:
+        df = market_data.get_price_history(
+            symbol, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
+        )
+    except DeadlineExceeded as e:
+        logger.warning(f"주식 데이터 조회 시간 예산 초과: {str(e)}")
+        raise HTTPException(
+            status_code=504, detail=f"시간 예산 안에 데이터를 가져오지 못했습니다: {symbol}"
+        )
+    except UpstreamUnavailable as e:
+        logger.error(f"주식 데이터 조회 실패 (업스트림 장애): {str(e)}")
+        raise HTTPException(
+            status_code=503, detail=f"데이터 제공처 장애로 조회할 수 없습니다: {symbol}"
+        )
+    except Exception as e:
+        logger.error(f"주식 데이터 조회 실패: {str(e)}")
+        raise HTTPException(
+            status_code=404, detail=f"데이터를 찾을 수 없습니다: {symbol}"
+        )
+
+    if df.empty:
+        logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
+        raise HTTPException(
+            status_code=404, detail=f"데이터를 찾을 수 없습니다: {symbol}"
+        )
+
+    # 전고점 찾기 (구간 최고가 색인 사용, 색인이 없으면 직접 계산)
+    peak = market_data.peak_between(symbol, df.index[0], df.index[-1])
+    if peak is not None:
+        peak_value, peak_index = peak
+    else:
+        peak_value = df["High"].max()
+        peak_index = df["High"].idxmax()
+
+    # 현재 가격
+    current_price = df["Close"].iloc[-1]
+
+    # 종목 이름과 시장 정보 찾기
+    stock_name = None
+
+    # 시장 정보가 없는 경우 자동으로 찾기 시도
+    if not determined_market:
+        # 심볼 패턴에 따라 검색 순서 최적화
+        if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
+            # 숫자만 있거나 국내 종목 코드 패턴(6자리)인 경우 - 국내 시장 우선
+            potential_markets = [
+                "KOSPI",
+                "KOSDAQ",
+                "ETF/KR",
+                "NASDAQ",
+                "NYSE",
+                "AMEX",
+                "ETF/US",
+            ]
+            logger.info(f"국내 종목 코드 패턴 감지: {symbol} - 국내 시장 우선 검색")
+        elif re.match(r"^[A-Z]+$", symbol):
+            # 대문자 알파벳만 있는 경우 - 미국 시장 우선
+            potential_markets = [
+                "NASDAQ",
+                "NYSE",
+                "AMEX",
+                "ETF/US",
+                "KOSPI",
+                "KOSDAQ",
+                "ETF/KR",
+            ]
+            logger.info(f"미국 종목 코드 패턴 감지: {symbol} - 미국 시장 우선 검색")
+        else:
+            # 그 외 패턴 - 모든 시장 검색
+            potential_markets = [
+                "KOSPI",
+                "KOSDAQ",
+                "ETF/KR",
+                "NASDAQ",
+                "NYSE",
+                "AMEX",
+                "ETF/US",
+            ]
+            logger.info(f"일반 패턴 감지: {symbol} - 일반 순서로 검색")
+
+        # 각 시장에서 심볼 찾기 시도
+        record = market_data.find_symbol(symbol, potential_markets)
+        if record is not None:
+            determined_market = record.market
+            stock_name = record.name
+
+    logger.info(f"결정된 시장: {determined_market}")
+
+    # 종목 이름이 찾아지지 않았을 경우 다시 시도
+    if not stock_name and determined_market:
+        stock_name = get_stock_name(symbol, determined_market)
+
+    # 응답 데이터 구성
+    response = {
+        "symbol": symbol,
+        "name": stock_name,
+        "market": determined_market if determined_market else "UNKNOWN",
+        "current_price": float(current_price),
+        "peak_price": float(peak_value),
+        "peak_date": peak_index.strftime("%Y-%m-%d"),
+        "days_analyzed": days,
+        "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        # 업스트림 장애 등으로 마지막 캐시 시세를 반환한 경우 True
+        "stale": bool(df.attrs.get("stale", False)),
+        # 차트용 시계열 데이터 추가
+        "chart_data": {
+            "dates": df.index.strftime("%Y-%m-%d").tolist(),
+            "prices": {"close": [round(float(x), 2) for x in df["Close"].tolist()]},
+        },
+    }
+
+    logger.info(f"{symbol} 데이터 반환: 현재가={current_price}, 고점={peak_value}")
+    return response
+
+
 @app.get("/api/stock-data")
 async def get_stock_data(
     symbol: str = Query(..., description="주식 심볼"),
@@ -249,6 +469,7 @@ async def get_stock_data(
         None, description="시장 (KOSPI, KOSDAQ, NASDAQ, NYSE, ETF/KR 등) - 선택사항"
     ),
     days: int = Query(365, description="분석할 기간(일)"),
+    timeout: Optional[float] = Query(None, gt=0, description="시간 예산 (초), 기본값 REQUEST_DEADLINE_SECONDS"),
 ):
     """
     특정 종목의 데이터와 전고점 정보를 반환합니다.
@@ -256,214 +477,20 @@ async def get_stock_data(
     - **symbol**: 종목 코드 (예: '005930', 'AAPL')
     - **market**: 시장 (KOSPI, KOSDAQ, NASDAQ, NYSE, ETF/KR 등) - 선택사항
     - **days**: 분석할 기간(일) (기본: 365일)
+    - **timeout**: 시간 예산 (초)
 
     전고점, 현재가, 날짜 등의 데이터를 반환합니다.
     시장 정보를 제공하지 않으면 자동으로 심볼에 맞는 시장을 찾습니다.
+    시간 예산 안에 시세를 가져오지 못하면 504 로 응답합니다.
     """
     try:
         logger.info(f"주식 데이터 요청: symbol={symbol}, market={market}, days={days}")
 
-        # 시장 코드 변환 (제공된 경우)
-        determined_market = get_market_code(market) if market else None
-
-        # 데이터 가져오기
-        end_date = datetime.now()
-        start_date = end_date - timedelta(days=days)
+        # 업스트림 호출과 스냅샷/색인 조회는 이벤트 루프를 막지 않도록 스레드에서 실행
+        with deadline(request_budget(timeout)):
+            response = await asyncio.to_thread(_stock_data, symbol, market, days)
 
-        # DataReader는 모든 종류(일반 주식, ETF)에 동일하게 사용
-        try:
-            df = fdr.DataReader(
-                symbol, start_date.strftime("%Y-%m-%d"), end_date.strftime("%Y-%m-%d")
-            )
-        except Exception as e:
-            logger.error(f"주식 데이터 조회 실패: {str(e)}")
-            raise HTTPException(
-                status_code=404, detail=f"데이터를 찾을 수 없습니다: {symbol}"
-            )
-
-        if df.empty:
-            logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
-            raise HTTPException(
-                status_code=404, detail=f"데이터를 찾을 수 없습니다: {symbol}"
-            )
-
-        # 전고점 찾기
-        peak_value = df["High"].max()
-        peak_index = df["High"].idxmax()
-
-        # 현재 가격
-        current_price = df["Close"].iloc[-1]
-
-        # 종목 이름과 시장 정보 찾기
-        stock_name = None
-
-        # 시장 정보가 없는 경우 자동으로 찾기 시도
-        if not determined_market:
-            # 심볼 패턴에 따라 검색 순서 최적화
-            if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
-                # 숫자만 있거나 국내 종목 코드 패턴(6자리)인 경우 - 국내 시장 우선
-                potential_markets = [
-                    "KOSPI",
-                    "KOSDAQ",
-                    "ETF/KR",
-                    "NASDAQ",
-                    "NYSE",
-                    "AMEX",
-                    "ETF/US",
-                ]
-                logger.info(f"국내 종목 코드 패턴 감지: {symbol} - 국내 시장 우선 검색")
-            elif re.match(r"^[A-Z]+$", symbol):
-                # 대문자 알파벳만 있는 경우 - 미국 시장 우선
-                potential_markets = [
-                    "NASDAQ",
-                    "NYSE",
-                    "AMEX",
-                    "ETF/US",
-                    "KOSPI",
-                    "KOSDAQ",
-                    "ETF/KR",
-                ]
-                logger.info(f"미국 종목 코드 패턴 감지: {symbol} - 미국 시장 우선 검색")
-            else:
-                # 그 외 패턴 - 모든 시장 검색
-                potential_markets = [
-                    "KOSPI",
-                    "KOSDAQ",
-                    "ETF/KR",
-                    "NASDAQ",
-                    "NYSE",
-                    "AMEX",
-                    "ETF/US",
-                ]
-                logger.info(f"일반 패턴 감지: {symbol} - 일반 순서로 검색")
-
-            # 각 시장에서 심볼 찾기 시도
-            for potential_market in potential_markets:
-                try:
-                    market_list = fdr.StockListing(potential_market)
-
-                    # 시장 목록에서 적절한 심볼 컬럼 찾기
-                    market_columns = market_list.columns.tolist()
-                    symbol_col = next(
-                        (
-                            col
-                            for col in ["Symbol", "Code", "code", "symbol", "티커"]
-                            if col in market_columns
-                        ),
-                        None,
-                    )
-
-                    if symbol_col:
-                        # 심볼로 종목 찾기
-                        matching = market_list[market_list[symbol_col] == symbol]
-                        if not matching.empty:
-                            determined_market = potential_market
-                            # 종목명 컬럼 찾기
-                            name_col = next(
-                                (
-                                    col
-                                    for col in [
-                                        "Name",
-                                        "Name(KOR)",
-                                        "korean_name",
-                                        "name",
-                                        "종목명",
-                                    ]
-                                    if col in market_columns
-                                ),
-                                None,
-                            )
-                            if name_col:
-                                stock_name = matching.iloc[0][name_col]
-                            break
-                except Exception as e:
-                    logger.warning(
-                        f"{potential_market} 시장에서 심볼 검색 중 오류: {str(e)}"
-                    )
-                    continue
-
-        logger.info(f"결정된 시장: {determined_market}")
-
-        # 종목 이름이 찾아지지 않았을 경우 다시 시도
-        if not stock_name and determined_market:
-            try:
-                if determined_market in ["ETF/KR", "ETF/US"]:
-                    # ETF 목록에서 종목명 찾기
-                    etf_list = fdr.StockListing(determined_market)
-
-                    # ETF 목록에서 적절한 티커와 이름 컬럼 찾기
-                    etf_columns = etf_list.columns.tolist()
-                    ticker_col = next(
-                        (
-                            col
-                            for col in ["티커", "Symbol", "Code", "code", "symbol"]
-                            if col in etf_columns
-                        ),
-                        None,
-                    )
-                    name_col = next(
-                        (
-                            col
-                            for col in ["종목명", "Name", "name"]
-                            if col in etf_columns
-                        ),
-                        None,
-                    )
-
-                    if ticker_col and name_col:
-                        # 티커로 ETF 찾기
-                        matching_etf = etf_list[etf_list[ticker_col] == symbol]
-                        if not matching_etf.empty:
-                            stock_name = matching_etf.iloc[0][name_col]
-                else:
-                    # 일반 주식 목록에서 종목명 찾기
-                    stock_list = fdr.StockListing(determined_market)
-
-                    # 주식 목록에서 적절한 심볼과 이름 컬럼 찾기
-                    stock_columns = stock_list.columns.tolist()
-                    symbol_col = next(
-                        (
-                            col
-                            for col in ["Symbol", "Code", "code", "symbol"]
-                            if col in stock_columns
-                        ),
-                        None,
-                    )
-                    name_col = next(
-                        (
-                            col
-                            for col in ["Name", "Name(KOR)", "korean_name", "name"]
-                            if col in stock_columns
-                        ),
-                        None,
-                    )
-
-                    if symbol_col and name_col:
-                        # 심볼로 주식 찾기
-                        matching_stock = stock_list[stock_list[symbol_col] == symbol]
-                        if not matching_stock.empty:
-                            stock_name = matching_stock.iloc[0][name_col]
-            except Exception as e:
-                logger.warning(f"종목명 조회 실패: {str(e)}")
-
-        # 응답 데이터 구성
-        response = {
-            "symbol": symbol,
-            "name": stock_name,
-            "market": determined_market if determined_market else "UNKNOWN",
-            "current_price": float(current_price),
-            "peak_price": float(peak_value),
-            "peak_date": peak_index.strftime("%Y-%m-%d"),
-            "days_analyzed": days,
-            "last_update": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-            # 차트용 시계열 데이터 추가
-            "chart_data": {
-                "dates": df.index.strftime("%Y-%m-%d").tolist(),
-                "prices": {"close": [round(float(x), 2) for x in df["Close"].tolist()]},
-            },
-        }
-
-        logger.info(f"{symbol} 데이터 반환: 현재가={current_price}, 고점={peak_value}")
+        popularity.scores.record(symbol)
         return response
 
     except HTTPException:
@@ -479,8 +506,9 @@ async def get_stock_data(
         )
 
 
+# 종목 목록 조회(get_symbol_table)가 이벤트 루프를 막지 않도록 동기 함수로 두어 스레드 풀에서 실행
 @app.get("/api/market-symbols/{market}", response_model=StocksListResponse)
-async def get_market_symbols(
+def get_market_symbols(
     market: str = Path(
         ..., description="시장 코드 (KOSPI, KOSDAQ, NASDAQ, NYSE, ETF/KR 등)"
     ),
@@ -503,62 +531,28 @@ async def get_market_symbols(
         standard_market = get_market_code(market)
 
         try:
-            # fdr을 통해 시장 종목 목록 가져오기
-            df = fdr.StockListing(standard_market)
+            # 시장 심볼 테이블 가져오기
+            table = market_data.get_symbol_table(standard_market)
 
-            if df.empty:
+            if len(table) == 0:
                 logger.warning(f"시장 {standard_market}에 대한 종목이 없습니다.")
                 raise HTTPException(
                     status_code=404,
                     detail=f"시장 {standard_market}에 대한 종목을 찾을 수 없습니다.",
                 )
 
-            # 컬럼 이름 확인
-            columns = df.columns.tolist()
-            logger.info(f"시장 {standard_market} 데이터 컬럼: {columns}")
-
-            # 가능한 심볼과 이름 컬럼 찾기
-            symbol_col = next(
-                (
-                    col
-                    for col in ["Symbol", "Code", "code", "symbol", "티커"]
-                    if col in columns
-                ),
-                None,
-            )
-            name_col = next(
-                (
-                    col
-                    for col in ["Name", "Name(KOR)", "korean_name", "name", "종목명"]
-                    if col in columns
-                ),
-                None,
-            )
-
-            if not symbol_col or not name_col:
-                logger.warning(
-                    f"시장 {standard_market}에서 적절한 컬럼을 찾을 수 없습니다. 컬럼: {columns}"
-                )
-                raise HTTPException(
-                    status_code=500,
-                    detail=f"시장 {standard_market}의 데이터 형식을 처리할 수 없습니다. 관리자에게 문의하세요.",
-                )
-
             # 결과 리스트 생성
-            result = []
-            for _, row in df.iterrows():
-                symbol = str(row[symbol_col])
-                name = str(row[name_col])
-
-                item = StockSymbol(symbol=symbol, name=name, market=standard_market)
-                result.append(item)
+            result = [
+                StockSymbol(symbol=record.symbol, name=record.name, market=standard_market)
+                for record in table
+            ]
 
             # 결과가 너무 많으면 상위 N개만 반환
             if limit and len(result) > limit:
                 result = result[:limit]
 
             logger.info(f"시장 {standard_market} 종목 목록: {len(result)}개 항목 찾음")
-            return {"market": standard_market, "stocks": result, "count": len(result)}
+            return {"market": standard_market, "stocks": result, "count": len(result), "version": table.version}
 
         except Exception as e:
             logger.error(
@@ -580,6 +574,50 @@ async def get_market_symbols(
             status_code=500, detail=f"종목 목록 조회 중 오류 발생: {str(e)}"
         )
 
+# 종목 목록 조회(get_symbol_table)가 이벤트 루프를 막지 않도록 동기 함수로 두어 스레드 풀에서 실행
+@app.get("/api/market-symbols/{market}/changes", response_model=ListingChangesResponse)
+def get_market_symbol_changes(
+    market: str = Path(
+        ..., description="시장 코드 (KOSPI, KOSDAQ, NASDAQ, NYSE, ETF_KR 등)"
+    ),
+    since: int = Query(
+        ..., ge=0, description="마지막으로 동기화한 종목 목록 버전 (종목 목록 응답의 version)"
+    ),
+):
+    """
+    특정 시장의 종목 목록이 since 버전 이후 바뀐 내용을 반환합니다.
+
+    - **market**: 시장 코드
+    - **since**: 마지막으로 동기화한 종목 목록 버전
+
+    신규 상장(added), 상장 폐지(removed), 종목명 변경(renamed)만 반환하며,
+    보관 기간보다 오래된 버전이면 full_resync 가 true 이므로 전체 목록을 다시 받아야 합니다.
+    """
+    try:
+        standard_market = get_market_code(market)
+        changes = market_data.get_listing_changes(standard_market, since)
+        logger.info(
+            f"시장 {standard_market} 종목 변경분 요청: since={since}, version={changes['version']}, "
+            f"상장 {len(changes['added'])}, 폐지 {len(changes['removed'])}, 이름 변경 {len(changes['renamed'])}"
+        )
+        return changes
+
+    except HTTPException:
+        raise
+    except SymbolNotFound as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except UpstreamUnavailable as e:
+        logger.warning(f"시장 종목 변경분 조회 실패 (업스트림 장애): {str(e)}")
+        raise HTTPException(status_code=503, detail="데이터 제공처 장애로 종목 목록을 확인할 수 없습니다.")
+    except Exception as e:
+        import traceback
+
+        error_detail = str(e) + "\n" + traceback.format_exc()
+        logger.error(f"시장 종목 변경분 조회 중 오류 발생: {error_detail}")
+        raise HTTPException(
+            status_code=500, detail=f"종목 변경분 조회 중 오류 발생: {str(e)}"
+        )
+
 if __name__ == "__main__":
     import uvicorn
     
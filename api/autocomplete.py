@@ -0,0 +1,197 @@
+"""
+검색창 자동완성용 접두사 색인
+
+심볼, 공백을 뺀 종목명, 종목명의 각 단어, 한글 종목명의 초성을 키로 만들어
+정렬된 배열에 보관합니다. 접두사 범위는 이진 탐색으로 찾고,
+범위 안에서 인기도 상위 k개만 골라 반환합니다.
+"""
+import bisect
+import re
+import threading
+import time
+from itertools import compress
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+import config
+import memory
+import popularity
+from listing_changes import ListingDiff, diff_tables
+from symbol_table import SymbolRecord, SymbolTable, normalize_key
+
+CHOSUNG = [
+    "ㄱ", "ㄲ", "ㄴ", "ㄷ", "ㄸ", "ㄹ", "ㅁ", "ㅂ", "ㅃ", "ㅅ",
+    "ㅆ", "ㅇ", "ㅈ", "ㅉ", "ㅊ", "ㅋ", "ㅌ", "ㅍ", "ㅎ",
+]
+
+# 같은 인기도일 때 짧은 키(더 가까운 완성)를 앞에 두기 위한 가중치
+KEY_LENGTH_PENALTY = 1e-3
+
+_WORD_SPLIT = re.compile(r"[\s\-_.,&()/'\"]+")
+_HANGUL = re.compile(r"[가-힣]")
+
+
+def chosung(text: str) -> str:
+    """한글 음절을 초성으로 변환 (한글이 아닌 글자는 그대로)"""
+    result = []
+    for ch in text:
+        code = ord(ch)
+        if 0xAC00 <= code <= 0xD7A3:
+            result.append(CHOSUNG[(code - 0xAC00) // 588])
+        else:
+            result.append(ch)
+    return "".join(result)
+
+
+def _keys(record: SymbolRecord) -> set:
+    keys = {normalize_key(record.symbol), normalize_key(record.name)}
+    for word in _WORD_SPLIT.split(record.name):
+        word = normalize_key(word)
+        if len(word) >= 2:
+            keys.add(word)
+    if _HANGUL.search(record.name):
+        keys.add(normalize_key(chosung(record.name)))
+    keys.discard("")
+    return keys
+
+
+def _entries(record: SymbolRecord) -> List[Tuple[str, float, int]]:
+    weight = popularity.scores.score(record.symbol)
+    return [(key, weight - len(key) * KEY_LENGTH_PENALTY, record.row) for key in _keys(record)]
+
+
+class PrefixIndex:
+    """한 시장 심볼 테이블에 대한 정렬 배열 접두사 색인"""
+
+    def __init__(self, table: SymbolTable, keys: List[str], weights: np.ndarray, rows: np.ndarray, built_at: float):
+        self.table = table
+        self.built_at = built_at
+        self._keys = keys
+        self._weights = weights
+        self._rows = rows
+
+    @classmethod
+    def build(cls, table: SymbolTable) -> "PrefixIndex":
+        entries = []
+        for record in table:
+            entries.extend(_entries(record))
+        entries.sort(key=lambda e: e[0])
+        return cls(
+            table,
+            [e[0] for e in entries],
+            np.array([e[1] for e in entries], dtype=np.float64),
+            np.array([e[2] for e in entries], dtype=np.int32),
+            time.monotonic(),
+        )
+
+    def updated(self, table: SymbolTable, diff: ListingDiff) -> "PrefixIndex":
+        """
+        종목 목록 변경분만 반영한 새 색인
+
+        바뀌지 않은 종목의 키와 가중치는 행 번호만 옮겨 재사용하고, 신규/이름 변경 종목의 키만 만들어
+        정렬 위치에 끼워 넣습니다. 인기도 반영 주기는 원래 색인의 생성 시각을 따릅니다.
+        """
+        rows = diff.row_map()[self._rows]
+        keep = rows >= 0
+        keys = list(compress(self._keys, keep.tolist()))
+        weights = self._weights[keep]
+        rows = rows[keep].astype(np.int32)
+
+        fresh = []
+        for row in diff.fresh_rows().tolist():
+            fresh.extend(_entries(table.record(row)))
+        fresh.sort(key=lambda e: e[0])
+
+        positions = [bisect.bisect_right(keys, e[0]) for e in fresh]
+        merged = []
+        start = 0
+        for position, entry in zip(positions, fresh):
+            merged.extend(keys[start:position])
+            merged.append(entry[0])
+            start = position
+        merged.extend(keys[start:])
+
+        return PrefixIndex(
+            table,
+            merged,
+            np.insert(weights, positions, [e[1] for e in fresh]),
+            np.insert(rows, positions, [e[2] for e in fresh]),
+            self.built_at,
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self._weights.nbytes + self._rows.nbytes + sum(len(k) for k in self._keys)
+
+    def complete(self, prefix: str, k: int) -> List[Tuple[float, int]]:
+        """접두사로 시작하는 키의 종목 중 가중치 상위 k개 (가중치, 행)"""
+        prefix = normalize_key(prefix)
+        if not prefix or k <= 0:
+            return []
+
+        lo = bisect.bisect_left(self._keys, prefix)
+        hi = bisect.bisect_left(self._keys, prefix + "\U0010ffff", lo)
+        if lo >= hi:
+            return []
+
+        weights = self._weights[lo:hi]
+        # 한 종목이 여러 키로 잡힐 수 있으므로 여유 있게 고른 뒤 중복 제거
+        take = min(len(weights), k * 4)
+        if take < len(weights):
+            picked = np.argpartition(-weights, take - 1)[:take]
+        else:
+            picked = np.arange(len(weights))
+        picked = picked[np.argsort(-weights[picked], kind="stable")]
+
+        seen = set()
+        result = []
+        for i in picked.tolist():
+            row = int(self._rows[lo + i])
+            if row in seen:
+                continue
+            seen.add(row)
+            result.append((float(weights[i]), row))
+            if len(result) >= k:
+                break
+        return result
+
+
+# 시장별 색인 (심볼 테이블이 교체되면 변경분 반영, 오래되면 다시 생성)
+_indexes: Dict[str, PrefixIndex] = {}
+_index_lock = threading.Lock()
+_usage = memory.UsageTracker()
+
+
+def get_prefix_index(table: SymbolTable) -> PrefixIndex:
+    """심볼 테이블에 대한 접두사 색인 반환"""
+    _usage.touch(table.market)
+    with _index_lock:
+        index = _indexes.get(table.market)
+        if index is not None and time.monotonic() - index.built_at < config.AUTOCOMPLETE_REBUILD_SECONDS:
+            if index.table is table:
+                return index
+            diff = diff_tables(index.table, table)
+            if diff.incremental:
+                index = index.updated(table, diff)
+                _indexes[table.market] = index
+                return index
+
+        index = PrefixIndex.build(table)
+        _indexes[table.market] = index
+        return index
+
+
+def _memory_entries() -> List[memory.Entry]:
+    with _index_lock:
+        entries = [(market, index.nbytes) for market, index in _indexes.items()]
+    return [(market, nbytes, *_usage.get(market)) for market, nbytes in entries]
+
+
+def _evict(market: str) -> None:
+    with _index_lock:
+        _indexes.pop(market, None)
+    _usage.forget(market)
+
+
+memory.register("prefix_index", _memory_entries, _evict)
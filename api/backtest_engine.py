@@ -0,0 +1,960 @@
+"""
+적립식 투자 백테스트 계산
+
+종목별 시세를 기준 통화로 환산한 배열로 준비한 뒤(환율은 종목 거래일 배열 전체에 한 번에 적용),
+투자일별 체결가를 searchsorted 로 미리 구해 배열 연산만으로 매수와 평가를 진행합니다.
+준비한 시세는 종목 묶음별 패널로 공유 캐시에 저장하여 같은 묶음의 다음 요청이 다시 사용합니다.
+적립식 시뮬레이션 상태는 종료일을 뺀 요청 조건별로 체크포인트를 남겨, 종료일만 늦춘 다음 요청은
+체크포인트 이후의 투자일만 계산합니다.
+"""
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+import config
+import fx
+import market_data
+import memory
+import tracing
+from shared_cache import encode_strings
+
+logger = logging.getLogger("stock-api.backtest")
+
+FREQUENCIES = {"monthly": "MS", "quarterly": "QS", "yearly": "YS"}
+
+# 리밸런싱 방식 (none: 매수만, calendar: 주기마다, threshold: 비중 이탈 시)
+REBALANCE_MODES = ["none", "calendar", "threshold"]
+
+# 거래 내역 상세 수준 (summary: 요약만, columnar: 종목별 배열, full: 거래별 객체)
+DETAIL_LEVELS = ["summary", "columnar", "full"]
+
+
+class PriceSeries:
+    """한 종목의 종가 시계열 (기준 통화 환산 포함)"""
+
+    __slots__ = ("symbol", "currency", "dates", "local_close", "fx_rate", "close", "stale")
+
+    def __init__(
+        self,
+        symbol: str,
+        currency: str,
+        dates: np.ndarray,
+        local_close: np.ndarray,
+        fx_rate: np.ndarray,
+        stale: bool = False,
+    ):
+        self.symbol = symbol
+        self.currency = currency
+        self.dates = dates
+        self.local_close = local_close
+        self.fx_rate = fx_rate
+        self.close = local_close * fx_rate
+        self.stale = stale
+
+    def __len__(self) -> int:
+        return len(self.dates)
+
+
+def load_series(symbols: List[str], start_date: str, end_date: str, currency: str) -> Dict[str, PriceSeries]:
+    """종목별 종가를 불러와 기준 통화로 환산 (데이터가 없는 종목은 제외)"""
+    series = {}
+    for symbol in symbols:
+        try:
+            df = market_data.get_price_history(symbol, start_date, end_date)
+            if df.empty:
+                logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
+                continue
+
+            local_close = df["Close"].to_numpy(dtype=np.float64)
+            valid = np.isfinite(local_close) & (local_close > 0)
+            dates = df.index.values[valid].astype("datetime64[ns]")
+            local_close = local_close[valid]
+            if len(dates) == 0:
+                continue
+
+            symbol_currency = fx.currency_of(symbol)
+            rates = fx.conversion_rates(symbol_currency, currency, dates, start_date)
+            series[symbol] = PriceSeries(
+                symbol,
+                symbol_currency,
+                dates,
+                local_close,
+                rates,
+                bool(df.attrs.get("stale", False)),
+            )
+        except Exception as e:
+            logger.error(f"심볼 {symbol} 데이터 가져오기 중 오류: {str(e)}")
+            continue
+    return series
+
+
+# ======== 정렬된 시세 패널 ========
+PANELS = "panels"
+
+memory.register("snapshots:panels", lambda: market_data.cache.memory_entries(PANELS), market_data.cache.release)
+
+
+def _panel_key(symbols: List[str], start_date: str, end_date: str, currency: str) -> str:
+    """종목 순서와 무관한 패널 키"""
+    basket = ",".join(sorted(set(symbols)))
+    digest = hashlib.sha1(f"{basket}|{start_date}|{end_date}|{currency}".encode("utf-8")).hexdigest()[:16]
+    return f"{currency}-{digest}"
+
+
+def _panel_columns(series: List[PriceSeries]) -> Dict[str, np.ndarray]:
+    """공통 달력 [날짜, 종목] 현지 종가/환율 행렬 (그 종목의 거래일이 아니면 NaN)"""
+    calendar = np.unique(np.concatenate([s.dates for s in series]))
+    local_close = np.full((len(calendar), len(series)), np.nan)
+    fx_rate = np.full((len(calendar), len(series)), np.nan)
+    for j, s in enumerate(series):
+        positions = np.searchsorted(calendar, s.dates)
+        local_close[positions, j] = s.local_close
+        fx_rate[positions, j] = s.fx_rate
+    symbols_blob, symbols_offsets = encode_strings([s.symbol for s in series])
+    currencies_blob, currencies_offsets = encode_strings([s.currency for s in series])
+    return {
+        "dates": calendar,
+        "local_close": local_close,
+        "fx_rate": fx_rate,
+        "symbols_blob": symbols_blob,
+        "symbols_offsets": symbols_offsets,
+        "currencies_blob": currencies_blob,
+        "currencies_offsets": currencies_offsets,
+    }
+
+
+def _panel_series(snapshot) -> Dict[str, PriceSeries]:
+    dates = snapshot.columns["dates"]
+    local_close = snapshot.columns["local_close"]
+    fx_rate = snapshot.columns["fx_rate"]
+    currencies = snapshot.strings("currencies").tolist()
+    series = {}
+    for j, symbol in enumerate(snapshot.strings("symbols").tolist()):
+        traded = np.isfinite(local_close[:, j])
+        series[symbol] = PriceSeries(symbol, currencies[j], dates[traded], local_close[traded, j], fx_rate[traded, j])
+    return series
+
+
+def _fresh_panel(key: str):
+    snapshot = market_data.cache.get(PANELS, key)
+    if snapshot is None or time.time() - snapshot.meta.get("built_at", 0) > config.PANEL_CACHE_TTL_SECONDS:
+        return None
+    return snapshot
+
+
+def load_panel(symbols: List[str], start_date: str, end_date: str, currency: str) -> Dict[str, PriceSeries]:
+    """
+    load_series 와 같은 결과를 종목 묶음 패널 캐시를 거쳐 반환 (요청 종목 순서 유지)
+
+    패널은 모든 워커와 프로세스 풀이 공유하며 PANEL_CACHE_TTL_SECONDS 가 지나면 다시 만듭니다.
+    지난 스냅샷으로 대신한(stale) 시세가 섞이면 저장하지 않습니다.
+    """
+    key = _panel_key(symbols, start_date, end_date, currency)
+    snapshot = _fresh_panel(key)
+    if snapshot is None:
+        with market_data.cache.exclusive(PANELS, key):
+            # 잠금을 기다리는 동안 다른 프로세스가 만들었을 수 있음
+            snapshot = _fresh_panel(key)
+            if snapshot is None:
+                tracing.annotate("panel", "miss")
+                series = load_series(sorted(set(symbols)), start_date, end_date, currency)
+                if not series or any(s.stale for s in series.values()):
+                    return {s: series[s] for s in symbols if s in series}
+                snapshot = market_data.cache.put(
+                    PANELS,
+                    key,
+                    _panel_columns(list(series.values())),
+                    {"built_at": time.time(), "start_date": start_date, "end_date": end_date, "currency": currency},
+                )
+                market_data.cache.prune(PANELS, config.PANEL_CACHE_MAX_ENTRIES)
+            else:
+                tracing.annotate("panel", "hit")
+    else:
+        tracing.annotate("panel", "hit")
+
+    series = _panel_series(snapshot)
+    return {s: series[s] for s in symbols if s in series}
+
+
+# ======== 적립식 시뮬레이션 체크포인트 ========
+CHECKPOINTS = "checkpoints"
+
+memory.register(
+    "snapshots:checkpoints", lambda: market_data.cache.memory_entries(CHECKPOINTS), market_data.cache.release
+)
+
+# 체크포인트 상태 중 스냅샷 메타(JSON)로 저장하는 값
+_CHECKPOINT_META = (
+    "next_index",
+    "through",
+    "held",
+    "cash",
+    "total_invested",
+    "total_fees",
+    "total_taxes",
+    "rebalance_count",
+)
+# 스냅샷 컬럼으로 저장하는 값
+_CHECKPOINT_COLUMNS = ("shares", "cost_basis", "history_value", "history_invested")
+
+
+def checkpoint_key(request, currency: str) -> str:
+    """종료일을 뺀 요청 조건 키 (종료일만 다른 요청은 같은 체크포인트를 이어 씀)"""
+    params = request.model_dump(exclude={"end_date", "market_group", "currency"})
+    params["currency"] = currency
+    digest = hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()[:20]
+    return f"dca-{digest}"
+
+
+def load_checkpoint(key: str) -> Optional[Dict]:
+    """저장된 체크포인트 상태 (없으면 None, 배열은 공유 스냅샷 위의 읽기 전용 뷰)"""
+    snapshot = market_data.cache.get(CHECKPOINTS, key)
+    if snapshot is None:
+        return None
+    columns = snapshot.columns
+    state = {name: snapshot.meta[name] for name in _CHECKPOINT_META}
+    state.update({name: columns[name] for name in _CHECKPOINT_COLUMNS})
+    state["fingerprint"] = {"counts": columns["fingerprint_counts"], "sums": columns["fingerprint_sums"]}
+    log = dict(snapshot.meta["log"])
+    parts = log.pop("part_count")
+    log["parts"] = [columns[f"log_part_{i}"] for i in range(parts)] if parts else None
+    state["log"] = log
+    return state
+
+
+def save_checkpoint(key: str, state: Dict) -> None:
+    """체크포인트 상태를 공유 캐시에 저장 (모든 워커와 프로세스 풀이 이어 씀)"""
+    columns = {name: np.asarray(state[name]) for name in _CHECKPOINT_COLUMNS}
+    columns["fingerprint_counts"] = state["fingerprint"]["counts"]
+    columns["fingerprint_sums"] = state["fingerprint"]["sums"]
+    log = {name: value for name, value in state["log"].items() if name != "parts"}
+    parts = state["log"]["parts"] or []
+    log["part_count"] = len(parts)
+    for i, part in enumerate(parts):
+        columns[f"log_part_{i}"] = part
+
+    meta = {name: state[name] for name in _CHECKPOINT_META}
+    meta["log"] = log
+    meta["built_at"] = time.time()
+    market_data.cache.put(CHECKPOINTS, key, columns, meta)
+    market_data.cache.prune(CHECKPOINTS, config.BACKTEST_CHECKPOINT_MAX_ENTRIES)
+
+
+def investment_schedule(start_date: str, end_date: str, frequency: str) -> pd.DatetimeIndex:
+    """투자 주기에 따른 정기 투자일 (기본값: 월별)"""
+    return pd.date_range(start=start_date, end=end_date, freq=FREQUENCIES.get(frequency, "MS"))
+
+
+def _trade_positions(series: List[PriceSeries], dates: np.ndarray) -> np.ndarray:
+    """각 날짜 이후 첫 거래일 위치 [날짜, 종목] (거래일이 없으면 -1)"""
+    positions = np.full((len(dates), len(series)), -1, dtype=np.int64)
+    for j, s in enumerate(series):
+        found = np.searchsorted(s.dates, dates, "left")
+        positions[:, j] = np.where(found < len(s), found, -1)
+    return positions
+
+
+def _prices_at(series: List[PriceSeries], positions: np.ndarray) -> np.ndarray:
+    """거래일 위치의 기준 통화 종가 (위치가 없으면 NaN)"""
+    prices = np.full(positions.shape, np.nan)
+    for j, s in enumerate(series):
+        valid = positions[:, j] >= 0
+        prices[valid, j] = s.close[positions[valid, j]]
+    return prices
+
+
+def _asof_positions(series: List[PriceSeries], date) -> np.ndarray:
+    """날짜 기준 마지막 거래일 위치 [종목] (거래일이 없으면 -1)"""
+    return np.array([np.searchsorted(s.dates, date, "right") - 1 for s in series], dtype=np.int64)
+
+
+def aligned_prices(series: List[PriceSeries]):
+    """모든 종목 거래일을 합친 달력과 그 날짜 기준 마지막 종가 행렬 [날짜, 종목] (상장 전은 NaN)"""
+    if not series:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty((0, 0))
+    calendar = np.unique(np.concatenate([s.dates for s in series]))
+    prices = np.full((len(calendar), len(series)), np.nan)
+    for j, s in enumerate(series):
+        positions = np.searchsorted(s.dates, calendar, "right") - 1
+        valid = positions >= 0
+        prices[valid, j] = s.close[positions[valid]]
+    return calendar, prices
+
+
+class _TransactionLog:
+    """
+    거래 내역 기록 (상세 수준에 필요한 만큼만 만듦)
+
+    summary 는 건수만 세고, columnar 는 거래마다 체결 종목의 배열 조각만 모아 두었다가
+    마지막에 종목별로 한 번에 합치며, full 은 거래별 객체를 바로 만듭니다.
+    """
+
+    def __init__(self, held: List[str], columns: List[PriceSeries], currency: str, detail: str):
+        self.held = held
+        self.columns = columns
+        self.currency = currency
+        self.detail = detail
+        self.count = 0
+        self._records = []
+        self._dates = []
+        self._types = []
+        self._amounts = []
+        self._parts = []
+
+    def add(
+        self,
+        date: str,
+        kind: str,
+        amount: float,
+        traded: np.ndarray,
+        prices: np.ndarray,
+        shares: np.ndarray,
+        amounts: np.ndarray,
+        fees: np.ndarray,
+        taxes: np.ndarray = None,
+        positions: np.ndarray = None,
+    ) -> None:
+        """거래 한 건 기록 (traded: 체결된 종목 위치)"""
+        index = self.count
+        self.count += 1
+        if self.detail == "summary":
+            return
+
+        if self.detail == "columnar":
+            self._dates.append(date)
+            self._types.append(kind)
+            self._amounts.append(amount)
+            self._parts.append(
+                (
+                    np.full(len(traded), index, dtype=np.int64),
+                    traded,
+                    prices[traded],
+                    shares[traded],
+                    amounts[traded],
+                    fees[traded],
+                    taxes[traded] if taxes is not None else np.zeros(len(traded)),
+                    positions[traded] if positions is not None else np.full(len(traded), -1, dtype=np.int64),
+                )
+            )
+            return
+
+        details = {}
+        for j in traded.tolist():
+            detail = {
+                "price": prices[j],
+                "shares": int(shares[j]),
+                "amount": amounts[j],
+                "fee": fees[j],
+            }
+            if taxes is not None:
+                detail["tax"] = taxes[j]
+            if positions is not None and self.columns[j].currency != self.currency:
+                detail["local_price"] = self.columns[j].local_close[positions[j]]
+                detail["fx_rate"] = self.columns[j].fx_rate[positions[j]]
+            details[self.held[j]] = detail
+        self._records.append({"date": date, "type": kind, "amount": amount, "details": details})
+
+    def state(self) -> Dict:
+        """체크포인트에 저장할 기록 상태 (columnar 조각은 배열 8개로 합침)"""
+        parts = [np.concatenate(part) for part in zip(*self._parts)] if self._parts else None
+        return {
+            "count": self.count,
+            "records": list(self._records),
+            "dates": list(self._dates),
+            "types": list(self._types),
+            "amounts": list(self._amounts),
+            "parts": parts,
+        }
+
+    def restore(self, state: Dict) -> None:
+        """체크포인트의 기록 상태에서 이어 쓰기"""
+        self.count = state["count"]
+        self._records = list(state["records"])
+        self._dates = list(state["dates"])
+        self._types = list(state["types"])
+        self._amounts = list(state["amounts"])
+        self._parts = [tuple(np.array(column) for column in state["parts"])] if state["parts"] else []
+
+    def result(self):
+        """상세 수준에 맞는 거래 내역 (summary 는 None)"""
+        if self.detail == "summary":
+            return None
+        if self.detail == "full":
+            return self._records
+
+        # columnar: 종목별로 거래 번호(index)와 체결 값 배열
+        symbols = {}
+        if self._parts:
+            index, column, price, shares, amount, fee, tax, position = (
+                np.concatenate(part) for part in zip(*self._parts)
+            )
+            order = np.argsort(column, kind="stable")
+            bounds = np.searchsorted(column[order], np.arange(len(self.held) + 1), "left")
+            for j, symbol in enumerate(self.held):
+                rows = order[bounds[j] : bounds[j + 1]]
+                if len(rows) == 0:
+                    continue
+                entry = {
+                    "index": index[rows],
+                    "price": price[rows],
+                    "shares": shares[rows].astype(np.int64),
+                    "amount": amount[rows],
+                    "fee": fee[rows],
+                    "tax": tax[rows],
+                }
+                if self.columns[j].currency != self.currency:
+                    entry["local_price"] = self.columns[j].local_close[position[rows]]
+                    entry["fx_rate"] = self.columns[j].fx_rate[position[rows]]
+                symbols[symbol] = entry
+        return {
+            "dates": self._dates,
+            "types": self._types,
+            "amounts": np.array(self._amounts, dtype=np.float64),
+            "symbols": symbols,
+        }
+
+
+class _Rebalancer:
+    """목표 비중으로 매도 후 매수 (매도 금액에 수수료와 세금, 매수 금액에 수수료 부과)"""
+
+    def __init__(self, held: List[str], weights: np.ndarray, fee_ratio: float, tax_ratio: float):
+        self.held = held
+        self.weights = weights
+        self.fee_ratio = fee_ratio
+        self.tax_ratio = tax_ratio
+
+    def drift(self, shares: np.ndarray, cash: float, prices: np.ndarray) -> np.ndarray:
+        """각 행(날짜)의 목표 비중 대비 최대 이탈 (%p, 가격이 없는 종목 제외)"""
+        tradable = np.isfinite(prices)
+        values = np.where(tradable, prices * shares, 0.0)
+        total = values.sum(axis=1) + cash
+        with np.errstate(invalid="ignore", divide="ignore"):
+            current = values / total[:, None]
+        gap = np.where(tradable, np.abs(current - self.weights), 0.0)
+        return np.where(total > 0, gap.max(axis=1) * 100.0, 0.0)
+
+    def feasible(self, shares: np.ndarray, cash: float, prices: np.ndarray) -> np.ndarray:
+        """
+        각 행(날짜)에서 apply 가 한 주 이상 매매하는지 여부
+
+        정수 주 단위로는 이탈을 줄일 수 없는 날(비싼 종목의 1주가 이탈보다 큰 경우 등)을 건너뛰도록
+        apply 와 같은 순서로 매도 수량과, 매도가 없을 때의 매수 수량을 계산합니다.
+        """
+        tradable = np.isfinite(prices)
+        safe_prices = np.where(tradable, prices, 1.0)
+        values = np.where(tradable, shares * safe_prices, 0.0)
+        total = values.sum(axis=1) + cash
+        delta = np.where(tradable, total[:, None] * self.weights - values, 0.0)
+
+        sell = np.minimum(np.floor(np.maximum(-delta, 0.0) / safe_prices), shares)
+        want = np.maximum(delta, 0.0) * (1.0 + self.fee_ratio)
+        need = want.sum(axis=1)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            scale = np.where(need > 0, np.minimum(1.0, cash / need), 0.0)
+        buy = np.floor(want * scale[:, None] / (safe_prices * (1.0 + self.fee_ratio)))
+        return (sell >= 1).any(axis=1) | (buy >= 1).any(axis=1)
+
+    def apply(self, shares: np.ndarray, cost_basis: np.ndarray, cash: float, prices: np.ndarray):
+        """한 날짜의 리밸런싱 실행 후 (매매 주식 수, 매매 금액, 수수료, 세금, 새 현금) 반환"""
+        tradable = np.isfinite(prices)
+        safe_prices = np.where(tradable, prices, 1.0)
+        values = np.where(tradable, shares * safe_prices, 0.0)
+        total = values.sum() + cash
+        delta = np.where(tradable, total * self.weights - values, 0.0)
+
+        # 매도 (평균 단가 기준으로 원가 차감)
+        sell = np.minimum(np.floor(np.maximum(-delta, 0.0) / safe_prices), shares)
+        proceeds = sell * safe_prices
+        sell_fee = proceeds * self.fee_ratio
+        tax = proceeds * self.tax_ratio
+        with np.errstate(invalid="ignore", divide="ignore"):
+            cost_basis -= np.where(shares > 0, cost_basis * sell / shares, 0.0)
+        shares -= sell
+        cash += float((proceeds - sell_fee - tax).sum())
+
+        # 매수 (현금이 모자라면 비율대로 줄임)
+        want = np.maximum(delta, 0.0) * (1.0 + self.fee_ratio)
+        need = want.sum()
+        scale = min(1.0, cash / need) if need > 0 else 0.0
+        buy = np.floor(want * scale / (safe_prices * (1.0 + self.fee_ratio)))
+        buy_amount = buy * safe_prices
+        buy_fee = buy_amount * self.fee_ratio
+        shares += buy
+        cost_basis += buy_amount + buy_fee
+        cash -= float((buy_amount + buy_fee).sum())
+
+        return buy - sell, buy_amount + proceeds, buy_fee + sell_fee, tax, cash
+
+
+_NEVER = np.iinfo(np.int64).max
+
+
+def _fingerprint(columns: List[PriceSeries], through) -> Dict[str, np.ndarray]:
+    """through 이전 종가의 종목별 개수와 합계 (체크포인트 이후 과거 시세가 수정되었는지 확인)"""
+    counts = np.array([np.searchsorted(s.dates, through, "left") for s in columns], dtype=np.int64)
+    sums = np.array([s.close[:n].sum() for s, n in zip(columns, counts.tolist())], dtype=np.float64)
+    return {"counts": counts, "sums": sums}
+
+
+def _checkpoint_index(
+    columns: List[PriceSeries], schedule_values: np.ndarray, regular_positions: np.ndarray, start_date: str
+) -> int:
+    """
+    직전까지의 상태를 체크포인트로 남길 수 있는 마지막 정기 투자 위치 (없으면 -1)
+
+    모든 종목 시세가 그 투자일 이후까지 있고 이전 매수가 모두 그 투자일 전에 체결되었으면
+    그 전까지의 매수와 리밸런싱은 종료일이 늘어나도 바뀌지 않습니다.
+    """
+    if not columns or len(schedule_values) == 0:
+        return -1
+    settled = min(s.dates[-1] for s in columns)
+
+    # 투자 위치별 가장 늦은 체결일 (체결할 거래일이 아직 없으면 _NEVER)
+    traded_at = np.full(len(schedule_values), np.iinfo(np.int64).min)
+    initial_at = np.iinfo(np.int64).min
+    initial_positions = _trade_positions(columns, np.array([pd.Timestamp(start_date)], dtype="datetime64[ns]"))[0]
+    for j, s in enumerate(columns):
+        days = s.dates.view(np.int64)
+        positions = regular_positions[:, j]
+        traded_at = np.maximum(traded_at, np.where(positions >= 0, days[positions], _NEVER))
+        initial_at = max(initial_at, int(days[initial_positions[j]]) if initial_positions[j] >= 0 else _NEVER)
+
+    before = np.maximum.accumulate(np.concatenate([[initial_at], traded_at]))[:-1]
+    due = schedule_values.view(np.int64)
+    ready = np.flatnonzero((before < due) & (schedule_values <= settled))
+    return int(ready[-1]) if len(ready) else -1
+
+
+def _resumable(state: Dict, held: List[str], columns: List[PriceSeries], schedule: pd.DatetimeIndex) -> bool:
+    """체크포인트를 이번 요청에 이어 쓸 수 있는지 (같은 종목, 같은 투자일, 바뀌지 않은 과거 시세)"""
+    k = state["next_index"]
+    if state["held"] != held or k >= len(schedule) or state["through"] != schedule[k].strftime("%Y-%m-%d"):
+        return False
+    fingerprint = _fingerprint(columns, schedule.values[k].astype("datetime64[ns]"))
+    return np.array_equal(fingerprint["counts"], state["fingerprint"]["counts"]) and np.allclose(
+        fingerprint["sums"], state["fingerprint"]["sums"], rtol=1e-12, atol=0.0
+    )
+
+
+def run_dca(
+    series: Dict[str, PriceSeries],
+    symbols: List[str],
+    allocation: Dict[str, float],
+    start_date: str,
+    end_date: str,
+    initial_amount: float,
+    investment_amount: float,
+    frequency: str,
+    fee_rate: float,
+    currency: str,
+    tax_rate: float = 0.0,
+    rebalance: str = "none",
+    rebalance_frequency: str = "yearly",
+    rebalance_threshold: float = 5.0,
+    detail: str = "full",
+    resume: Optional[Dict] = None,
+) -> Dict:
+    """
+    적립식 매수 시뮬레이션
+
+    매수 금액 중 정수 주식을 사고 남은 금액과 투자 비중이 없는 금액은 현금으로 남겨
+    다음 정기 투자에 더합니다.
+    리밸런싱을 사용하면 종목 거래일을 합친 달력의 종가 행렬에서 정기 투자일 사이 구간을 한 번에 검사하여
+    주기가 돌아오거나(calendar) 비중 이탈이 기준을 넘는(threshold) 날 목표 비중으로 맞춥니다.
+    거래 내역은 detail 수준(DETAIL_LEVELS)에 따라 필요한 만큼만 만듭니다.
+
+    resume 은 같은 조건으로 이전에 남긴 체크포인트 상태이며, 이어 쓸 수 있으면 그 투자일부터 계산합니다.
+    결과의 checkpoint 는 다음 요청이 이어 쓸 수 있는 가장 늦은 상태입니다 (없거나 resume 보다 앞서지 않으면 None).
+    """
+    held = [s for s in symbols if s in series and allocation.get(s, 0) > 0]
+    columns = [series[s] for s in held]
+    weights = np.array([allocation[s] / 100.0 for s in held], dtype=np.float64)
+    fee_ratio = fee_rate / 100.0
+
+    schedule = investment_schedule(start_date, end_date, frequency)
+    schedule_values = schedule.values.astype("datetime64[ns]")
+    regular_positions = _trade_positions(columns, schedule_values)
+    regular_prices = _prices_at(columns, regular_positions)
+
+    shares = np.zeros(len(held), dtype=np.float64)
+    cost_basis = np.zeros(len(held), dtype=np.float64)
+    cash = 0.0
+    total_invested = 0.0
+    total_fees = 0.0
+    total_taxes = 0.0
+    rebalance_count = 0
+    log = _TransactionLog(held, columns, currency, detail)
+    value_history = []
+
+    def _buy(date: str, kind: str, recorded: float, amount: float, prices: np.ndarray, positions: np.ndarray):
+        budget = amount * weights
+        tradable = np.isfinite(prices)
+        fee = np.where(tradable, budget * fee_ratio, 0.0)
+        bought = np.where(tradable, np.floor((budget - fee) / np.where(tradable, prices, 1.0)), 0.0)
+        used = np.where(tradable, bought * np.where(tradable, prices, 0.0) + fee, 0.0)
+        log.add(date, kind, recorded, np.flatnonzero(tradable), prices, bought, used, fee, positions=positions)
+        return bought, used, fee.sum()
+
+    # 리밸런싱 준비: 정기 투자일 사이 구간 [segment_starts[k], segment_starts[k + 1]) 을 검사
+    rebalancer = None
+    if rebalance != "none" and held:
+        rebalancer = _Rebalancer(held, weights, fee_ratio, tax_rate / 100.0)
+        calendar, matrix = aligned_prices(columns)
+        segment_starts = np.searchsorted(calendar, schedule_values, "left")
+        calendar_days = np.empty(0, dtype=np.int64)
+        if rebalance == "calendar":
+            rebalance_dates = investment_schedule(start_date, end_date, rebalance_frequency)
+            calendar_days = np.unique(
+                np.searchsorted(calendar, rebalance_dates.values.astype("datetime64[ns]"), "left")
+            )
+
+    def _rebalance_between(lo: int, hi: int):
+        """구간 [lo, hi) 안에서 리밸런싱이 필요한 날마다 실행"""
+        nonlocal cash, total_fees, total_taxes, rebalance_count
+        hi = min(hi, len(calendar))
+        while lo < hi:
+            if rebalance == "calendar":
+                found = calendar_days[(calendar_days >= lo) & (calendar_days < hi)]
+                if len(found) == 0:
+                    return
+                day = int(found[0])
+            else:
+                window = matrix[lo:hi]
+                drift = rebalancer.drift(shares, cash, window)
+                over = np.flatnonzero((drift > rebalance_threshold) & rebalancer.feasible(shares, cash, window))
+                if len(over) == 0:
+                    return
+                day = lo + int(over[0])
+
+            prices = matrix[day]
+            traded, amount, fee, tax, cash = rebalancer.apply(shares, cost_basis, cash, prices)
+            lo = day + 1
+            if not traded.any():
+                # 정수 주로는 매매할 것이 없으면 리밸런싱으로 세지 않음
+                continue
+            total_fees += float(fee.sum())
+            total_taxes += float(tax.sum())
+            rebalance_count += 1
+            log.add(
+                pd.Timestamp(calendar[day]).strftime("%Y-%m-%d"),
+                "rebalance",
+                float(amount.sum()),
+                np.flatnonzero(traded != 0),
+                prices,
+                traded,
+                amount,
+                fee,
+                taxes=tax,
+                positions=_asof_positions(columns, calendar[day]) if log.detail == "columnar" else None,
+            )
+
+    start_index = 0
+    if resume is not None and not _resumable(resume, held, columns, schedule):
+        resume = None
+    if resume is not None:
+        start_index = resume["next_index"]
+        shares = np.array(resume["shares"], dtype=np.float64)
+        cost_basis = np.array(resume["cost_basis"], dtype=np.float64)
+        cash = resume["cash"]
+        total_invested = resume["total_invested"]
+        total_fees = resume["total_fees"]
+        total_taxes = resume["total_taxes"]
+        rebalance_count = resume["rebalance_count"]
+        log.restore(resume["log"])
+        value_history = [
+            {"date": date, "value": value, "invested": invested}
+            for date, value, invested in zip(
+                schedule[:start_index].strftime("%Y-%m-%d").tolist(),
+                np.asarray(resume["history_value"]).tolist(),
+                np.asarray(resume["history_invested"]).tolist(),
+            )
+        ]
+
+    checkpoint_at = _checkpoint_index(columns, schedule_values, regular_positions, start_date)
+    checkpoint = None
+
+    def _checkpoint(k: int) -> Dict:
+        """정기 투자 k 직전의 상태"""
+        return {
+            "next_index": k,
+            "through": schedule[k].strftime("%Y-%m-%d"),
+            "held": list(held),
+            "fingerprint": _fingerprint(columns, schedule_values[k]),
+            "shares": shares.copy(),
+            "cost_basis": cost_basis.copy(),
+            "cash": cash,
+            "total_invested": total_invested,
+            "total_fees": total_fees,
+            "total_taxes": total_taxes,
+            "rebalance_count": rebalance_count,
+            "history_value": np.array([v["value"] for v in value_history], dtype=np.float64),
+            "history_invested": np.array([v["invested"] for v in value_history], dtype=np.float64),
+            "log": log.state(),
+        }
+
+    # 초기 투자 처리 (체크포인트에서 이어 가면 이미 반영됨)
+    if initial_amount > 0 and resume is None:
+        initial_date = pd.Timestamp(start_date)
+        initial_positions = _trade_positions(columns, np.array([initial_date], dtype="datetime64[ns]"))
+        initial_prices = _prices_at(columns, initial_positions)[0]
+        bought, used, fee = _buy(
+            initial_date.strftime("%Y-%m-%d"),
+            "initial",
+            initial_amount,
+            initial_amount,
+            initial_prices,
+            initial_positions[0],
+        )
+        shares += bought
+        cost_basis += used
+        cash += initial_amount - used.sum()
+        total_fees += fee
+        total_invested += initial_amount
+
+        if rebalancer is not None:
+            first = np.searchsorted(calendar, np.datetime64(initial_date, "ns"), "left")
+            _rebalance_between(int(first), int(segment_starts[0]) if len(schedule) else len(calendar))
+
+    # 정기 투자 처리 (남은 현금도 이번 투자에 추가)
+    for k in range(start_index, len(schedule)):
+        if k == checkpoint_at and k > start_index:
+            checkpoint = _checkpoint(k)
+        inv_date = schedule[k]
+        prices = regular_prices[k]
+        available = investment_amount + cash
+        bought, used, fee = _buy(
+            inv_date.strftime("%Y-%m-%d"), "regular", investment_amount, available, prices, regular_positions[k]
+        )
+        shares += bought
+        cost_basis += used
+        cash = available - used.sum()
+        total_fees += fee
+        total_invested += investment_amount
+
+        # 이 날짜의 포트폴리오 가치 (현금 포함)
+        holdings_value = np.where(np.isfinite(prices), shares * np.nan_to_num(prices), 0.0).sum()
+        value_history.append(
+            {
+                "date": inv_date.strftime("%Y-%m-%d"),
+                "value": cash + holdings_value,
+                "invested": total_invested,
+            }
+        )
+
+        # 다음 정기 투자일 전까지 리밸런싱
+        if rebalancer is not None:
+            next_start = int(segment_starts[k + 1]) if k + 1 < len(schedule) else len(calendar)
+            _rebalance_between(int(segment_starts[k]), next_start)
+
+    return {
+        "symbols": held,
+        "series": columns,
+        "shares": shares,
+        "cost_basis": cost_basis,
+        "last_price": np.array([s.close[-1] for s in columns], dtype=np.float64),
+        "last_local_price": np.array([s.local_close[-1] for s in columns], dtype=np.float64),
+        "cash": cash,
+        "total_invested": total_invested,
+        "total_fees": total_fees,
+        "total_taxes": total_taxes,
+        "rebalance_count": rebalance_count,
+        "transaction_count": log.count,
+        "transactions": log.result(),
+        "value_history": value_history,
+        "resumed_from": schedule[start_index].strftime("%Y-%m-%d") if resume is not None else None,
+        "checkpoint": checkpoint,
+    }
+
+
+class NoPriceData(LookupError):
+    """요청한 종목 중 시세가 있는 종목이 없음"""
+
+
+def backtest_dca(request, end_date: str, currency: str) -> Dict:
+    """
+    적립식 투자 백테스트 결과 (요약, 최종 포트폴리오, 거래 내역, 평가액 추이)
+
+    거래 내역은 request.detail 수준으로 만들며 summary 이면 응답에서 빠집니다.
+
+    프로세스 풀에서 실행되므로 요청 모델과 결과 모두 pickle 가능한 값만 사용합니다.
+    """
+    # 각 종목의 가격 데이터 가져오기 (기준 통화로 환산)
+    with tracing.span("backtest.load_series", symbols=len(request.symbols), currency=currency):
+        price_data = load_panel(
+            request.symbols, request.start_date, end_date, currency
+        )
+
+    if not price_data:
+        raise NoPriceData("요청한 종목들에 대한 데이터를 찾을 수 없습니다.")
+
+    # 백테스팅 실행 (종료일만 늘어난 이전 요청의 체크포인트가 있으면 이어서 계산)
+    key = checkpoint_key(request, currency)
+    with tracing.span("compute.run_dca", symbols=len(price_data), detail=request.detail) as current:
+        simulation = run_dca(
+            price_data,
+            request.symbols,
+            request.allocation,
+            request.start_date,
+            end_date,
+            request.initial_amount,
+            request.investment_amount,
+            request.investment_frequency,
+            request.fee_rate,
+            currency,
+            tax_rate=request.tax_rate,
+            rebalance=request.rebalance,
+            rebalance_frequency=request.rebalance_frequency,
+            rebalance_threshold=request.rebalance_threshold,
+            detail=request.detail,
+            resume=load_checkpoint(key),
+        )
+        current.set("checkpoint", "resumed" if simulation["resumed_from"] else "miss")
+
+    # 지난 스냅샷으로 대신한(stale) 시세가 섞이면 저장하지 않음
+    if simulation["checkpoint"] is not None and not any(s.stale for s in price_data.values()):
+        try:
+            save_checkpoint(key, simulation["checkpoint"])
+        except Exception as e:
+            logger.warning(f"백테스트 체크포인트 저장 실패: {str(e)}")
+    portfolio_value_history = simulation["value_history"]
+    total_invested = simulation["total_invested"]
+    fractional_cash = simulation["cash"]
+
+    # 최종 포트폴리오 가치 계산 (현금 포함)
+    final_portfolio = []
+    final_value = fractional_cash + float(
+        (simulation["shares"] * simulation["last_price"]).sum()
+    )
+
+    for j, symbol in enumerate(simulation["symbols"]):
+        shares = int(simulation["shares"][j])
+        cost_basis = simulation["cost_basis"][j]
+        last_price = simulation["last_price"][j]
+        value = shares * last_price
+
+        # 종목 이름 찾기
+        if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
+            # 한국 주식 패턴
+            potential_markets = ["KOSPI", "KOSDAQ", "ETF/KR"]
+        else:
+            # 미국 주식 패턴
+            potential_markets = ["NASDAQ", "NYSE", "AMEX", "ETF/US"]
+
+        record = market_data.find_symbol(symbol, potential_markets)
+        stock_name = record.name if record is not None else None
+
+        final_portfolio.append(
+            {
+                "symbol": symbol,
+                "name": stock_name,
+                "shares": shares,  # 정수 단위
+                "cost_basis": cost_basis,
+                "current_price": last_price,
+                "current_value": value,
+                "currency": simulation["series"][j].currency,
+                "local_price": simulation["last_local_price"][j],
+                "weight": value / final_value * 100 if final_value > 0 else 0,
+                "profit_loss": value - cost_basis,
+                "profit_loss_pct": (
+                    (value / cost_basis - 1) * 100 if cost_basis > 0 else 0
+                ),
+            }
+        )
+
+    # 현금이 있는 경우 포트폴리오에 추가
+    if fractional_cash > 0:
+        final_portfolio.append(
+            {
+                "symbol": "CASH",
+                "name": "현금",
+                "shares": 1,
+                "cost_basis": fractional_cash,
+                "current_price": fractional_cash,
+                "current_value": fractional_cash,
+                "weight": (
+                    fractional_cash / final_value * 100 if final_value > 0 else 0
+                ),
+                "profit_loss": 0,
+                "profit_loss_pct": 0,
+            }
+        )
+
+    # 수익률 계산
+    total_profit = final_value - total_invested
+    total_profit_pct = (
+        (final_value / total_invested - 1) * 100 if total_invested > 0 else 0
+    )
+
+    # 투자 기간 계산
+    start_date_obj = datetime.strptime(request.start_date, "%Y-%m-%d")
+    end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
+    investment_days = (end_date_obj - start_date_obj).days
+    investment_years = investment_days / 365.25
+
+    # 연율화 수익률 계산 (CAGR)
+    cagr = (
+        (pow(final_value / total_invested, 1 / investment_years) - 1) * 100
+        if total_invested > 0 and investment_years > 0
+        else 0
+    )
+
+    # CAGR 등급 부여
+    cagr_rating = "F"
+    if cagr >= 20:
+        cagr_rating = "A+"
+    elif cagr >= 15:
+        cagr_rating = "A"
+    elif cagr >= 10:
+        cagr_rating = "B+"
+    elif cagr >= 7:
+        cagr_rating = "B"
+    elif cagr >= 5:
+        cagr_rating = "C+"
+    elif cagr >= 3:
+        cagr_rating = "C"
+    elif cagr >= 0:
+        cagr_rating = "D"
+
+    # 성과 점수 계산 (0-100)
+    performance_score = min(max(int(cagr * 5), 0), 100)
+
+    # 결과 반환 (summary 수준은 거래 내역 제외)
+    result = {
+        "summary": {
+            "start_date": request.start_date,
+            "end_date": end_date,
+            "investment_period": {
+                "days": investment_days,
+                "years": investment_years,
+                "months": investment_days / 30.44,
+            },
+            "total_invested": total_invested,
+            "final_value": final_value,
+            "total_profit": total_profit,
+            "total_profit_pct": total_profit_pct,
+            "cagr": cagr,
+            "cagr_rating": cagr_rating,
+            "performance_score": performance_score,
+            "transactions_count": simulation["transaction_count"],
+            "cash_balance": fractional_cash,
+            "currency": currency,
+            "rebalance": request.rebalance,
+            "rebalance_count": simulation["rebalance_count"],
+            "total_fees": simulation["total_fees"],
+            "total_taxes": simulation["total_taxes"],
+            "resumed_from": simulation["resumed_from"],
+        },
+        "portfolio": sorted(
+            final_portfolio, key=lambda x: x["current_value"], reverse=True
+        ),
+    }
+    if simulation["transactions"] is not None:
+        result["transactions"] = simulation["transactions"]
+    result["value_history"] = portfolio_value_history
+    return result
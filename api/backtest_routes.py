@@ -1,13 +1,25 @@
 from fastapi import APIRouter, HTTPException, Query, Path
 from pydantic import BaseModel, Field
-from typing import List, Dict, Optional, Any
+from typing import Callable, List, Dict, Optional, Any
+from concurrent.futures import as_completed
 import pandas as pd
 import numpy as np
-import FinanceDataReader as fdr
-from datetime import datetime, timedelta
+from datetime import datetime
+import asyncio
 import logging
 import re
-import math
+
+import backtest_engine
+import config
+import dip_strategy
+import fx
+import jobs
+import market_data
+import risk
+import simulation
+import tracing
+import workers
+from resilience import deadline, gather_within_deadline, request_budget
 
 # 로깅 설정
 logger = logging.getLogger("stock-api.backtest")
@@ -39,6 +51,63 @@ class BacktestDCARequest(BaseModel):
     )
     fee_rate: float = Field(0.015, description="매매 수수료율 (%), 기본값 0.015%")
     tax_rate: float = Field(0.3, description="양도소득세율 (%), 기본값 0.3%")
+    market_group: Optional[str] = Field(
+        None, description="시장 그룹 (kr, us), currency 미지정 시 us 는 USD, 그 외 KRW"
+    )
+    currency: Optional[str] = Field(
+        None, description="기준 통화 (KRW, USD), 금액과 결과가 이 통화로 표시됨"
+    )
+    rebalance: str = Field(
+        "none",
+        description="리밸런싱 방식 (none: 매수만, calendar: 주기마다, threshold: 비중 이탈 시)",
+    )
+    rebalance_frequency: str = Field(
+        "yearly", description="calendar 리밸런싱 주기 (monthly, quarterly, yearly)"
+    )
+    rebalance_threshold: float = Field(
+        5.0, description="threshold 리밸런싱 기준 비중 이탈 (%p), 기본값 5%p"
+    )
+    detail: str = Field(
+        "full",
+        description="거래 내역 상세 수준 (summary: 요약만, columnar: 종목별 배열, full: 거래별 객체)",
+    )
+
+
+class BacktestSimulationRequest(BacktestDCARequest):
+    paths: int = Field(1000, description="시뮬레이션 경로 수, 기본값 1000")
+    block_size: int = Field(
+        20, description="부트스트랩 블록 길이 (거래일), 기본값 20일"
+    )
+    seed: Optional[int] = Field(None, description="난수 시드 (같은 시드면 같은 결과)")
+
+
+class BacktestDipRequest(BacktestDCARequest):
+    thresholds: List[float] = Field(
+        [5, 10, 15, 20, 25, 30], description="매수 신호 기준 하락률 목록 (%)"
+    )
+    reserve_pcts: List[float] = Field(
+        [50, 100], description="투자금 중 하락 매수용으로 모아 둘 비율 목록 (%)"
+    )
+    peak_days: int = Field(
+        365, description="고점 계산 기간 (일), 0 이면 시작일 이후 누적 최고가"
+    )
+
+
+class BacktestRiskRequest(BaseModel):
+    symbols: List[str] = Field(..., description="종목 코드 목록")
+    start_date: str = Field(..., description="시작일 (YYYY-MM-DD)")
+    end_date: Optional[str] = Field(
+        None, description="종료일 (YYYY-MM-DD), 기본값은 오늘"
+    )
+    market_group: Optional[str] = Field(
+        None, description="시장 그룹 (kr, us), currency 미지정 시 us 는 USD, 그 외 KRW"
+    )
+    currency: Optional[str] = Field(
+        None, description="기준 통화 (KRW, USD), 수익률은 이 통화로 환산한 가격 기준"
+    )
+    min_overlap_days: Optional[int] = Field(
+        None, description="상관/공분산 계산에 필요한 최소 공통 거래일 수, 기본값 RISK_MIN_OVERLAP_DAYS"
+    )
 
 
 def convert_numpy_types(obj):
@@ -60,6 +129,128 @@ def convert_numpy_types(obj):
     else:
         return obj
 
+def resolve_currency(request: BacktestDCARequest) -> str:
+    """요청의 기준 통화 결정 (지정하지 않으면 시장 그룹 기준)"""
+    if request.currency:
+        currency = request.currency.upper()
+        if currency not in fx.CURRENCIES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"지원하지 않는 통화입니다: {request.currency} (가능: {', '.join(fx.CURRENCIES)})",
+            )
+        return currency
+    return "USD" if (request.market_group or "").lower() == "us" else "KRW"
+
+
+def validate_dca_request(request: BacktestDCARequest):
+    """적립식 투자 요청 검증 후 (종료일, 기준 통화) 반환"""
+    # 종료일 설정 (지정되지 않은 경우 오늘)
+    end_date = (
+        request.end_date
+        if request.end_date
+        else datetime.now().strftime("%Y-%m-%d")
+    )
+
+    currency = resolve_currency(request)
+
+    if request.rebalance not in backtest_engine.REBALANCE_MODES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 리밸런싱 방식입니다: {request.rebalance} (가능: {', '.join(backtest_engine.REBALANCE_MODES)})",
+        )
+    if request.detail not in backtest_engine.DETAIL_LEVELS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"지원하지 않는 상세 수준입니다: {request.detail} (가능: {', '.join(backtest_engine.DETAIL_LEVELS)})",
+        )
+    if request.rebalance == "threshold" and request.rebalance_threshold <= 0:
+        raise HTTPException(
+            status_code=400, detail="리밸런싱 기준 비중 이탈은 0보다 커야 합니다."
+        )
+    return end_date, currency
+
+
+def _symbol_prices(symbol: str, start_date: str, end_date: str, interval: str) -> Optional[Dict[str, Any]]:
+    """한 종목의 과거 가격 데이터 응답 항목 (데이터가 없으면 None)"""
+    # 시장 정보 자동 감지 (패턴 기반)
+    determined_market = None
+    if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
+        # 한국 주식 패턴
+        potential_markets = ["KOSPI", "KOSDAQ", "ETF/KR"]
+    elif re.match(r"^[A-Z]+$", symbol):
+        # 미국 주식 패턴
+        potential_markets = ["NASDAQ", "NYSE", "AMEX", "ETF/US"]
+    else:
+        potential_markets = [
+            "KOSPI",
+            "KOSDAQ",
+            "ETF/KR",
+            "NASDAQ",
+            "NYSE",
+            "AMEX",
+            "ETF/US",
+        ]
+
+    # 주가 데이터 가져오기
+    df = market_data.get_price_history(symbol, start_date, end_date)
+    stale = bool(df.attrs.get("stale", False))
+
+    if df.empty:
+        logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
+        return None
+
+    # 마켓 데이터 및 종목명 찾기
+    stock_name = None
+    record = market_data.find_symbol(symbol, potential_markets)
+    if record is not None:
+        determined_market = record.market
+        stock_name = record.name
+
+    # 간격 처리 (월별 데이터의 경우 리샘플링)
+    if interval == "1m":
+        # 월별 데이터로 리샘플링
+        df = df.resample("M").last()
+
+    # 결과 구성
+    prices_data = {
+        "dates": df.index.strftime("%Y-%m-%d").tolist(),
+        "open": (
+            [round(float(x), 2) for x in df["Open"].tolist()]
+            if "Open" in df.columns
+            else None
+        ),
+        "high": (
+            [round(float(x), 2) for x in df["High"].tolist()]
+            if "High" in df.columns
+            else None
+        ),
+        "low": (
+            [round(float(x), 2) for x in df["Low"].tolist()]
+            if "Low" in df.columns
+            else None
+        ),
+        "close": [round(float(x), 2) for x in df["Close"].tolist()],
+        "volume": (
+            [int(x) if not pd.isna(x) else 0 for x in df["Volume"].tolist()]
+            if "Volume" in df.columns
+            else None
+        ),
+    }
+
+    return {
+        "name": stock_name,
+        "market": determined_market if determined_market else "UNKNOWN",
+        "data": prices_data,
+        "stale": stale,
+        "timeframe": {
+            "start": df.index[0].strftime("%Y-%m-%d"),
+            "end": df.index[-1].strftime("%Y-%m-%d"),
+            "days": (df.index[-1] - df.index[0]).days,
+            "data_points": len(df),
+        },
+    }
+
+
 # 과거 가격 데이터 가져오기 엔드포인트
 @router.get("/historical-prices")
 async def get_historical_prices(
@@ -71,6 +262,9 @@ async def get_historical_prices(
         None, description="종료일 (YYYY-MM-DD), 기본값은 오늘"
     ),
     interval: str = Query("1d", description="데이터 간격 (1d: 일별, 1m: 월별)"),
+    timeout: Optional[float] = Query(
+        None, gt=0, description="시간 예산 (초), 기본값 REQUEST_DEADLINE_SECONDS"
+    ),
 ):
     """
     여러 종목의 과거 가격 데이터를 반환합니다. 백테스팅에 사용됩니다.
@@ -79,8 +273,10 @@ async def get_historical_prices(
     - **start_date**: 시작일 (YYYY-MM-DD)
     - **end_date**: 종료일 (YYYY-MM-DD), 지정하지 않으면 오늘
     - **interval**: 데이터 간격 (1d: 일별, 1m: 월별)
+    - **timeout**: 시간 예산 (초)
 
     여러 종목의 시계열 가격 데이터를 반환합니다.
+    종목은 동시에 조회하며, 시간 예산 안에 가져오지 못한 종목은 건너뛰고 partial, skipped_symbols 로 알려줍니다.
     """
     try:
         logger.info(
@@ -94,125 +290,26 @@ async def get_historical_prices(
         # 심볼 리스트로 변환
         symbol_list = [s.strip() for s in symbols.split(",")]
 
-        results = {}
+        with deadline(request_budget(timeout)):
+            found, skipped = await gather_within_deadline(
+                [(symbol, _symbol_prices, (symbol, start_date, end_date, interval)) for symbol in symbol_list]
+            )
 
+        results = {}
         for symbol in symbol_list:
-            try:
-                # 시장 정보 자동 감지 (패턴 기반)
-                determined_market = None
-                if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
-                    # 한국 주식 패턴
-                    potential_markets = ["KOSPI", "KOSDAQ", "ETF/KR"]
-                elif re.match(r"^[A-Z]+$", symbol):
-                    # 미국 주식 패턴
-                    potential_markets = ["NASDAQ", "NYSE", "AMEX", "ETF/US"]
-                else:
-                    potential_markets = [
-                        "KOSPI",
-                        "KOSDAQ",
-                        "ETF/KR",
-                        "NASDAQ",
-                        "NYSE",
-                        "AMEX",
-                        "ETF/US",
-                    ]
-
-                # 주가 데이터 가져오기
-                df = fdr.DataReader(symbol, start_date, end_date)
-
-                if df.empty:
-                    logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
-                    continue
-
-                # 마켓 데이터 및 종목명 찾기
-                stock_name = None
-                for potential_market in potential_markets:
-                    try:
-                        market_list = fdr.StockListing(potential_market)
-                        market_columns = market_list.columns.tolist()
-                        symbol_col = next(
-                            (
-                                col
-                                for col in ["Symbol", "Code", "code", "symbol", "티커"]
-                                if col in market_columns
-                            ),
-                            None,
-                        )
-
-                        if symbol_col:
-                            matching = market_list[market_list[symbol_col] == symbol]
-                            if not matching.empty:
-                                determined_market = potential_market
-                                name_col = next(
-                                    (
-                                        col
-                                        for col in [
-                                            "Name",
-                                            "Name(KOR)",
-                                            "korean_name",
-                                            "name",
-                                            "종목명",
-                                        ]
-                                        if col in market_columns
-                                    ),
-                                    None,
-                                )
-                                if name_col:
-                                    stock_name = matching.iloc[0][name_col]
-                                break
-                    except Exception as e:
-                        logger.warning(
-                            f"{potential_market} 시장에서 심볼 검색 중 오류: {str(e)}"
-                        )
-                        continue
-
-                # 간격 처리 (월별 데이터의 경우 리샘플링)
-                if interval == "1m":
-                    # 월별 데이터로 리샘플링
-                    df = df.resample("M").last()
-
-                # 결과 구성
-                prices_data = {
-                    "dates": df.index.strftime("%Y-%m-%d").tolist(),
-                    "open": (
-                        [round(float(x), 2) for x in df["Open"].tolist()]
-                        if "Open" in df.columns
-                        else None
-                    ),
-                    "high": (
-                        [round(float(x), 2) for x in df["High"].tolist()]
-                        if "High" in df.columns
-                        else None
-                    ),
-                    "low": (
-                        [round(float(x), 2) for x in df["Low"].tolist()]
-                        if "Low" in df.columns
-                        else None
-                    ),
-                    "close": [round(float(x), 2) for x in df["Close"].tolist()],
-                    "volume": (
-                        [int(x) if not pd.isna(x) else 0 for x in df["Volume"].tolist()]
-                        if "Volume" in df.columns
-                        else None
-                    ),
-                }
-
-                results[symbol] = {
-                    "name": stock_name,
-                    "market": determined_market if determined_market else "UNKNOWN",
-                    "data": prices_data,
-                    "timeframe": {
-                        "start": df.index[0].strftime("%Y-%m-%d"),
-                        "end": df.index[-1].strftime("%Y-%m-%d"),
-                        "days": (df.index[-1] - df.index[0]).days,
-                        "data_points": len(df),
-                    },
-                }
-
-            except Exception as e:
-                logger.error(f"심볼 {symbol} 데이터 처리 중 오류: {str(e)}")
-                continue
-
+            value = found.get(symbol)
+            if isinstance(value, Exception):
+                logger.error(f"심볼 {symbol} 데이터 처리 중 오류: {str(value)}")
+            elif value is not None:
+                results[symbol] = value
+        if skipped:
+            logger.warning(f"시간 예산 초과로 건너뛴 심볼: {', '.join(skipped)}")
+
+        if not results and skipped:
+            raise HTTPException(
+                status_code=504,
+                detail="시간 예산 안에 요청한 심볼의 데이터를 가져오지 못했습니다.",
+            )
         if not results:
             raise HTTPException(
                 status_code=404,
@@ -224,6 +321,8 @@ async def get_historical_prices(
             "data": results,
             "symbols_requested": len(symbol_list),
             "symbols_found": len(results),
+            "partial": bool(skipped),
+            "skipped_symbols": skipped,
         }
 
     except HTTPException:
@@ -245,397 +344,398 @@ async def backtest_dca(request: BacktestDCARequest):
     적립식 투자(Dollar Cost Averaging) 전략의 백테스팅을 수행합니다.
 
     - **symbols**: 종목 코드 목록
-    - **allocation**: 각 종목별 투자 비중 (%)
+    - **allocation**: 각 종목별 투자 비중 (%), 합계가 100% 미만이면 나머지 금액은 현금으로 남아 다음 정기 투자에 더해짐
     - **start_date**: 시작일 (YYYY-MM-DD)
     - **end_date**: 종료일 (YYYY-MM-DD), 기본값은 오늘
     - **initial_amount**: 초기 투자 금액
     - **investment_amount**: 정기 투자 금액
     - **investment_frequency**: 투자 주기 (monthly, quarterly, yearly)
     - **fee_rate**: 매매 수수료율 (%)
-    - **tax_rate**: 양도소득세율 (%)
-    - **market_group**: 시장 그룹 (kr, us)
-    - **currency**: 통화 (KRW, USD)
+    - **tax_rate**: 매도 시 세율 (%), 리밸런싱 매도 금액에 부과
+    - **rebalance**: 리밸런싱 방식 (none, calendar, threshold)
+    - **rebalance_frequency**: calendar 리밸런싱 주기 (monthly, quarterly, yearly)
+    - **rebalance_threshold**: threshold 리밸런싱 기준 비중 이탈 (%p)
+    - **market_group**: 시장 그룹 (kr, us), currency 가 없을 때 기준 통화 결정에 사용
+    - **currency**: 기준 통화 (KRW, USD), 금액은 이 통화 기준이며 다른 통화 종목은 거래일 환율로 환산
     """
     try:
         logger.info(
             f"적립식 투자 백테스팅 요청: symbols={request.symbols}, start_date={request.start_date}"
         )
 
-        # 종료일 설정 (지정되지 않은 경우 오늘)
-        end_date = (
-            request.end_date
-            if request.end_date
-            else datetime.now().strftime("%Y-%m-%d")
-        )
+        end_date, currency = validate_dca_request(request)
 
-        # 각 종목의 가격 데이터 가져오기
-        price_data = {}
-        for symbol in request.symbols:
-            try:
-                df = fdr.DataReader(symbol, request.start_date, end_date)
-                if df.empty:
-                    logger.warning(f"심볼 {symbol}에 대한 데이터를 찾을 수 없습니다.")
-                    continue
-
-                price_data[symbol] = df
-            except Exception as e:
-                logger.error(f"심볼 {symbol} 데이터 가져오기 중 오류: {str(e)}")
-                continue
-
-        if not price_data:
-            raise HTTPException(
-                status_code=404,
-                detail="요청한 종목들에 대한 데이터를 찾을 수 없습니다.",
-            )
+        # 백테스팅 실행 (공용 프로세스 풀)
+        result = await workers.run(backtest_engine.backtest_dca, request, end_date, currency)
+        with tracing.span("serialize.convert"):
+            result = convert_numpy_types(result)
 
-        # 투자 주기에 따른 날짜 생성
-        all_dates = pd.date_range(start=request.start_date, end=end_date)
-        if request.investment_frequency == "monthly":
-            # 매월 1일에 투자
-            investment_dates = pd.date_range(
-                start=request.start_date, end=end_date, freq="MS"
-            )
-        elif request.investment_frequency == "quarterly":
-            # 분기별 첫날에 투자
-            investment_dates = pd.date_range(
-                start=request.start_date, end=end_date, freq="QS"
-            )
-        elif request.investment_frequency == "yearly":
-            # 매년 1월 1일에 투자
-            investment_dates = pd.date_range(
-                start=request.start_date, end=end_date, freq="AS"
-            )
-        else:
-            # 기본값: 월별
-            investment_dates = pd.date_range(
-                start=request.start_date, end=end_date, freq="MS"
-            )
+        return {"status": "success", "data": result}
 
-        # 백테스팅 실행
-        portfolio = {}
-        transactions = []
-        portfolio_value_history = []
-        total_invested = 0.0
-        cash = request.initial_amount if request.initial_amount > 0 else 0
-        fractional_cash = 0.0  # 매수 후 남은 현금을 추적
-
-        # 초기 투자 처리
-        if request.initial_amount > 0:
-            initial_date = all_dates[0]
-            initial_transaction = {
-                "date": initial_date.strftime("%Y-%m-%d"),
-                "type": "initial",
-                "amount": request.initial_amount,
-                "details": {},
-            }
-
-            # 각 종목별 초기 투자
-            for symbol in request.symbols:
-                if symbol not in price_data:
-                    continue
-
-                allocation_pct = request.allocation.get(symbol, 0) / 100.0
-                if allocation_pct <= 0:
-                    continue
-
-                invest_amount = request.initial_amount * allocation_pct
-                price = (
-                    price_data[symbol]
-                    .loc[price_data[symbol].index >= initial_date]
-                    .iloc[0]["Close"]
-                )
-                fee = invest_amount * (request.fee_rate / 100.0)
-
-                # 정수 단위로 주식 매수
-                shares = math.floor((invest_amount - fee) / price)
-
-                # 실제 사용된 금액 계산
-                used_amount = shares * price + fee
-
-                # 남은 금액은 현금으로 보관
-                leftover = invest_amount - used_amount
-                fractional_cash += leftover
-
-                # 포트폴리오 업데이트
-                if symbol not in portfolio:
-                    portfolio[symbol] = {"shares": 0, "cost_basis": 0}
-
-                portfolio[symbol]["shares"] += shares
-                portfolio[symbol]["cost_basis"] += used_amount
-
-                # 거래 상세정보 기록
-                initial_transaction["details"][symbol] = {
-                    "price": price,
-                    "shares": shares,
-                    "amount": used_amount,
-                    "fee": fee,
-                }
+    except HTTPException:
+        raise
+    except backtest_engine.NoPriceData as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
 
-            transactions.append(initial_transaction)
-            total_invested += request.initial_amount
-
-        # 정기 투자 처리
-        for inv_date in investment_dates:
-            # 이 날짜의 투자 내역
-            transaction = {
-                "date": inv_date.strftime("%Y-%m-%d"),
-                "type": "regular",
-                "amount": request.investment_amount,
-                "details": {},
-            }
-
-            # 남은 현금도 이번 투자에 추가
-            investment_with_cash = request.investment_amount + fractional_cash
-            fractional_cash = 0.0  # 현금 사용 후 초기화
-
-            # 각 종목별 투자
-            for symbol in request.symbols:
-                if symbol not in price_data:
-                    continue
-
-                # 해당 날짜 이후의 첫 거래일 찾기
-                valid_dates = price_data[symbol].index[
-                    price_data[symbol].index >= inv_date
-                ]
-                if len(valid_dates) == 0:
-                    continue
-
-                trade_date = valid_dates[0]
-
-                allocation_pct = request.allocation.get(symbol, 0) / 100.0
-                if allocation_pct <= 0:
-                    continue
-
-                invest_amount = investment_with_cash * allocation_pct
-                price = price_data[symbol].loc[trade_date]["Close"]
-                fee = invest_amount * (request.fee_rate / 100.0)
-
-                # 정수 단위로 주식 매수
-                shares = math.floor((invest_amount - fee) / price)
-
-                # 실제 사용된 금액 계산
-                used_amount = shares * price + fee
-
-                # 남은 금액은 현금으로 보관
-                leftover = invest_amount - used_amount
-                fractional_cash += leftover
-
-                # 포트폴리오 업데이트
-                if symbol not in portfolio:
-                    portfolio[symbol] = {"shares": 0, "cost_basis": 0}
-
-                portfolio[symbol]["shares"] += shares
-                portfolio[symbol]["cost_basis"] += used_amount
-
-                # 거래 상세정보 기록
-                transaction["details"][symbol] = {
-                    "price": price,
-                    "shares": shares,
-                    "amount": used_amount,
-                    "fee": fee,
-                }
+        error_detail = str(e) + "\n" + traceback.format_exc()
+        logger.error(f"적립식 투자 백테스팅 중 오류 발생: {error_detail}")
+        raise HTTPException(status_code=500, detail=f"백테스팅 중 오류 발생: {str(e)}")
 
-            transactions.append(transaction)
-            total_invested += request.investment_amount
-
-            # 이 날짜의 포트폴리오 가치 계산
-            portfolio_value = fractional_cash  # 현금 포함
-            for symbol, holdings in portfolio.items():
-                if symbol not in price_data:
-                    continue
-
-                # 해당 날짜 이후의 첫 거래일 찾기
-                valid_dates = price_data[symbol].index[
-                    price_data[symbol].index >= inv_date
-                ]
-                if len(valid_dates) == 0:
-                    continue
-
-                valuation_date = valid_dates[0]
-                price = price_data[symbol].loc[valuation_date]["Close"]
-                value = holdings["shares"] * price
-                portfolio_value += value
-
-            # 포트폴리오 가치 기록
-            portfolio_value_history.append(
-                {
-                    "date": inv_date.strftime("%Y-%m-%d"),
-                    "value": portfolio_value,
-                    "invested": total_invested,
-                }
-            )
 
-        # 최종 포트폴리오 가치 계산 (현금 포함)
-        final_portfolio = []
-        final_value = fractional_cash  # 남은 현금도 최종 가치에 포함
-
-        for symbol, holdings in portfolio.items():
-            if symbol not in price_data:
-                continue
-
-            # 마지막 가격 사용
-            last_price = price_data[symbol]["Close"].iloc[-1]
-            value = holdings["shares"] * last_price
-            final_value += value
-
-            # 종목 이름 찾기
-            stock_name = None
-            try:
-                # 적절한 시장에서 종목명 찾기
-                if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
-                    # 한국 주식 패턴
-                    potential_markets = ["KOSPI", "KOSDAQ", "ETF/KR"]
-                else:
-                    # 미국 주식 패턴
-                    potential_markets = ["NASDAQ", "NYSE", "AMEX", "ETF/US"]
-
-                for market in potential_markets:
-                    try:
-                        stock_list = fdr.StockListing(market)
-                        symbol_col = next(
-                            (
-                                col
-                                for col in ["Symbol", "Code", "code", "symbol", "티커"]
-                                if col in stock_list.columns
-                            ),
-                            None,
-                        )
-                        name_col = next(
-                            (
-                                col
-                                for col in [
-                                    "Name",
-                                    "Name(KOR)",
-                                    "korean_name",
-                                    "name",
-                                    "종목명",
-                                ]
-                                if col in stock_list.columns
-                            ),
-                            None,
-                        )
-
-                        if symbol_col and name_col:
-                            matching = stock_list[stock_list[symbol_col] == symbol]
-                            if not matching.empty:
-                                stock_name = matching.iloc[0][name_col]
-                                break
-                    except:
-                        continue
-            except:
-                pass
-
-            final_portfolio.append(
-                {
-                    "symbol": symbol,
-                    "name": stock_name,
-                    "shares": holdings["shares"],  # 정수 단위
-                    "cost_basis": holdings["cost_basis"],
-                    "current_price": last_price,
-                    "current_value": value,
-                    "weight": value / final_value * 100 if final_value > 0 else 0,
-                    "profit_loss": value - holdings["cost_basis"],
-                    "profit_loss_pct": (
-                        (value / holdings["cost_basis"] - 1) * 100
-                        if holdings["cost_basis"] > 0
-                        else 0
-                    ),
-                }
+def validate_simulation_request(request: BacktestSimulationRequest):
+    """시뮬레이션 요청 검증 후 (종료일, 기준 통화) 반환"""
+    if not 1 <= request.paths <= config.SIMULATION_MAX_PATHS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"경로 수는 1 ~ {config.SIMULATION_MAX_PATHS} 사이여야 합니다.",
+        )
+    if request.block_size < 1:
+        raise HTTPException(status_code=400, detail="블록 길이는 1 이상이어야 합니다.")
+
+    end_date = (
+        request.end_date
+        if request.end_date
+        else datetime.now().strftime("%Y-%m-%d")
+    )
+    return end_date, resolve_currency(request)
+
+
+def run_simulation(
+    request: BacktestSimulationRequest,
+    end_date: str,
+    currency: str,
+    progress: Optional[Callable[[float], None]] = None,
+) -> Dict[str, Any]:
+    """시세를 불러와 경로 묶음을 프로세스 풀에 나눠 실행하고 분위수 결과를 만듦 (블로킹)"""
+    with tracing.span("backtest.load_series", symbols=len(request.symbols), currency=currency):
+        price_data = backtest_engine.load_panel(
+            request.symbols, request.start_date, end_date, currency
+        )
+    held = [
+        s for s in request.symbols if s in price_data and request.allocation.get(s, 0) > 0
+    ]
+    if not held:
+        raise HTTPException(
+            status_code=404,
+            detail="요청한 종목들에 대한 데이터를 찾을 수 없습니다.",
+        )
+
+    # 모든 종목 가격이 있는 날짜의 일별 로그 수익률 [날짜, 종목]
+    calendar, prices = backtest_engine.aligned_prices([price_data[s] for s in held])
+    complete = np.isfinite(prices).all(axis=1)
+    log_returns = np.diff(np.log(prices[complete]), axis=0)
+    if len(log_returns) < 2:
+        raise HTTPException(
+            status_code=400,
+            detail="시뮬레이션에 필요한 공통 거래 기간이 부족합니다.",
+        )
+
+    schedule = backtest_engine.investment_schedule(
+        request.start_date, end_date, request.investment_frequency
+    )
+    periods = max(1, len(schedule))
+    period_days = simulation.PERIOD_DAYS.get(request.investment_frequency, 21)
+    weights = np.array([request.allocation[s] / 100.0 for s in held])
+
+    # 경로 묶음을 프로세스 풀에 나눠 실행
+    sizes = simulation.chunk_sizes(
+        request.paths,
+        max(workers.pool_size(), -(-request.paths // config.SIMULATION_CHUNK_PATHS)),
+    )
+    seeds = np.random.SeedSequence(request.seed).spawn(len(sizes))
+    with tracing.span("compute.simulate", paths=request.paths, chunks=len(sizes)):
+        pool = workers.get_pool()
+        futures = [
+            pool.submit(
+                simulation.simulate_chunk,
+                log_returns,
+                weights,
+                request.initial_amount,
+                request.investment_amount,
+                periods,
+                period_days,
+                request.fee_rate,
+                request.block_size,
+                size,
+                seed,
             )
+            for size, seed in zip(sizes, seeds)
+        ]
+        chunks = []
+        for future in as_completed(futures):
+            chunks.append(future.result())
+            if progress is not None:
+                progress(len(chunks) / len(futures))
+
+    final_values = np.concatenate([c["final_value"] for c in chunks])
+    max_drawdowns = np.concatenate([c["max_drawdown"] for c in chunks])
+    values = np.concatenate([c["values"] for c in chunks])
+
+    total_invested = request.initial_amount + request.investment_amount * periods
+    invested_history = request.initial_amount + request.investment_amount * np.arange(1, periods + 1)
+    band_points = np.percentile(values, simulation.PERCENTILES, axis=0)
+    labels = (
+        schedule.strftime("%Y-%m-%d").tolist()
+        if len(schedule)
+        else [request.start_date]
+    )
 
-        # 현금이 있는 경우 포트폴리오에 추가
-        if fractional_cash > 0:
-            final_portfolio.append(
+    return convert_numpy_types(
+        {
+            "summary": {
+                "paths": request.paths,
+                "block_size": request.block_size,
+                "periods": periods,
+                "currency": currency,
+                "symbols": held,
+                "history": {
+                    "start_date": str(calendar[complete][0])[:10],
+                    "end_date": str(calendar[complete][-1])[:10],
+                    "trading_days": int(complete.sum()),
+                },
+                "total_invested": total_invested,
+                "probability_of_loss": float((final_values < total_invested).mean() * 100),
+            },
+            "final_value": simulation.percentile_table(final_values),
+            "max_drawdown": simulation.percentile_table(max_drawdowns),
+            "bands": [
                 {
-                    "symbol": "CASH",
-                    "name": "현금",
-                    "shares": 1,
-                    "cost_basis": fractional_cash,
-                    "current_price": fractional_cash,
-                    "current_value": fractional_cash,
-                    "weight": (
-                        fractional_cash / final_value * 100 if final_value > 0 else 0
-                    ),
-                    "profit_loss": 0,
-                    "profit_loss_pct": 0,
+                    "date": labels[k],
+                    "invested": invested_history[k],
+                    **{
+                        f"p{p}": band_points[i, k]
+                        for i, p in enumerate(simulation.PERCENTILES)
+                    },
                 }
-            )
+                for k in range(periods)
+            ],
+        }
+    )
+
+
+# 몬테카를로 시뮬레이션 엔드포인트
+@router.post("/simulate")
+async def simulate_dca(request: BacktestSimulationRequest):
+    """
+    과거 수익률을 블록 부트스트랩으로 재표본하여 적립식 투자 결과 분포를 추정합니다.
 
-        # 수익률 계산
-        total_profit = final_value - total_invested
-        total_profit_pct = (
-            (final_value / total_invested - 1) * 100 if total_invested > 0 else 0
+    - 요청 기간의 일별 수익률에서 연속된 날짜 블록을 뽑아 이어 붙이므로 종목 간 상관관계가 유지됩니다.
+    - 투자 금액, 주기, 비중, 수수료는 /dca 와 같으며 시뮬레이션 기간은 요청 기간의 투자 횟수와 같습니다.
+    - 최종 평가액과 최대 낙폭의 분위수, 투자일별 평가액 분위수 밴드를 반환합니다.
+    """
+    try:
+        logger.info(
+            f"적립식 투자 시뮬레이션 요청: symbols={request.symbols}, paths={request.paths}, block_size={request.block_size}"
         )
+        end_date, currency = validate_simulation_request(request)
+
+        # 시세 조회와 결과 대기는 스레드에서, 경로 계산은 공용 프로세스 풀에서 실행
+        result = await asyncio.to_thread(run_simulation, request, end_date, currency)
+        return {"status": "success", "data": result}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        import traceback
+
+        error_detail = str(e) + "\n" + traceback.format_exc()
+        logger.error(f"적립식 투자 시뮬레이션 중 오류 발생: {error_detail}")
+        raise HTTPException(status_code=500, detail=f"시뮬레이션 중 오류 발생: {str(e)}")
+
+
+# 종목 묶음 위험 지표 엔드포인트
+@router.post("/risk-matrix")
+async def risk_matrix(request: BacktestRiskRequest):
+    """
+    종목 묶음의 상관/공분산 행렬과 종목별 변동성, 최대 낙폭을 반환합니다.
+
+    - **symbols**: 종목 코드 목록 (최대 RISK_MAX_SYMBOLS 개)
+    - **start_date**, **end_date**: 기간 (종료일 기본값은 오늘)
+    - **currency**, **market_group**: 기준 통화 (/dca 와 같음)
+    - **min_overlap_days**: 공통 거래일이 이보다 적은 종목 쌍은 null
 
-        # 투자 기간 계산
-        start_date_obj = datetime.strptime(request.start_date, "%Y-%m-%d")
-        end_date_obj = datetime.strptime(end_date, "%Y-%m-%d")
-        investment_days = (end_date_obj - start_date_obj).days
-        investment_years = investment_days / 365.25
-
-        # 연율화 수익률 계산 (CAGR)
-        cagr = (
-            (pow(final_value / total_invested, 1 / investment_years) - 1) * 100
-            if total_invested > 0 and investment_years > 0
-            else 0
+    수익률은 종목별 거래일 기준이며 상관/공분산은 두 종목이 함께 거래한 날로 계산합니다.
+    정렬된 시세 패널은 캐시되어 같은 종목 묶음의 /dca, /simulate 요청이 다시 사용합니다.
+    """
+    try:
+        symbols = list(dict.fromkeys(s.strip() for s in request.symbols if s.strip()))
+        logger.info(f"위험 지표 요청: symbols={len(symbols)}개, start_date={request.start_date}")
+
+        if not symbols:
+            raise HTTPException(status_code=400, detail="종목을 하나 이상 지정해야 합니다.")
+        if len(symbols) > config.RISK_MAX_SYMBOLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"종목은 최대 {config.RISK_MAX_SYMBOLS}개까지 요청할 수 있습니다.",
+            )
+        min_overlap = (
+            request.min_overlap_days
+            if request.min_overlap_days is not None
+            else config.RISK_MIN_OVERLAP_DAYS
         )
+        if min_overlap < 2:
+            raise HTTPException(status_code=400, detail="최소 공통 거래일 수는 2 이상이어야 합니다.")
 
-        # CAGR 등급 부여
-        cagr_rating = "F"
-        if cagr >= 20:
-            cagr_rating = "A+"
-        elif cagr >= 15:
-            cagr_rating = "A"
-        elif cagr >= 10:
-            cagr_rating = "B+"
-        elif cagr >= 7:
-            cagr_rating = "B"
-        elif cagr >= 5:
-            cagr_rating = "C+"
-        elif cagr >= 3:
-            cagr_rating = "C"
-        elif cagr >= 0:
-            cagr_rating = "D"
-
-        # 성과 점수 계산 (0-100)
-        performance_score = min(max(int(cagr * 5), 0), 100)
-
-        # 결과 반환
-        result = convert_numpy_types(
-            {
-                "summary": {
-                    "start_date": request.start_date,
-                    "end_date": end_date,
-                    "investment_period": {
-                        "days": investment_days,
-                        "years": investment_years,
-                        "months": investment_days / 30.44,
-                    },
-                    "total_invested": total_invested,
-                    "final_value": final_value,
-                    "total_profit": total_profit,
-                    "total_profit_pct": total_profit_pct,
-                    "cagr": cagr,
-                    "cagr_rating": cagr_rating,
-                    "performance_score": performance_score,
-                    "transactions_count": len(transactions),
-                    "cash_balance": fractional_cash,
-                },
-                "portfolio": sorted(
-                    final_portfolio, key=lambda x: x["current_value"], reverse=True
-                ),
-                "transactions": transactions,
-                "value_history": portfolio_value_history,
-            }
+        end_date = request.end_date or datetime.now().strftime("%Y-%m-%d")
+        currency = resolve_currency(request)
+
+        result = await workers.run(
+            risk.risk_matrix, symbols, request.start_date, end_date, currency, min_overlap
         )
+        return {"status": "success", "data": result}
+
+    except HTTPException:
+        raise
+    except backtest_engine.NoPriceData as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        import traceback
+
+        error_detail = str(e) + "\n" + traceback.format_exc()
+        logger.error(f"위험 지표 계산 중 오류 발생: {error_detail}")
+        raise HTTPException(status_code=500, detail=f"위험 지표 계산 중 오류 발생: {str(e)}")
+
 
+# 고점 대비 하락 시 매수 전략 백테스팅 엔드포인트
+@router.post("/dip")
+async def backtest_dip(request: BacktestDipRequest):
+    """
+    고점 대비 하락률이 기준을 넘을 때 매수하는 전략을 기준 하락률 x 유보 비율 격자로 한 번에 백테스팅하고
+    일반 적립식 투자와 비교합니다.
+
+    - **thresholds**: 매수 신호 기준 하락률 목록 (%)
+    - **reserve_pcts**: 투자금 중 현금으로 모아 두었다가 신호일에 매수할 비율 목록 (%), 나머지는 투자일에 바로 매수
+    - **peak_days**: 고점 계산 기간 (일), /api/stock-data 의 days 와 같은 기준 (0 이면 누적 최고가)
+    - 나머지 항목(종목, 비중, 기간, 금액, 주기, 수수료, 통화)은 /dca 와 같습니다.
+
+    격자 칸별 최종 평가액, 적립식 대비 초과 수익, 남은 현금, 매수 신호 일수, 최대 낙폭과 가장 좋았던 칸을 반환합니다.
+    """
+    try:
+        logger.info(
+            f"하락 매수 백테스팅 요청: symbols={request.symbols}, thresholds={request.thresholds}, reserve_pcts={request.reserve_pcts}"
+        )
+        thresholds = sorted(set(request.thresholds))
+        reserve_pcts = sorted(set(request.reserve_pcts))
+        if not thresholds or not reserve_pcts:
+            raise HTTPException(
+                status_code=400, detail="기준 하락률과 유보 비율을 하나 이상 지정해야 합니다."
+            )
+        if not all(0 < t < 100 for t in thresholds):
+            raise HTTPException(status_code=400, detail="기준 하락률은 0 ~ 100 사이여야 합니다.")
+        if not all(0 <= r <= 100 for r in reserve_pcts):
+            raise HTTPException(status_code=400, detail="유보 비율은 0 ~ 100 사이여야 합니다.")
+        if len(thresholds) * len(reserve_pcts) > config.DIP_MAX_GRID_CELLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"격자 칸 수(기준 하락률 수 x 유보 비율 수)는 최대 {config.DIP_MAX_GRID_CELLS}개입니다.",
+            )
+        if request.peak_days < 0:
+            raise HTTPException(status_code=400, detail="고점 계산 기간은 0 이상이어야 합니다.")
+
+        end_date = request.end_date or datetime.now().strftime("%Y-%m-%d")
+        currency = resolve_currency(request)
+
+        result = await workers.run(
+            dip_strategy.dip_backtest,
+            request.symbols,
+            request.allocation,
+            request.start_date,
+            end_date,
+            request.initial_amount,
+            request.investment_amount,
+            request.investment_frequency,
+            request.fee_rate,
+            currency,
+            thresholds,
+            reserve_pcts,
+            request.peak_days,
+        )
         return {"status": "success", "data": result}
 
     except HTTPException:
         raise
+    except backtest_engine.NoPriceData as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         import traceback
 
         error_detail = str(e) + "\n" + traceback.format_exc()
-        logger.error(f"적립식 투자 백테스팅 중 오류 발생: {error_detail}")
+        logger.error(f"하락 매수 백테스팅 중 오류 발생: {error_detail}")
         raise HTTPException(status_code=500, detail=f"백테스팅 중 오류 발생: {str(e)}")
+
+
+def _submit_job(kind: str, task) -> Dict[str, Any]:
+    try:
+        return jobs.submit(kind, task)
+    except jobs.JobQueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="진행 중인 백테스트 작업이 너무 많습니다. 잠시 후 다시 시도하세요.",
+        )
+
+
+# 적립식 투자 백테스팅 작업 제출 엔드포인트
+@router.post("/jobs/dca")
+async def submit_dca_job(request: BacktestDCARequest):
+    """
+    적립식 투자 백테스팅을 비동기 작업으로 제출하고 작업 id를 반환합니다.
+
+    결과는 GET /api/backtest/jobs/{job_id} 로 조회하며 /dca 응답의 data 와 같은 형식입니다.
+    """
+    end_date, currency = validate_dca_request(request)
+    logger.info(f"적립식 투자 백테스팅 작업 제출: symbols={request.symbols}")
+
+    def _task(progress):
+        future = workers.get_pool().submit(
+            backtest_engine.backtest_dca, request, end_date, currency
+        )
+        try:
+            return convert_numpy_types(future.result())
+        except backtest_engine.NoPriceData as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    return {"status": "success", "data": _submit_job("dca", _task)}
+
+
+# 몬테카를로 시뮬레이션 작업 제출 엔드포인트
+@router.post("/jobs/simulate")
+async def submit_simulation_job(request: BacktestSimulationRequest):
+    """
+    몬테카를로 시뮬레이션을 비동기 작업으로 제출하고 작업 id를 반환합니다.
+
+    진행률은 완료된 경로 묶음 비율이며, 결과는 /simulate 응답의 data 와 같은 형식입니다.
+    """
+    end_date, currency = validate_simulation_request(request)
+    logger.info(
+        f"적립식 투자 시뮬레이션 작업 제출: symbols={request.symbols}, paths={request.paths}"
+    )
+
+    def _task(progress):
+        return run_simulation(request, end_date, currency, progress)
+
+    return {"status": "success", "data": _submit_job("simulate", _task)}
+
+
+# 작업 상태/결과 조회 엔드포인트
+@router.get("/jobs/{job_id}")
+async def get_job(
+    job_id: str = Path(..., description="작업 id"),
+    wait: float = Query(
+        0, description="작업이 끝날 때까지 기다릴 최대 시간 (초), 기본값 0 (즉시 반환)"
+    ),
+):
+    """
+    작업 상태(queued, running, done, failed)와 진행률을 반환합니다.
+
+    - **wait**: 0보다 크면 작업이 끝나거나 시간이 지날 때까지 기다린 뒤 반환
+    - 완료된 작업은 result 에, 실패한 작업은 error 와 status_code 에 내용이 담깁니다.
+    """
+    job = await jobs.wait(job_id, wait)
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"작업 {job_id}을(를) 찾을 수 없습니다. (만료되었을 수 있습니다)",
+        )
+    return {"status": "success", "data": job}
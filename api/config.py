@@ -0,0 +1,195 @@
+"""
+FastAPI 서버 설정
+
+모든 값은 환경 변수로 덮어쓸 수 있습니다.
+"""
+import os
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.environ.get(name, default))
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, default))
+
+
+def _env_rates(name: str) -> dict:
+    """'소스=초당 호출 수' 를 쉼표로 구분한 환경 변수 (예: prices:US=2,listing:KRX=0.5)"""
+    rates = {}
+    for item in os.environ.get(name, "").split(","):
+        if "=" in item:
+            source, rate = item.rsplit("=", 1)
+            rates[source.strip()] = float(rate)
+    return rates
+
+
+# 기본 검색 대상 시장 (DOW 제외)
+ALL_MARKETS = ["KOSPI", "KOSDAQ", "NASDAQ", "NYSE", "AMEX", "ETF/KR", "ETF/US"]
+
+# 알림 규칙 등 유지해야 하는 데이터 디렉토리
+DATA_DIR = os.environ.get("STOCK_DATA_DIR", os.path.join(BASE_DIR, "data"))
+
+# ======== 데이터 제공자 ========
+# fdr: FinanceDataReader, fake: 오프라인 가짜 데이터 (부하 테스트/개발용)
+DATA_PROVIDER = os.environ.get("STOCK_DATA_PROVIDER", "fdr")
+# 가짜 데이터 제공자의 시장별 종목 수
+FAKE_PROVIDER_SYMBOLS = _env_int("FAKE_PROVIDER_SYMBOLS", 1000)
+# 가짜 데이터 제공자의 호출당 응답 지연 (ms)
+FAKE_PROVIDER_LATENCY_MS = _env_float("FAKE_PROVIDER_LATENCY_MS", 0)
+
+# ======== 공유 캐시 설정 ========
+# 여러 uvicorn 워커가 함께 사용하는 스냅샷 디렉토리
+CACHE_DIR = os.environ.get("STOCK_CACHE_DIR", os.path.join(BASE_DIR, "cache"))
+# 종목 목록 스냅샷 갱신 주기 (초)
+LISTING_REFRESH_SECONDS = _env_int("LISTING_REFRESH_SECONDS", 6 * 60 * 60)
+# 당일 가격 시계열을 최신으로 간주하는 시간 (초)
+PRICE_REFRESH_SECONDS = _env_int("PRICE_REFRESH_SECONDS", 10 * 60)
+# 디스크에 보관할 가격 시계열 최대 개수 (초과 시 오래된 것부터 삭제)
+PRICE_CACHE_MAX_SYMBOLS = _env_int("PRICE_CACHE_MAX_SYMBOLS", 2000)
+# 다른 워커가 교체한 스냅샷을 확인하는 주기 (초)
+SNAPSHOT_CHECK_SECONDS = _env_float("SNAPSHOT_CHECK_SECONDS", 1.0)
+# 쓰기 담당 워커 선출/갱신 작업 확인 주기 (초)
+WRITER_POLL_SECONDS = _env_float("WRITER_POLL_SECONDS", 60.0)
+# 기간은 포함하지만 갱신 주기가 지난 시세를 즉시 반환하고 백그라운드에서 갱신하는 최대 시간 (초)
+PRICE_STALE_GRACE_SECONDS = _env_int("PRICE_STALE_GRACE_SECONDS", 6 * 60 * 60)
+# 백그라운드 갱신 스레드 수
+REVALIDATE_WORKERS = _env_int("REVALIDATE_WORKERS", 2)
+
+# ======== 업스트림 장애 대응 ========
+# 존재하지 않는 심볼/시장을 기억하는 시간 (초)
+NEGATIVE_CACHE_TTL_SECONDS = _env_float("NEGATIVE_CACHE_TTL_SECONDS", 5 * 60)
+NEGATIVE_CACHE_MAX_ENTRIES = _env_int("NEGATIVE_CACHE_MAX_ENTRIES", 10000)
+# 서킷을 여는 연속 실패 횟수
+CIRCUIT_FAILURE_THRESHOLD = _env_int("CIRCUIT_FAILURE_THRESHOLD", 5)
+# 서킷이 열린 뒤 시험 호출까지 대기 시간 (초)
+CIRCUIT_RESET_SECONDS = _env_float("CIRCUIT_RESET_SECONDS", 30.0)
+# 여러 시장/종목을 조회하는 요청의 기본 시간 예산과 요청별로 지정할 수 있는 최대값 (초)
+REQUEST_DEADLINE_SECONDS = _env_float("REQUEST_DEADLINE_SECONDS", 10.0)
+REQUEST_DEADLINE_MAX_SECONDS = _env_float("REQUEST_DEADLINE_MAX_SECONDS", 60.0)
+# 시간 예산이 있는 업스트림 호출을 실행하는 스레드 수 (예산이 지나도 끝나지 않은 호출이 점유)
+PROVIDER_CALL_WORKERS = _env_int("PROVIDER_CALL_WORKERS", 16)
+
+# ======== 업스트림 호출 제한 ========
+# 업스트림 소스별 초당 호출 수 (0 이면 제한 없음)
+# shared: STOCK_CACHE_DIR 를 함께 쓰는 모든 프로세스(uvicorn 워커, 프로세스 풀)가 합쳐서 이 값을 넘지 않음
+# process: 프로세스마다 따로 적용 (실제 호출 수는 워커 수 + 프로세스 풀 크기를 곱한 값까지 늘어남)
+UPSTREAM_RATE_SCOPE = os.environ.get("UPSTREAM_RATE_SCOPE", "shared")
+UPSTREAM_RATE_PER_SECOND = _env_float("UPSTREAM_RATE_PER_SECOND", 5.0)
+# 소스별 초당 호출 수 덮어쓰기
+UPSTREAM_RATE_OVERRIDES = _env_rates("UPSTREAM_RATE_OVERRIDES")
+# 한 번에 몰아서 호출할 수 있는 최대 횟수
+UPSTREAM_BURST = _env_float("UPSTREAM_BURST", 10)
+# 호출 토큰 최대 대기 시간 (초) - 초과 시 대화형 요청은 마지막 시세 또는 503, 일괄 작업은 재시도
+UPSTREAM_MAX_WAIT_INTERACTIVE_SECONDS = _env_float("UPSTREAM_MAX_WAIT_INTERACTIVE_SECONDS", 3.0)
+UPSTREAM_MAX_WAIT_BATCH_SECONDS = _env_float("UPSTREAM_MAX_WAIT_BATCH_SECONDS", 60.0)
+
+# ======== 검색 설정 ========
+# 종목별 고정 인기도 점수 파일 ({"심볼": 점수} 형식 JSON, 없으면 무시)
+POPULARITY_FILE = os.environ.get("POPULARITY_FILE", os.path.join(BASE_DIR, "popularity.json"))
+# 조회 1회당 더해지는 인기도 점수
+POPULARITY_HIT_WEIGHT = _env_float("POPULARITY_HIT_WEIGHT", 1.0)
+# 자동완성 기본 결과 수
+AUTOCOMPLETE_LIMIT = _env_int("AUTOCOMPLETE_LIMIT", 10)
+# 조회 횟수 기반 인기도를 자동완성 색인에 반영하는 주기 (초)
+AUTOCOMPLETE_REBUILD_SECONDS = _env_int("AUTOCOMPLETE_REBUILD_SECONDS", 10 * 60)
+# 종목 목록 변경이 전체 대비 이 비율 이하이면 검색 색인을 다시 만들지 않고 변경분만 반영
+LISTING_INCREMENTAL_MAX_RATIO = _env_float("LISTING_INCREMENTAL_MAX_RATIO", 0.2)
+# 시장별로 보관할 종목 목록 변경 내역 버전 수 (더 오래된 버전에서 요청하면 전체 동기화)
+LISTING_CHANGE_LOG_MAX_VERSIONS = _env_int("LISTING_CHANGE_LOG_MAX_VERSIONS", 100)
+
+# ======== 구간 최고가 색인 ========
+# 프로세스별로 유지할 종목 색인 최대 개수
+PEAK_INDEX_MAX_SYMBOLS = _env_int("PEAK_INDEX_MAX_SYMBOLS", 5000)
+
+# ======== 실시간 시세 구독 ========
+# 구독 중인 종목 시세 확인 주기 (초, 종목당 워커 전체에서 이 주기에 한 번만 업스트림 호출)
+QUOTE_POLL_SECONDS = _env_float("QUOTE_POLL_SECONDS", 15.0)
+# 하락률 기준 고점 기간 (일)
+QUOTE_PEAK_DAYS = _env_int("QUOTE_PEAK_DAYS", 365)
+# 연결당 최대 구독 종목 수
+QUOTE_MAX_SYMBOLS = _env_int("QUOTE_MAX_SYMBOLS", 50)
+# 한 주기에 동시에 확인하는 종목 수
+QUOTE_POLL_CONCURRENCY = _env_int("QUOTE_POLL_CONCURRENCY", 8)
+# 변경이 없을 때 연결 유지용 주석 전송 간격 (초)
+QUOTE_KEEPALIVE_SECONDS = _env_float("QUOTE_KEEPALIVE_SECONDS", 15.0)
+
+# ======== 가격 알림 ========
+# 알림 규칙 저장 SQLite 파일
+ALERTS_DB = os.environ.get("ALERTS_DB", os.path.join(DATA_DIR, "alerts.db"))
+# 하락률 규칙이 다시 무장되기 위해 되돌아와야 하는 간격 (%p)
+ALERT_DROP_HYSTERESIS = _env_float("ALERT_DROP_HYSTERESIS", 2.0)
+# 가격 규칙이 다시 무장되기 위해 되돌아와야 하는 간격 (기준가의 %)
+ALERT_PRICE_HYSTERESIS_PCT = _env_float("ALERT_PRICE_HYSTERESIS_PCT", 1.0)
+
+# ======== 시세 일괄 수집 ========
+# 수집 대상 시장 (쉼표 구분)
+INGEST_MARKETS = [
+    m.strip() for m in os.environ.get("INGEST_MARKETS", ",".join(ALL_MARKETS)).split(",") if m.strip()
+]
+# 처음 수집하는 종목의 과거 시세 기간 (일)
+INGEST_HISTORY_DAYS = _env_int("INGEST_HISTORY_DAYS", 5 * 365)
+# 동시에 수집하는 종목 수
+INGEST_CONCURRENCY = _env_int("INGEST_CONCURRENCY", 8)
+# 업스트림 장애 시 재시도 횟수와 첫 대기 시간 (초, 재시도마다 두 배)
+INGEST_MAX_RETRIES = _env_int("INGEST_MAX_RETRIES", 4)
+INGEST_RETRY_BASE_SECONDS = _env_float("INGEST_RETRY_BASE_SECONDS", 2.0)
+# 매일 자동 수집 시각 (서버 시간 HH:MM, 비어 있으면 자동 수집 안 함)
+INGEST_SCHEDULE = os.environ.get("INGEST_SCHEDULE", "")
+
+# ======== 계산 작업 ========
+# CPU 작업용 프로세스 풀 크기 (0 이면 CPU 코어 수)
+PROCESS_POOL_WORKERS = _env_int("PROCESS_POOL_WORKERS", 0)
+# 몬테카를로 시뮬레이션 최대 경로 수
+SIMULATION_MAX_PATHS = _env_int("SIMULATION_MAX_PATHS", 20000)
+# 프로세스 하나에 넘기는 경로 묶음 최대 크기
+SIMULATION_CHUNK_PATHS = _env_int("SIMULATION_CHUNK_PATHS", 1000)
+# 워커별 동시에 진행(대기 포함)할 수 있는 비동기 작업 수
+JOB_MAX_ACTIVE = _env_int("JOB_MAX_ACTIVE", 32)
+# 끝난 작업 결과 보관 시간 (초)
+JOB_RESULT_TTL_SECONDS = _env_int("JOB_RESULT_TTL_SECONDS", 60 * 60)
+# 작업 조회 시 최대 대기 시간 (초)
+JOB_MAX_WAIT_SECONDS = _env_float("JOB_MAX_WAIT_SECONDS", 60.0)
+# 정렬된 시세 패널(종목 묶음별 공통 달력 가격 행렬) 캐시 유효 시간 (초)과 최대 개수
+PANEL_CACHE_TTL_SECONDS = _env_int("PANEL_CACHE_TTL_SECONDS", 10 * 60)
+PANEL_CACHE_MAX_ENTRIES = _env_int("PANEL_CACHE_MAX_ENTRIES", 200)
+# 적립식 백테스트 체크포인트(종료일을 뺀 요청 조건별 시뮬레이션 상태) 최대 개수
+BACKTEST_CHECKPOINT_MAX_ENTRIES = _env_int("BACKTEST_CHECKPOINT_MAX_ENTRIES", 500)
+# 위험 지표(상관 행렬) 요청당 최대 종목 수
+RISK_MAX_SYMBOLS = _env_int("RISK_MAX_SYMBOLS", 100)
+# 상관/공분산 계산에 필요한 두 종목 공통 거래일 최소 수
+RISK_MIN_OVERLAP_DAYS = _env_int("RISK_MIN_OVERLAP_DAYS", 20)
+# 하락 매수 백테스트 요청당 최대 격자 칸 수 (기준 하락률 수 x 유보 비율 수)
+DIP_MAX_GRID_CELLS = _env_int("DIP_MAX_GRID_CELLS", 200)
+
+# ======== 메모리 관리 ========
+# 워커별 캐시 메모리 예산 (MB, 0 이면 제한 없음)
+MEMORY_BUDGET_MB = _env_float("MEMORY_BUDGET_MB", 0)
+# 예산 초과 시 이 비율 아래가 될 때까지 정리
+MEMORY_EVICT_TARGET_RATIO = _env_float("MEMORY_EVICT_TARGET_RATIO", 0.8)
+# 예산 확인 주기 (초)
+MEMORY_CHECK_SECONDS = _env_float("MEMORY_CHECK_SECONDS", 30.0)
+
+# ======== 요청 추적 ========
+# 이 시간(ms)을 넘긴 요청은 span 트리 전체를 로그에 남김 (0 이면 사용 안 함)
+TRACE_SLOW_MS = _env_float("TRACE_SLOW_MS", 1000.0)
+# trace 를 OTLP/JSON 한 줄씩 기록할 파일 (비어 있으면 기록 안 함)
+TRACE_FILE = os.environ.get("TRACE_FILE", "")
+# OTLP/HTTP 수집기 주소 (예: http://localhost:4318, 비어 있으면 전송 안 함)
+TRACE_OTLP_ENDPOINT = os.environ.get("TRACE_OTLP_ENDPOINT", "")
+# 파일/수집기로 내보낼 요청 비율 (느린 요청은 항상 내보냄)
+TRACE_SAMPLE_RATE = _env_float("TRACE_SAMPLE_RATE", 1.0)
+# 요청 하나에 기록할 최대 span 수
+TRACE_MAX_SPANS = _env_int("TRACE_MAX_SPANS", 2000)
+
+# ======== 이벤트 루프 감시 ========
+# 루프 지연 측정 주기 (초, 0 이면 사용 안 함)
+LOOP_MONITOR_INTERVAL_SECONDS = _env_float("LOOP_MONITOR_INTERVAL_SECONDS", 0.1)
+# 루프가 이 시간(ms) 넘게 멈추면 스택과 요청 경로를 기록 (0 이면 사용 안 함)
+LOOP_BLOCK_THRESHOLD_MS = _env_float("LOOP_BLOCK_THRESHOLD_MS", 200.0)
+# 분포 계산에 쓰는 최근 지연 측정값 수
+LOOP_LAG_SAMPLES = _env_int("LOOP_LAG_SAMPLES", 600)
+# 보관할 최근 멈춤 기록 수
+LOOP_STALL_HISTORY = _env_int("LOOP_STALL_HISTORY", 50)
@@ -0,0 +1,246 @@
+"""
+고점 대비 하락 시 매수 전략 백테스트 (하락률 기준 x 적립금 유보 비율 격자)
+
+투자금(초기 투자금 포함) 중 유보 비율만큼은 현금으로 모아 두었다가, 종목 하락률(기간 고점 대비, /api/stock-data 와 같은 기준)이
+기준 하락률을 넘는 날 한 번에 매수하고 나머지는 정기 투자일에 바로 매수합니다.
+유보 비율 0% 는 일반 적립식 투자와 같으므로 기준선으로 함께 계산합니다.
+
+- 하락률은 현지 통화 고가의 기간 최고가(peak_days 가 0 이면 누적 최고가) 대비 종가로 구합니다.
+- 매수 신호는 하락률이 기준을 새로 넘은 날과, 기준을 넘은 상태에서 투자금이 들어온 날입니다.
+- 신호일에 모아 둔 현금을 모두 쓰므로 매수 금액은 누적 투자금의 차이(직전 신호 이후 적립분)가 되고,
+  직전 신호 위치는 np.maximum.accumulate 로 한 번에 구합니다.
+- 보유 수량은 유보 비율에 대해 선형이므로 (하락률 기준별 하락 매수분, 정기 매수분) 두 가지만 계산해
+  격자 전체를 배열 연산으로 만듭니다.
+
+종목은 비중대로 나눈 별도 계좌로 보고 소수 주 매수를 허용합니다 (/dca 의 정수 주 매수와는 조금 다를 수 있음).
+"""
+import logging
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+import market_data
+import tracing
+from backtest_engine import NoPriceData, PriceSeries, aligned_prices, investment_schedule, load_panel
+
+logger = logging.getLogger("stock-api.backtest")
+
+
+def _rolling_peak(dates: np.ndarray, highs: np.ndarray, peak_days: int) -> np.ndarray:
+    """날짜별 기간 최고가 (peak_days 이내 고가의 최고값, 0 이면 누적 최고가)"""
+    highs = np.where(np.isfinite(highs), highs, -np.inf)
+    if peak_days <= 0:
+        return np.maximum.accumulate(highs)
+    window = pd.Series(highs, index=pd.DatetimeIndex(dates)).rolling(f"{peak_days}D")
+    return window.max().to_numpy()
+
+
+def drawdowns(series: PriceSeries, start_date: str, end_date: str, peak_days: int) -> np.ndarray:
+    """
+    거래일별 기간 고점 대비 하락률 (0 ~ 1)
+
+    기간 고점은 시작일 이전 peak_days 동안의 시세까지 포함해 현지 통화 고가로 구합니다.
+    """
+    lookback = pd.Timestamp(start_date) - pd.Timedelta(days=max(peak_days, 0))
+    history = market_data.get_price_history(series.symbol, lookback.strftime("%Y-%m-%d"), end_date)
+    column = "High" if "High" in history.columns else "Close"
+    dates = history.index.values.astype("datetime64[ns]")
+    peaks = _rolling_peak(dates, history[column].to_numpy(dtype=np.float64), peak_days)
+
+    positions = np.searchsorted(dates, series.dates, "right") - 1
+    peak = np.where(positions >= 0, peaks[np.maximum(positions, 0)], -np.inf)
+    # 고가가 종가보다 낮게 기록된 날도 있으므로 당일 종가까지 고점에 포함
+    peak = np.maximum(peak, series.local_close)
+    return 1.0 - series.local_close / peak
+
+
+def contributions(series: PriceSeries, start_date: str, end_date: str, initial_amount: float, investment_amount: float, frequency: str) -> np.ndarray:
+    """거래일별 들어오는 투자금 (투자일 이후 첫 거래일에 반영, 초기 투자금은 시작일)"""
+    schedule = investment_schedule(start_date, end_date, frequency).values.astype("datetime64[ns]")
+    dates = np.concatenate([np.array([pd.Timestamp(start_date)], dtype="datetime64[ns]"), schedule])
+    amounts = np.concatenate([[initial_amount], np.full(len(schedule), investment_amount)])
+    positions = np.searchsorted(series.dates, dates, "left")
+    valid = positions < len(series)
+    return np.bincount(positions[valid], weights=amounts[valid], minlength=len(series)).astype(np.float64)
+
+
+def dip_buys(drawdown: np.ndarray, contributed: np.ndarray, thresholds: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    기준 하락률별 신호와 모아 둔 현금 전부를 신호일에 매수할 때의 매수 금액
+
+    반환 (모두 [기준, 거래일]): events 매수 신호, deployed 신호일 매수 금액, reserve 매수하지 않고 남은 현금
+    """
+    n = len(drawdown)
+    signal = drawdown[None, :] >= thresholds[:, None]
+    crossed = signal & ~np.concatenate([np.zeros((len(thresholds), 1), dtype=bool), signal[:, :-1]], axis=1)
+    events = crossed | (signal & (contributed > 0)[None, :])
+
+    # 누적 투자금 (padded[k + 1] = k 일까지의 누적, padded[0] = 0)
+    padded = np.concatenate([[0.0], np.cumsum(contributed)])
+    last = np.maximum.accumulate(np.where(events, np.arange(n)[None, :], -1), axis=1)
+    previous = np.concatenate([np.full((len(thresholds), 1), -1), last[:, :-1]], axis=1)
+
+    deployed = np.where(events, padded[1:][None, :] - padded[previous + 1], 0.0)
+    reserve = padded[1:][None, :] - padded[last + 1]
+    return {"events": events, "deployed": deployed, "reserve": reserve}
+
+
+def _max_drawdown(values: np.ndarray) -> np.ndarray:
+    """마지막 축 방향 평가액의 최대 낙폭 (%)"""
+    peak = np.maximum.accumulate(values, axis=-1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        drawdown = np.where(peak > 0, 1.0 - values / peak, 0.0)
+    return drawdown.max(axis=-1) * 100.0
+
+
+def dip_backtest(
+    symbols: List[str],
+    allocation: Dict[str, float],
+    start_date: str,
+    end_date: str,
+    initial_amount: float,
+    investment_amount: float,
+    frequency: str,
+    fee_rate: float,
+    currency: str,
+    thresholds: List[float],
+    reserve_pcts: List[float],
+    peak_days: int,
+) -> Dict:
+    """
+    하락률 기준 x 유보 비율 격자별 결과와 일반 적립식 투자 비교
+
+    thresholds 는 기준 하락률(%), reserve_pcts 는 투자금 중 하락 매수용으로 유보하는 비율(%)입니다 (각각 중복 없이).
+    프로세스 풀에서 실행되므로 결과는 JSON 으로 바로 보낼 수 있는 기본 타입만 사용합니다.
+    """
+    with tracing.span("backtest.load_series", symbols=len(symbols), currency=currency):
+        price_data = load_panel(symbols, start_date, end_date, currency)
+    held = [s for s in symbols if s in price_data and allocation.get(s, 0) > 0]
+    if not held:
+        raise NoPriceData("요청한 종목들에 대한 데이터를 찾을 수 없습니다.")
+
+    columns = [price_data[s] for s in held]
+    levels = np.array(thresholds, dtype=np.float64) / 100.0
+    ratios = np.array(reserve_pcts, dtype=np.float64) / 100.0
+    keep = 1.0 - fee_rate / 100.0
+
+    with tracing.span("compute.dip_grid", symbols=len(held), cells=len(levels) * len(ratios)):
+        calendar, prices = aligned_prices(columns)
+        # [기준, 유보 비율, 날짜] 평가액과 남은 현금, 정기 매수만 한 경우의 [날짜] 평가액
+        values = np.zeros((len(levels), len(ratios), len(calendar)))
+        cash = np.zeros((len(levels), len(ratios), len(calendar)))
+        dca_values = np.zeros(len(calendar))
+        invested = np.zeros(len(calendar))
+        buy_days = np.zeros(len(levels), dtype=np.int64)
+        symbol_stats = []
+
+        for j, s in enumerate(columns):
+            weight = allocation[held[j]] / 100.0
+            contributed = contributions(s, start_date, end_date, initial_amount, investment_amount, frequency) * weight
+            drawdown = drawdowns(s, start_date, end_date, peak_days)
+            dips = dip_buys(drawdown, contributed, levels)
+
+            dca_shares = np.cumsum(contributed * keep / s.close)
+            dip_shares = np.cumsum(dips["deployed"] * keep / s.close[None, :], axis=1)
+
+            # 종목 거래일 -> 공통 달력 (상장 전은 평가액 0)
+            positions = np.searchsorted(s.dates, calendar, "right") - 1
+            listed = positions >= 0
+            positions = np.maximum(positions, 0)
+            price = np.where(listed, prices[:, j], 0.0)
+
+            dca_value = np.where(listed, dca_shares[positions], 0.0) * price
+            dip_value = np.where(listed[None, :], dip_shares[:, positions], 0.0) * price[None, :]
+            reserve = np.where(listed[None, :], dips["reserve"][:, positions], 0.0)
+
+            values += (1.0 - ratios)[None, :, None] * dca_value[None, None, :]
+            values += ratios[None, :, None] * (dip_value + reserve)[:, None, :]
+            cash += ratios[None, :, None] * reserve[:, None, :]
+            dca_values += dca_value
+            invested += np.where(listed, np.cumsum(contributed)[positions], 0.0)
+            buy_days += dips["events"].sum(axis=1)
+
+            symbol_stats.append(
+                {
+                    "symbol": s.symbol,
+                    "currency": s.currency,
+                    "current_drawdown": round(float(drawdown[-1]) * 100, 4),
+                    "max_drawdown": round(float(drawdown.max()) * 100, 4),
+                    "signal_days": {
+                        f"{thresholds[t]:g}": int(dips["events"][t].sum()) for t in range(len(levels))
+                    },
+                }
+            )
+
+        max_drawdown = _max_drawdown(values)
+        dca_max_drawdown = float(_max_drawdown(dca_values))
+
+    total_invested = float(invested[-1])
+    dca_final = float(dca_values[-1])
+
+    def _pct(value: float) -> float:
+        return round((value / total_invested - 1) * 100, 4) if total_invested > 0 else 0.0
+
+    grid = []
+    for t, threshold in enumerate(thresholds):
+        for r, reserve_pct in enumerate(reserve_pcts):
+            final = float(values[t, r, -1])
+            grid.append(
+                {
+                    "threshold": threshold,
+                    "reserve_pct": reserve_pct,
+                    "final_value": final,
+                    "total_profit_pct": _pct(final),
+                    "excess_value": final - dca_final,
+                    "excess_pct": round((final / dca_final - 1) * 100, 4) if dca_final > 0 else 0.0,
+                    "cash_balance": float(cash[t, r, -1]),
+                    # 평가액 중 현금 비중 평균 (하락을 기다리며 쉬는 돈)
+                    "avg_cash_pct": round(
+                        float(np.mean(np.divide(cash[t, r], values[t, r], out=np.zeros(len(calendar)), where=values[t, r] > 0)))
+                        * 100,
+                        4,
+                    ),
+                    "buy_days": int(buy_days[t]) if reserve_pct > 0 else 0,
+                    "max_drawdown": round(float(max_drawdown[t, r]), 4),
+                }
+            )
+
+    best = max(grid, key=lambda cell: cell["final_value"])
+    best_t, best_r = thresholds.index(best["threshold"]), reserve_pcts.index(best["reserve_pct"])
+    schedule = investment_schedule(start_date, end_date, frequency).values.astype("datetime64[ns]")
+    # 평가액 추이는 투자일과 마지막 거래일만
+    sample = np.unique(np.append(np.searchsorted(calendar, schedule, "right") - 1, len(calendar) - 1))
+    sample = sample[sample >= 0]
+    dates = np.datetime_as_string(calendar, unit="D")
+
+    return {
+        "summary": {
+            "start_date": str(dates[0]),
+            "end_date": str(dates[-1]),
+            "currency": currency,
+            "symbols": held,
+            "missing": [s for s in symbols if s not in price_data],
+            "peak_days": peak_days,
+            "trading_days": len(calendar),
+            "total_invested": total_invested,
+            "cells": len(grid),
+        },
+        "dca": {
+            "final_value": dca_final,
+            "total_profit_pct": _pct(dca_final),
+            "max_drawdown": round(dca_max_drawdown, 4),
+        },
+        "best": best,
+        "grid": grid,
+        "symbols": symbol_stats,
+        "value_history": [
+            {
+                "date": str(dates[i]),
+                "invested": float(invested[i]),
+                "dca": float(dca_values[i]),
+                "best": float(values[best_t, best_r, i]),
+            }
+            for i in sample.tolist()
+        ],
+    }
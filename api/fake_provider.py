@@ -0,0 +1,166 @@
+"""
+오프라인 가짜 데이터 제공자 (부하 테스트/개발용)
+
+STOCK_DATA_PROVIDER=fake 로 실행하면 market_data 가 FinanceDataReader 대신 이 모듈을 사용합니다.
+StockListing/DataReader 와 같은 형식의 결과를 네트워크 없이 만들며,
+같은 심볼은 어느 프로세스에서나 같은 시세(심볼 기반 시드의 기하 브라운 운동)를 돌려줍니다.
+FAKE_PROVIDER_LATENCY_MS 로 업스트림 응답 지연을 흉내 낼 수 있습니다.
+"""
+import threading
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+
+# 시세 시작일 (이전 요청은 이 날짜부터 반환)
+HISTORY_START = "2000-01-03"
+
+# 시장별 코드 시작 번호 (시장 간 심볼이 겹치지 않도록)
+_KR_MARKETS = {"KOSPI": 0, "KOSDAQ": 200000, "ETF/KR": 400000}
+_US_MARKETS = {"NASDAQ": 0, "NYSE": 200000, "AMEX": 400000, "ETF/US": 600000}
+
+# 실제 요청 예시가 그대로 동작하도록 각 시장 앞쪽에 두는 종목
+_KNOWN = {
+    "KOSPI": [("005930", "삼성전자"), ("000660", "SK하이닉스"), ("035420", "NAVER"), ("005380", "현대차")],
+    "KOSDAQ": [("035720", "카카오"), ("247540", "에코프로비엠"), ("091990", "셀트리온헬스케어")],
+    "ETF/KR": [("069500", "KODEX 200"), ("102110", "TIGER 200")],
+    "NASDAQ": [("AAPL", "Apple Inc"), ("MSFT", "Microsoft Corp"), ("NVDA", "NVIDIA Corp"), ("AMZN", "Amazon.com Inc")],
+    "NYSE": [("KO", "Coca-Cola Co"), ("IBM", "International Business Machines"), ("JPM", "JPMorgan Chase & Co")],
+    "AMEX": [("IMO", "Imperial Oil Ltd")],
+    "ETF/US": [("SPY", "SPDR S&P 500 ETF Trust"), ("QQQ", "Invesco QQQ Trust")],
+}
+
+_KR_HEADS = ["삼성", "현대", "한화", "대한", "동양", "신한", "한국", "세아", "대성", "동화", "한일", "태양", "우리", "미래", "서울", "부산"]
+_KR_TAILS = ["전자", "화학", "바이오", "제약", "건설", "중공업", "에너지", "금융", "증권", "반도체", "소재", "식품", "물산", "테크", "로직스", "솔루션"]
+_KR_ETF_BRANDS = ["KODEX", "TIGER", "KBSTAR", "ARIRANG", "HANARO", "SOL"]
+_US_HEADS = ["Global", "American", "United", "First", "Pacific", "Atlantic", "Summit", "Pioneer", "Apex", "Northern", "Silver", "Blue"]
+_US_TAILS = ["Systems", "Holdings", "Therapeutics", "Energy", "Financial", "Technologies", "Industries", "Networks", "Brands", "Capital", "Labs", "Motors"]
+_US_SUFFIXES = ["Inc", "Corp", "Co", "Group", "Ltd"]
+
+_FX_BASE = {"KRW": 1300.0, "JPY": 140.0, "EUR": 0.92, "CNY": 7.1}
+
+_listings: Dict[str, pd.DataFrame] = {}
+_symbols: Dict[str, str] = {}
+_listings_lock = threading.Lock()
+
+
+def _latency() -> None:
+    if config.FAKE_PROVIDER_LATENCY_MS > 0:
+        time.sleep(config.FAKE_PROVIDER_LATENCY_MS / 1000.0)
+
+
+def _ticker(number: int) -> str:
+    """번호를 알파벳 심볼로 (0 → A, 26 → AA ...)"""
+    letters = []
+    number += 1
+    while number > 0:
+        number, rest = divmod(number - 1, 26)
+        letters.append(chr(ord("A") + rest))
+    return "".join(reversed(letters))
+
+
+def _generate(market: str) -> List[Tuple[str, str]]:
+    count = max(config.FAKE_PROVIDER_SYMBOLS, len(_KNOWN[market]))
+    rows = list(_KNOWN[market])
+    used = {symbol for symbol, _ in rows}
+    used_names = {name for _, name in rows}
+    i = 0
+    while len(rows) < count:
+        if market in _KR_MARKETS:
+            symbol = f"{_KR_MARKETS[market] + 1000 + i * 7:06d}"
+            if market == "ETF/KR":
+                name = f"{_KR_ETF_BRANDS[i % len(_KR_ETF_BRANDS)]} {_KR_HEADS[(i // 6) % len(_KR_HEADS)]}{_KR_TAILS[(i // 96) % len(_KR_TAILS)]} {i}"
+            else:
+                name = f"{_KR_HEADS[i % len(_KR_HEADS)]}{_KR_TAILS[(i // len(_KR_HEADS)) % len(_KR_TAILS)]}"
+                if i >= len(_KR_HEADS) * len(_KR_TAILS):
+                    name += str(i // (len(_KR_HEADS) * len(_KR_TAILS)))
+        else:
+            symbol = _ticker(_US_MARKETS[market] + 1000 + i)
+            name = (
+                f"{_US_HEADS[i % len(_US_HEADS)]} {_US_TAILS[(i // len(_US_HEADS)) % len(_US_TAILS)]} "
+                f"{_US_SUFFIXES[i % len(_US_SUFFIXES)]}"
+            )
+            if i >= len(_US_HEADS) * len(_US_TAILS):
+                name += f" {i // (len(_US_HEADS) * len(_US_TAILS))}"
+        i += 1
+        if symbol not in used and name not in used_names:
+            used.add(symbol)
+            used_names.add(name)
+            rows.append((symbol, name))
+    return rows
+
+
+def _listing(market: str) -> pd.DataFrame:
+    with _listings_lock:
+        df = _listings.get(market)
+        if df is None:
+            rows = _generate(market)
+            symbols = [symbol for symbol, _ in rows]
+            names = [name for _, name in rows]
+            if market in _KR_MARKETS and market != "ETF/KR":
+                df = pd.DataFrame({"Code": symbols, "Name": names, "Market": market})
+            else:
+                df = pd.DataFrame({"Symbol": symbols, "Name": names})
+            _listings[market] = df
+            for symbol in symbols:
+                _symbols.setdefault(symbol, market)
+        return df
+
+
+def StockListing(market: str) -> pd.DataFrame:
+    """종목 목록 (지원하지 않는 시장은 fdr 처럼 예외)"""
+    _latency()
+    if market not in _KNOWN:
+        raise ValueError(f"fake provider: unsupported market {market}")
+    return _listing(market).copy()
+
+
+def _known_symbol(symbol: str) -> bool:
+    with _listings_lock:
+        if symbol in _symbols:
+            return True
+    for market in _KNOWN:
+        _listing(market)
+    with _listings_lock:
+        return symbol in _symbols
+
+
+def DataReader(symbol: str, start=None, end=None) -> pd.DataFrame:
+    """일별 시세 (Open/High/Low/Close/Volume/Change, 없는 심볼은 예외)"""
+    _latency()
+    if "/" in symbol:
+        base, quote = symbol.split("/", 1)
+        if base != "USD" or quote not in _FX_BASE:
+            raise ValueError(f"fake provider: unsupported pair {symbol}")
+        level, drift, volatility = _FX_BASE[quote], 0.0, 0.005
+    elif _known_symbol(symbol):
+        level = 50000.0 if symbol.isdigit() else 100.0
+        drift, volatility = 0.0003, 0.018
+    else:
+        raise ValueError(f"fake provider: unknown symbol {symbol}")
+
+    dates = pd.bdate_range(HISTORY_START, pd.Timestamp(datetime.now().date()), name="Date")
+    rng = np.random.default_rng(zlib.crc32(symbol.encode("utf-8")))
+    returns = rng.normal(drift, volatility, len(dates))
+    close = level * np.exp(np.cumsum(returns))
+    spread = np.abs(rng.normal(0.0, volatility / 2, len(dates)))
+    df = pd.DataFrame(
+        {
+            "Open": close * (1 - spread / 2),
+            "High": close * (1 + spread),
+            "Low": close * (1 - spread),
+            "Close": close,
+            "Volume": rng.integers(10_000, 5_000_000, len(dates)).astype(np.float64),
+            "Change": np.concatenate([[0.0], np.expm1(returns[1:])]),
+        },
+        index=dates,
+    )
+
+    lo = pd.Timestamp(start) if start else dates[0]
+    hi = pd.Timestamp(end) if end else dates[-1]
+    return df[(df.index >= lo) & (df.index <= hi)]
@@ -0,0 +1,259 @@
+"""
+오타 허용 종목 검색 (SymSpell 방식 삭제 사전)
+
+심볼, 공백을 뺀 종목명 전체, 종목명의 각 단어를 검색 term 으로 만들고
+각 term 앞부분에서 글자를 최대 2개까지 지운 변형을 미리 색인합니다.
+검색어도 같은 방식으로 변형을 만들어 색인을 조회하므로
+조회 횟수는 종목 수와 관계없이 검색어 길이로만 제한됩니다.
+"""
+import re
+import threading
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+import memory
+from listing_changes import ListingDiff, diff_tables
+from symbol_table import SymbolTable, normalize_key
+
+# 삭제 변형을 만들 term 앞부분 길이 (SymSpell prefix length)
+PREFIX_LENGTH = 7
+# 한 번의 검색에서 거리 계산할 최대 term 수
+MAX_CANDIDATES = 2000
+
+_WORD_SPLIT = re.compile(r"[\s\-_.,&()/'\"]+")
+
+
+def max_distance(length: int) -> int:
+    """term 길이에 따른 허용 편집 거리"""
+    if length <= 3:
+        return 0
+    if length <= 6:
+        return 1
+    return 2
+
+
+def _deletes(term: str, distance: int) -> Set[str]:
+    """term 앞부분에서 글자를 distance 개까지 지운 변형 (원본 포함)"""
+    prefix = term[:PREFIX_LENGTH]
+    result = {prefix}
+    frontier = {prefix}
+    for _ in range(distance):
+        next_frontier = set()
+        for word in frontier:
+            if len(word) <= 1:
+                continue
+            for i in range(len(word)):
+                next_frontier.add(word[:i] + word[i + 1 :])
+        result |= next_frontier
+        frontier = next_frontier
+    return result
+
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """인접 글자 바꿈을 포함한 편집 거리 (limit 초과 시 limit + 1)"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    prev_prev = None
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = current[0]
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, current[j - 1] + 1, prev[j - 1] + cost)
+            if (
+                prev_prev is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                value = min(value, prev_prev[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        prev_prev, prev = prev, current
+
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+def _terms(symbol: str, name: str) -> Set[str]:
+    terms = {normalize_key(symbol), normalize_key(name)}
+    for word in _WORD_SPLIT.split(name):
+        word = normalize_key(word)
+        if len(word) >= 3:
+            terms.add(word)
+    terms.discard("")
+    return terms
+
+
+def _variant_hashes(terms: List[str], first_id: int) -> Tuple[np.ndarray, np.ndarray]:
+    """term 들의 삭제 변형 해시와 term 번호 (해시 기준 정렬)"""
+    hashes = []
+    term_ids = []
+    for term_id, term in enumerate(terms, first_id):
+        for variant in _deletes(term, max_distance(len(term))):
+            hashes.append(hash(variant))
+            term_ids.append(term_id)
+    order = np.argsort(np.array(hashes, dtype=np.int64), kind="stable")
+    return np.array(hashes, dtype=np.int64)[order], np.array(term_ids, dtype=np.int32)[order]
+
+
+class FuzzyIndex:
+    """한 시장 심볼 테이블에 대한 삭제 사전"""
+
+    def __init__(
+        self,
+        table: SymbolTable,
+        terms: List[str],
+        term_ids: np.ndarray,
+        rows: np.ndarray,
+        hashes: np.ndarray,
+        hash_term_ids: np.ndarray,
+    ):
+        """(term 번호, 종목 행) 쌍과 삭제 변형 해시로 색인 구성"""
+        self.table = table
+        self._terms = terms
+
+        # term 별 종목 행 (CSR 형태)
+        order = np.argsort(term_ids, kind="stable")
+        self._row_offsets = np.zeros(len(terms) + 1, dtype=np.int64)
+        self._row_offsets[1:] = np.cumsum(np.bincount(term_ids, minlength=len(terms)))
+        self._rows = rows[order].astype(np.int32)
+
+        # 삭제 변형 해시 -> term 번호 (해시 기준 정렬)
+        self._hashes = hashes
+        self._term_ids = hash_term_ids
+
+    @classmethod
+    def build(cls, table: SymbolTable) -> "FuzzyIndex":
+        term_rows: Dict[str, List[int]] = {}
+        for record in table:
+            for term in _terms(record.symbol, record.name):
+                term_rows.setdefault(term, []).append(record.row)
+
+        terms = list(term_rows)
+        term_ids = np.repeat(np.arange(len(terms), dtype=np.int64), [len(rows) for rows in term_rows.values()])
+        rows = np.array([row for rows in term_rows.values() for row in rows], dtype=np.int32)
+        return cls(table, terms, term_ids, rows, *_variant_hashes(terms, 0))
+
+    def updated(self, table: SymbolTable, diff: ListingDiff) -> "FuzzyIndex":
+        """
+        종목 목록 변경분만 반영한 새 색인
+
+        기존 (term, 행) 쌍은 행 번호만 옮기고, 신규/이름 변경 종목의 term 만 추가합니다.
+        삭제 변형은 처음 나온 term 에 대해서만 만들어 정렬 위치에 끼워 넣습니다.
+        종목이 모두 빠진 term 은 남지만 조회 결과에는 나타나지 않습니다.
+        """
+        term_ids = np.repeat(np.arange(len(self._terms), dtype=np.int64), np.diff(self._row_offsets))
+        rows = diff.row_map()[self._rows]
+        keep = rows >= 0
+
+        terms = list(self._terms)
+        term_index = {term: term_id for term_id, term in enumerate(terms)}
+        fresh_term_ids = []
+        fresh_rows = []
+        for row in diff.fresh_rows().tolist():
+            record = table.record(row)
+            for term in _terms(record.symbol, record.name):
+                term_id = term_index.get(term)
+                if term_id is None:
+                    term_id = term_index[term] = len(terms)
+                    terms.append(term)
+                fresh_term_ids.append(term_id)
+                fresh_rows.append(row)
+
+        hashes, hash_term_ids = _variant_hashes(terms[len(self._terms) :], len(self._terms))
+        positions = np.searchsorted(self._hashes, hashes, side="right")
+        return FuzzyIndex(
+            table,
+            terms,
+            np.concatenate([term_ids[keep], np.array(fresh_term_ids, dtype=np.int64)]),
+            np.concatenate([rows[keep], np.array(fresh_rows, dtype=np.int64)]),
+            np.insert(self._hashes, positions, hashes),
+            np.insert(self._term_ids, positions, hash_term_ids),
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            self._hashes.nbytes
+            + self._term_ids.nbytes
+            + self._rows.nbytes
+            + self._row_offsets.nbytes
+        )
+
+    def _candidate_terms(self, query_term: str) -> Set[int]:
+        candidates: Set[int] = set()
+        for variant in _deletes(query_term, max_distance(len(query_term))):
+            key = hash(variant)
+            lo = int(np.searchsorted(self._hashes, key, side="left"))
+            hi = int(np.searchsorted(self._hashes, key, side="right"))
+            candidates.update(self._term_ids[lo:hi].tolist())
+            if len(candidates) >= MAX_CANDIDATES:
+                break
+        return candidates
+
+    def lookup(self, query: str) -> Dict[int, int]:
+        """편집 거리 이내로 일치하는 종목 행 -> 최소 거리"""
+        query_terms = {normalize_key(query)}
+        words = [normalize_key(w) for w in _WORD_SPLIT.split(query)]
+        if len(words) > 1:
+            query_terms.update(w for w in words if len(w) >= 3)
+        query_terms.discard("")
+
+        matches: Dict[int, int] = {}
+        for query_term in query_terms:
+            allowed = max_distance(len(query_term))
+            for term_id in self._candidate_terms(query_term):
+                term = self._terms[term_id]
+                limit = min(allowed, max_distance(len(term)))
+                distance = edit_distance(query_term, term, limit)
+                if distance > limit:
+                    continue
+                start, end = self._row_offsets[term_id], self._row_offsets[term_id + 1]
+                for row in self._rows[start:end].tolist():
+                    if distance < matches.get(row, distance + 1):
+                        matches[row] = distance
+        return matches
+
+
+# 시장별 색인 (심볼 테이블이 교체되면 변경분 반영 또는 다시 생성)
+_indexes: Dict[str, Tuple[SymbolTable, FuzzyIndex]] = {}
+_index_lock = threading.Lock()
+_usage = memory.UsageTracker()
+
+
+def get_fuzzy_index(table: SymbolTable) -> FuzzyIndex:
+    """심볼 테이블에 대한 삭제 사전 반환"""
+    _usage.touch(table.market)
+    with _index_lock:
+        cached = _indexes.get(table.market)
+        if cached and cached[0] is table:
+            return cached[1]
+
+        diff = diff_tables(cached[0], table) if cached else None
+        if diff is not None and diff.incremental:
+            index = cached[1].updated(table, diff)
+        else:
+            index = FuzzyIndex.build(table)
+        _indexes[table.market] = (table, index)
+        return index
+
+
+def _memory_entries() -> List[memory.Entry]:
+    with _index_lock:
+        entries = [(market, index.nbytes) for market, (_, index) in _indexes.items()]
+    return [(market, nbytes, *_usage.get(market)) for market, nbytes in entries]
+
+
+def _evict(market: str) -> None:
+    with _index_lock:
+        _indexes.pop(market, None)
+    _usage.forget(market)
+
+
+memory.register("fuzzy_index", _memory_entries, _evict)
@@ -0,0 +1,107 @@
+"""
+환율 시계열
+
+종목 통화를 기준 통화로 바꾸는 환율을 통화쌍별로 한 번만 받아 프로세스 안에 보관하고,
+임의의 거래일 배열에 대해 그 날짜 기준 마지막 환율을 한 번에 맞춰 줍니다.
+"""
+import logging
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+import market_data
+import memory
+
+logger = logging.getLogger("stock-api.fx")
+
+CURRENCIES = ["KRW", "USD"]
+
+# 첫 거래일 이전 환율을 찾기 위해 더 가져오는 기간 (휴장 대비)
+LOOKBACK_DAYS = 14
+
+# (기준, 대상) 통화쌍 → (가져온 시각, 시작일, 날짜 배열, 환율 배열)
+_series: Dict[Tuple[str, str], Tuple[float, pd.Timestamp, np.ndarray, np.ndarray]] = {}
+_series_lock = threading.Lock()
+_usage = memory.UsageTracker()
+
+
+def currency_of(symbol: str) -> str:
+    """종목 거래 통화 (시세 소스 기준)"""
+    return "KRW" if market_data.price_source(symbol) == "prices:KR" else "USD"
+
+
+def _close_series(pair: str, start: pd.Timestamp) -> Tuple[np.ndarray, np.ndarray]:
+    df = market_data.get_price_history(pair, start)
+    if df.empty or "Close" not in df.columns:
+        return np.empty(0, dtype="datetime64[ns]"), np.empty(0, dtype=np.float64)
+    closes = df["Close"].to_numpy(dtype=np.float64)
+    valid = np.isfinite(closes) & (closes > 0)
+    return df.index.values[valid].astype("datetime64[ns]"), closes[valid]
+
+
+def _load_pair(source: str, target: str, start: pd.Timestamp) -> Tuple[np.ndarray, np.ndarray]:
+    """source 1단위의 target 가격 (업스트림 통화쌍은 USD/XXX 형식만 사용)"""
+    if source == "USD":
+        dates, rates = _close_series(f"USD/{target}", start)
+    elif target == "USD":
+        dates, rates = _close_series(f"USD/{source}", start)
+        rates = 1.0 / rates
+    else:
+        raise ValueError(f"지원하지 않는 통화쌍입니다: {source}/{target}")
+    if len(dates) == 0:
+        raise ValueError(f"환율 {source}/{target} 데이터를 찾을 수 없습니다.")
+    return dates, rates
+
+
+def get_rates(source: str, target: str, start) -> Tuple[np.ndarray, np.ndarray]:
+    """통화쌍 환율 시계열 (날짜, 환율) - 요청 시작일을 포함하고 최신이면 보관된 값 사용"""
+    start = pd.Timestamp(start).normalize() - timedelta(days=LOOKBACK_DAYS)
+    key = (source, target)
+    _usage.touch(key)
+    with _series_lock:
+        entry = _series.get(key)
+    if (
+        entry is not None
+        and entry[1] <= start
+        and time.monotonic() - entry[0] < config.PRICE_REFRESH_SECONDS
+    ):
+        return entry[2], entry[3]
+
+    if entry is not None:
+        start = min(start, entry[1])
+    dates, rates = _load_pair(source, target, start)
+    with _series_lock:
+        _series[key] = (time.monotonic(), start, dates, rates)
+    return dates, rates
+
+
+def conversion_rates(source: str, target: str, dates: np.ndarray, start) -> np.ndarray:
+    """각 날짜에 source 통화 금액을 target 통화로 바꾸는 환율 (그 날짜 이전 마지막 환율)"""
+    if source == target or len(dates) == 0:
+        return np.ones(len(dates), dtype=np.float64)
+
+    fx_dates, fx_rates = get_rates(source, target, start)
+    positions = np.searchsorted(fx_dates, dates, "right") - 1
+    # 환율 시작 이전 날짜는 첫 환율 사용
+    return fx_rates[np.clip(positions, 0, len(fx_rates) - 1)]
+
+
+def _memory_entries() -> List[memory.Entry]:
+    with _series_lock:
+        entries = [(key, entry[2].nbytes + entry[3].nbytes) for key, entry in _series.items()]
+    return [("/".join(key), nbytes, *_usage.get(key)) for key, nbytes in entries]
+
+
+def _evict(name: str) -> None:
+    key = tuple(name.split("/"))
+    with _series_lock:
+        _series.pop(key, None)
+    _usage.forget(key)
+
+
+memory.register("fx_rates", _memory_entries, _evict)
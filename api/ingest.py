@@ -0,0 +1,244 @@
+"""
+시장 전체 시세 일괄 수집
+
+설정된 시장의 모든 종목에 대해 새 일봉을 가져와 공유 시세 스냅샷에 저장합니다.
+요청 경로에서 업스트림을 거의 호출하지 않도록 야간에 미리 채워 두는 용도입니다.
+
+- 동시 실행 수를 제한한 스레드 풀로 수집
+- 업스트림 장애는 지수 백오프로 재시도 (존재하지 않는 심볼은 재시도하지 않음)
+- 완료한 심볼을 체크포인트 파일에 기록하여 중단 후 다시 실행하면 이어서 수집
+- 시장별로 마지막 수집 대상 심볼은 가격 스냅샷 정리(PRICE_CACHE_MAX_SYMBOLS)에서 제외
+
+사용법 (api 디렉토리에서):
+    python ingest.py --markets KOSPI,KOSDAQ --concurrency 8
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+
+import config
+import market_data
+from resilience import BATCH, CircuitOpenError, SymbolNotFound, UpstreamUnavailable, priority
+
+logger = logging.getLogger("stock-api.ingest")
+
+INGEST = "ingest"
+
+DONE = "done"
+NOT_FOUND = "not_found"
+FAILED = "failed"
+
+
+def _run_id(markets: List[str], start: str) -> str:
+    """같은 날 같은 조건의 실행은 같은 체크포인트를 이어서 사용"""
+    digest = hashlib.sha1(f"{','.join(sorted(markets))}|{start}".encode("utf-8")).hexdigest()[:8]
+    return f"{datetime.now().strftime('%Y-%m-%d')}-{digest}"
+
+
+class Checkpoint:
+    """심볼별 수집 결과를 한 줄씩 추가 기록하는 체크포인트 파일"""
+
+    def __init__(self, path: str):
+        self.path = path
+        self.status: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        # 기록 도중 중단된 마지막 줄
+                        continue
+                    self.status[entry["symbol"]] = entry["status"]
+        self._file = open(path, "a", encoding="utf-8")
+
+    def finished(self, symbol: str) -> bool:
+        return self.status.get(symbol) in (DONE, NOT_FOUND)
+
+    def record(self, symbol: str, status: str) -> None:
+        with self._lock:
+            self.status[symbol] = status
+            self._file.write(json.dumps({"symbol": symbol, "status": status}) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _remove_old_checkpoints(directory: str, keep_days: int = 7) -> None:
+    """며칠 지난 체크포인트 파일 정리"""
+    if not os.path.isdir(directory):
+        return
+    cutoff = time.time() - keep_days * 24 * 60 * 60
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        try:
+            if os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def _collect_symbols(markets: List[str]) -> Dict[str, List[str]]:
+    """시장별 종목 목록의 심볼 (목록을 불러오지 못한 시장은 빠짐)"""
+    listed = {}
+    for market in markets:
+        try:
+            table = market_data.get_symbol_table(market)
+        except Exception as e:
+            logger.error(f"시장 {market} 종목 목록 조회 실패, 건너뜀: {str(e)}")
+            continue
+        listed[market] = [record.symbol for record in table if record.symbol]
+    return listed
+
+
+def ingest_symbol(symbol: str, start: str) -> str:
+    """한 종목 수집 (일괄 우선순위, 업스트림 장애 시 백오프 재시도)"""
+    for attempt in range(config.INGEST_MAX_RETRIES + 1):
+        try:
+            with priority(BATCH):
+                market_data.refresh_prices(symbol, start)
+            return DONE
+        except SymbolNotFound:
+            return NOT_FOUND
+        except UpstreamUnavailable as e:
+            if attempt >= config.INGEST_MAX_RETRIES:
+                logger.warning(f"심볼 {symbol} 수집 실패 (재시도 {attempt}회): {str(e)}")
+                return FAILED
+            if isinstance(e, CircuitOpenError):
+                # 서킷이 열려 있으면 시험 호출이 가능해질 때까지 대기
+                delay = config.CIRCUIT_RESET_SECONDS
+            else:
+                delay = config.INGEST_RETRY_BASE_SECONDS * (2 ** attempt)
+            time.sleep(delay * random.uniform(0.5, 1.5))
+        except Exception as e:
+            logger.warning(f"심볼 {symbol} 수집 중 오류 발생: {str(e)}")
+            return FAILED
+    return FAILED
+
+
+def run_ingestion(
+    markets: Optional[List[str]] = None,
+    start: Optional[str] = None,
+    concurrency: Optional[int] = None,
+    fresh: bool = False,
+) -> Dict:
+    """설정된 시장 전체 시세 수집 후 결과 요약 반환"""
+    markets = markets or config.INGEST_MARKETS
+    start = start or (datetime.now() - timedelta(days=config.INGEST_HISTORY_DAYS)).strftime("%Y-%m-%d")
+    concurrency = concurrency or config.INGEST_CONCURRENCY
+
+    run_id = _run_id(markets, start)
+    started = time.monotonic()
+
+    # 같은 조건의 실행이 동시에 돌면 나중 실행은 앞선 실행이 끝난 뒤 체크포인트만 확인
+    with market_data.cache.exclusive(INGEST, run_id):
+        directory = os.path.join(market_data.cache.root, INGEST)
+        _remove_old_checkpoints(directory)
+        path = os.path.join(directory, f"{run_id}.jsonl")
+        if fresh and os.path.exists(path):
+            os.remove(path)
+        checkpoint = Checkpoint(path)
+
+        with priority(BATCH):
+            listed = _collect_symbols(markets)
+        # 수집한 스냅샷이 PRICE_CACHE_MAX_SYMBOLS 정리로 지워지지 않도록 목록을 확인한 시장의 수집 대상 고정
+        market_data.pin_prices(listed)
+        symbols = list(dict.fromkeys(symbol for market in markets for symbol in listed.get(market, [])))
+        pending = [s for s in symbols if not checkpoint.finished(s)]
+        logger.info(
+            f"시세 일괄 수집 시작: 시장 {markets}, 종목 {len(symbols)}개 중 {len(pending)}개 남음, "
+            f"동시 실행 {concurrency}, 시작일 {start}"
+        )
+        counts = {DONE: 0, NOT_FOUND: 0, FAILED: 0}
+        try:
+            with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="ingest") as executor:
+                futures = {executor.submit(ingest_symbol, symbol, start): symbol for symbol in pending}
+                for i, future in enumerate(as_completed(futures), 1):
+                    status = future.result()
+                    checkpoint.record(futures[future], status)
+                    counts[status] += 1
+                    if i % 500 == 0:
+                        logger.info(f"시세 일괄 수집 진행: {i}/{len(pending)}")
+        finally:
+            checkpoint.close()
+
+    elapsed = time.monotonic() - started
+    logger.info(
+        f"시세 일괄 수집 완료: 성공 {counts[DONE]}, 없음 {counts[NOT_FOUND]}, 실패 {counts[FAILED]}, "
+        f"건너뜀 {len(symbols) - len(pending)}, {elapsed:.1f}초"
+    )
+    return {
+        "run_id": run_id,
+        "markets": markets,
+        "symbols": len(symbols),
+        "skipped": len(symbols) - len(pending),
+        "succeeded": counts[DONE],
+        "not_found": counts[NOT_FOUND],
+        "failed": counts[FAILED],
+        "elapsed_seconds": round(elapsed, 1),
+    }
+
+
+# ======== 예약 실행 ========
+def _seconds_until(clock: str) -> float:
+    """다음 HH:MM (서버 시간)까지 남은 초"""
+    hour, minute = (int(part) for part in clock.split(":"))
+    now = datetime.now()
+    target = now.replace(hour=hour, minute=minute, second=0, microsecond=0)
+    if target <= now:
+        target += timedelta(days=1)
+    return (target - now).total_seconds()
+
+
+def _schedule_loop() -> None:
+    while True:
+        time.sleep(_seconds_until(config.INGEST_SCHEDULE))
+        try:
+            # 쓰기 담당 워커만 수집
+            if market_data.cache.try_acquire_writer():
+                run_ingestion()
+        except Exception as e:
+            logger.error(f"예약된 시세 일괄 수집 중 오류 발생: {str(e)}")
+
+
+def start_scheduled_ingestion() -> Optional[threading.Thread]:
+    """INGEST_SCHEDULE 이 설정된 경우 매일 해당 시각에 일괄 수집하는 스레드 시작"""
+    if not config.INGEST_SCHEDULE:
+        return None
+    thread = threading.Thread(target=_schedule_loop, name="ingest-schedule", daemon=True)
+    thread.start()
+    logger.info(f"시세 일괄 수집 예약: 매일 {config.INGEST_SCHEDULE}")
+    return thread
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="시장 전체 시세 일괄 수집")
+    parser.add_argument("--markets", help="쉼표로 구분된 시장 목록 (기본: INGEST_MARKETS)")
+    parser.add_argument("--start", help="수집 시작일 YYYY-MM-DD (기본: INGEST_HISTORY_DAYS 전)")
+    parser.add_argument("--concurrency", type=int, help="동시 수집 종목 수 (기본: INGEST_CONCURRENCY)")
+    parser.add_argument("--fresh", action="store_true", help="오늘 체크포인트를 무시하고 처음부터 수집")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    markets = [m.strip() for m in args.markets.split(",")] if args.markets else None
+    result = run_ingestion(markets, args.start, args.concurrency, args.fresh)
+    print(json.dumps(result, ensure_ascii=False, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+"""
+백테스트 비동기 작업
+
+작업 상태와 결과는 공유 캐시 디렉토리의 JSON 파일로 저장하므로 어느 워커에서든 조회할 수 있습니다.
+작업은 제출한 워커의 스레드에서 준비(시세 조회 등)와 대기를 하고 계산은 공용 프로세스 풀에서 실행하며,
+끝난 작업은 JOB_RESULT_TTL_SECONDS 동안 보관합니다.
+"""
+import asyncio
+import json
+import logging
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Optional
+
+import config
+
+logger = logging.getLogger("stock-api.jobs")
+
+QUEUED = "queued"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+# 결과를 기다리는 동안 상태 파일을 다시 읽는 간격 (초)
+POLL_INTERVAL = 0.2
+# 오래된 작업 파일 정리 주기 (초)
+PURGE_INTERVAL = 60
+
+
+class JobQueueFull(Exception):
+    """이 워커에서 진행 중인 작업 수가 한도에 도달함"""
+
+
+class JobStore:
+    """작업 상태 파일 저장소 (쓰기는 임시 파일 교체로 원자적)"""
+
+    def __init__(self, root: str, ttl: float):
+        self.root = root
+        self.ttl = ttl
+        self._last_purge = 0.0
+        os.makedirs(root, exist_ok=True)
+
+    def path(self, job_id: str) -> str:
+        return os.path.join(self.root, f"{job_id}.json")
+
+    def write(self, job: Dict) -> None:
+        path = self.path(job["id"])
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(tmp, path)
+
+    def read(self, job_id: str) -> Optional[Dict]:
+        # 경로 조작 방지
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self.path(job_id), encoding="utf-8") as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def purge(self) -> None:
+        """TTL 이 지난 작업 파일 삭제 (주기당 한 번)"""
+        now = time.time()
+        if now - self._last_purge < PURGE_INTERVAL:
+            return
+        self._last_purge = now
+        for name in os.listdir(self.root):
+            path = os.path.join(self.root, name)
+            try:
+                if now - os.path.getmtime(path) > self.ttl:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+store = JobStore(os.path.join(config.CACHE_DIR, "jobs"), config.JOB_RESULT_TTL_SECONDS)
+
+_runner = ThreadPoolExecutor(max_workers=config.JOB_MAX_ACTIVE, thread_name_prefix="job")
+_active = 0
+_active_lock = threading.Lock()
+
+
+def _public(job: Dict) -> Dict:
+    return {key: value for key, value in job.items() if key != "result"}
+
+
+def submit(kind: str, task: Callable[[Callable[[float], None]], Dict]) -> Dict:
+    """
+    작업 제출 후 작업 정보 반환
+
+    task 는 진행률 콜백(0~1)을 받아 JSON 으로 저장 가능한 결과를 반환하는 함수입니다.
+    """
+    global _active
+    with _active_lock:
+        if _active >= config.JOB_MAX_ACTIVE:
+            raise JobQueueFull(f"진행 중인 작업이 {_active}개로 한도에 도달했습니다.")
+        _active += 1
+
+    store.purge()
+    job = {
+        "id": uuid.uuid4().hex,
+        "kind": kind,
+        "status": QUEUED,
+        "progress": 0.0,
+        "submitted_at": time.time(),
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+        "status_code": None,
+    }
+    store.write(job)
+
+    def _progress(fraction: float) -> None:
+        job["progress"] = round(min(max(fraction, 0.0), 1.0), 4)
+        store.write(job)
+
+    def _run() -> None:
+        global _active
+        try:
+            job["status"] = RUNNING
+            job["started_at"] = time.time()
+            store.write(job)
+
+            result = task(_progress)
+            job.update(status=DONE, progress=1.0, result=result)
+        except Exception as e:
+            status_code = getattr(e, "status_code", 500)
+            detail = getattr(e, "detail", None) or str(e)
+            if status_code >= 500:
+                logger.error(f"작업 {job['id']} ({kind}) 실패: {str(e)}\n{traceback.format_exc()}")
+            job.update(status=FAILED, error=detail, status_code=status_code)
+        finally:
+            job["finished_at"] = time.time()
+            try:
+                store.write(job)
+            finally:
+                with _active_lock:
+                    _active -= 1
+
+    _runner.submit(_run)
+    logger.info(f"작업 제출: {job['id']} ({kind})")
+    return _public(job)
+
+
+async def wait(job_id: str, timeout: float) -> Optional[Dict]:
+    """작업이 끝나거나 timeout 초가 지날 때까지 기다린 뒤 작업 정보 반환 (없으면 None)"""
+    deadline = time.monotonic() + max(0.0, min(timeout, config.JOB_MAX_WAIT_SECONDS))
+    while True:
+        job = store.read(job_id)
+        if job is None or job["status"] in (DONE, FAILED) or time.monotonic() >= deadline:
+            return job
+        await asyncio.sleep(POLL_INTERVAL)
@@ -0,0 +1,184 @@
+"""
+종목 목록 변경분 계산과 변경 내역 로그
+
+종목 목록을 갱신할 때 이전 심볼 테이블과 비교해 신규 상장/상장 폐지/종목명 변경만 골라냅니다.
+- 목록이 그대로면 스냅샷을 다시 쓰지 않으므로 워커들의 매핑과 검색 색인이 그대로 유지됨
+- 바뀐 경우 시장별 버전을 올리고 변경분을 로그 파일에 남겨 /changes?since= 로 내려줌
+- 자동완성/오타 허용 색인은 전체를 다시 만들지 않고 변경된 행만 반영 (incremental 인 경우)
+"""
+import json
+import os
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from symbol_table import SymbolRecord, SymbolTable
+
+
+class ListingDiff:
+    """이전/새 심볼 테이블 사이의 변경 (행 번호 기준)"""
+
+    __slots__ = ("old", "new", "remap", "added", "removed", "renamed")
+
+    def __init__(self, old: SymbolTable, new: SymbolTable):
+        self.old = old
+        self.new = new
+        # 이전 행 -> 새 행 (상장 폐지는 -1)
+        self.remap = old.row_map(new)
+
+        matched = self.remap >= 0
+        targets = np.zeros(len(new), dtype=bool)
+        targets[self.remap[matched]] = True
+        self.added = np.flatnonzero(~targets)
+        self.removed = np.flatnonzero(~matched)
+
+        old_names = old.names.tolist()
+        new_names = new.names.tolist()
+        common = np.flatnonzero(matched)
+        renamed = [
+            (row, target)
+            for row, target in zip(common.tolist(), self.remap[common].tolist())
+            if old_names[row] != new_names[target]
+        ]
+        self.renamed = np.array(renamed, dtype=np.int64).reshape(-1, 2)
+
+    @property
+    def size(self) -> int:
+        return len(self.added) + len(self.removed) + len(self.renamed)
+
+    @property
+    def empty(self) -> bool:
+        return self.size == 0
+
+    @property
+    def incremental(self) -> bool:
+        """변경분만 반영하는 편이 나은지 (변경이 많으면 색인을 새로 만듦)"""
+        return self.size <= len(self.new) * config.LISTING_INCREMENTAL_MAX_RATIO
+
+    def row_map(self) -> np.ndarray:
+        """색인 항목을 그대로 옮길 수 있는 이전 행 -> 새 행 (폐지/이름 변경 행은 -1)"""
+        remap = self.remap.copy()
+        remap[self.renamed[:, 0]] = -1
+        return remap
+
+    def fresh_rows(self) -> np.ndarray:
+        """새로 색인해야 하는 새 테이블 행 (신규 상장 + 이름 변경)"""
+        return np.concatenate([self.added, self.renamed[:, 1]])
+
+    def listed(self) -> List[SymbolRecord]:
+        """새로 상장된 종목 (같은 심볼이 중복된 행은 제외)"""
+        records = [self.new.record(int(row)) for row in self.added]
+        return [r for r in records if self.old.find(r.symbol) is None]
+
+    def delisted(self) -> List[SymbolRecord]:
+        """상장 폐지된 종목"""
+        records = [self.old.record(int(row)) for row in self.removed]
+        return [r for r in records if self.new.find(r.symbol) is None]
+
+    def to_dict(self) -> Dict[str, List[Dict]]:
+        """변경 로그 항목"""
+        return {
+            "added": [{"symbol": r.symbol, "name": r.name} for r in self.listed()],
+            "removed": [{"symbol": r.symbol, "name": r.name} for r in self.delisted()],
+            "renamed": [
+                {"symbol": self.new.symbols[new_row], "name": self.new.names[new_row], "previous_name": self.old.names[old_row]}
+                for old_row, new_row in self.renamed.tolist()
+            ],
+        }
+
+
+# 시장별 마지막 diff (심볼 테이블과 두 색인이 같은 변경을 반복 계산하지 않도록)
+_last_diffs: Dict[str, ListingDiff] = {}
+_diff_lock = threading.Lock()
+
+
+def diff_tables(old: SymbolTable, new: SymbolTable) -> ListingDiff:
+    """두 심볼 테이블의 변경분 (같은 테이블 쌍이면 직전 결과 재사용)"""
+    with _diff_lock:
+        cached = _last_diffs.get(new.market)
+        if cached is not None and cached.old is old and cached.new is new:
+            return cached
+    diff = ListingDiff(old, new)
+    with _diff_lock:
+        _last_diffs[new.market] = diff
+    return diff
+
+
+# ======== 변경 내역 로그 ========
+def load_log(path: str) -> Optional[Dict]:
+    """변경 로그 파일 (없으면 None)"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def _write_log(path: str, log: Dict) -> None:
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(log, f, ensure_ascii=False)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def record(path: str, market: str, version: int, diff: Optional[ListingDiff]) -> Dict:
+    """
+    목록 확인 결과를 로그에 기록
+
+    version 이 그대로면 확인 시각만 갱신하고, 하나 올라갔으면 diff 를 항목으로 추가합니다.
+    diff 가 없거나(이전 목록을 알 수 없음) 로그와 버전이 이어지지 않으면 이 버전부터 다시 시작합니다.
+    """
+    now = time.time()
+    log = load_log(path)
+    if log is not None and diff is not None and version == log["version"] + 1:
+        log["entries"].append({"version": version, "at": now, **diff.to_dict()})
+        log["version"] = version
+        log["changed_at"] = now
+        overflow = len(log["entries"]) - config.LISTING_CHANGE_LOG_MAX_VERSIONS
+        if overflow > 0:
+            log["entries"] = log["entries"][overflow:]
+            log["base_version"] = log["entries"][0]["version"] - 1
+    elif log is None or version != log["version"]:
+        log = {"market": market, "version": version, "base_version": version, "changed_at": now, "entries": []}
+    log["checked_at"] = now
+    _write_log(path, log)
+    return log
+
+
+def changes_since(log: Dict, since: int) -> Tuple[bool, Dict[str, List[Dict]]]:
+    """
+    since 버전 이후의 누적 변경분 (전체 동기화 필요 여부, 변경분)
+
+    여러 버전에 걸친 변경은 심볼별로 합쳐 최종 상태만 남깁니다 (상장 후 폐지되면 빠짐).
+    """
+    changes = {"added": [], "removed": [], "renamed": []}
+    if since < log["base_version"] or since > log["version"]:
+        return True, changes
+
+    # 심볼 -> (since 시점 이름, 현재 이름) (없으면 None)
+    states: Dict[str, List[Optional[str]]] = {}
+    for entry in log["entries"]:
+        if entry["version"] <= since:
+            continue
+        for item in entry["added"]:
+            states.setdefault(item["symbol"], [None, None])[1] = item["name"]
+        for item in entry["removed"]:
+            states.setdefault(item["symbol"], [item["name"], None])[1] = None
+        for item in entry["renamed"]:
+            states.setdefault(item["symbol"], [item["previous_name"], None])[1] = item["name"]
+
+    for symbol, (before, after) in states.items():
+        if before is None and after is not None:
+            changes["added"].append({"symbol": symbol, "name": after})
+        elif before is not None and after is None:
+            changes["removed"].append({"symbol": symbol, "name": before})
+        elif before is not None and before != after:
+            changes["renamed"].append({"symbol": symbol, "name": after, "previous_name": before})
+    return False, changes
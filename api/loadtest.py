@@ -0,0 +1,527 @@
+"""
+API 부하 테스트
+
+실제 사용 패턴에 가까운 요청 조합(검색어 입력, 종목 상세, 시장 목록, 백테스트)을
+지정한 동시 접속 수로 일정 시간 보내고 경로별 처리량, 지연 시간 백분위, 오류율을 출력합니다.
+워커 수나 캐시 크기 같은 설정을 바꿔 가며 같은 조건으로 비교하는 용도입니다.
+
+- 각 가상 사용자는 연결을 유지한 채 응답을 받으면 바로 다음 요청을 보냄 (closed loop)
+- 검색은 종목 이름을 한 글자씩 입력하는 것처럼 앞부분을 늘려 가며 요청
+- 종목은 인기 종목에 요청이 몰리도록 순위 기반(zipf) 가중치로 선택
+- --spawn 을 주면 가짜 데이터 제공자(STOCK_DATA_PROVIDER=fake)로 서버를 직접 띄워 오프라인으로 측정
+
+사용법 (api 디렉토리에서):
+    python loadtest.py --spawn --workers 4 --concurrency 32 --duration 30
+    python loadtest.py --url http://localhost:8000 --mix search=60,stock-data=40
+"""
+import argparse
+import http.client
+import json
+import logging
+import math
+import os
+import random
+import shutil
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.parse
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger("stock-api.loadtest")
+
+MARKETS = ["KOSPI", "KOSDAQ", "NASDAQ", "NYSE"]
+
+DEFAULT_MIX = "search=40,stock-data=30,market-symbols=5,historical-prices=15,dca=10"
+
+# 서버 준비 대기 시간 (초)
+STARTUP_TIMEOUT = 60
+
+
+class Recorder:
+    """가상 사용자 하나의 경로별 지연 시간과 상태 코드 (스레드마다 따로 두고 마지막에 합침)"""
+
+    def __init__(self):
+        self.latencies: Dict[str, List[float]] = {}
+        self.statuses: Dict[str, Dict[str, int]] = {}
+
+    def add(self, route: str, status: str, seconds: float) -> None:
+        self.latencies.setdefault(route, []).append(seconds)
+        counts = self.statuses.setdefault(route, {})
+        counts[status] = counts.get(status, 0) + 1
+
+    def merge(self, other: "Recorder") -> None:
+        for route, values in other.latencies.items():
+            self.latencies.setdefault(route, []).extend(values)
+        for route, counts in other.statuses.items():
+            merged = self.statuses.setdefault(route, {})
+            for status, count in counts.items():
+                merged[status] = merged.get(status, 0) + count
+
+
+class Client:
+    """연결을 유지하는 HTTP 클라이언트 (오류가 나면 다음 요청에서 다시 연결)"""
+
+    def __init__(self, base_url: str, timeout: float):
+        parsed = urllib.parse.urlsplit(base_url)
+        self.https = parsed.scheme == "https"
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port
+        self.prefix = parsed.path.rstrip("/")
+        self.timeout = timeout
+        self._conn: Optional[http.client.HTTPConnection] = None
+
+    def _connection(self) -> http.client.HTTPConnection:
+        if self._conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self._conn = cls(self.host, self.port, timeout=self.timeout)
+        return self._conn
+
+    def request(self, method: str, path: str, body: Optional[Dict] = None) -> Tuple[int, bytes]:
+        headers = {"Accept": "application/json"}
+        payload = None
+        if body is not None:
+            payload = json.dumps(body).encode("utf-8")
+            headers["Content-Type"] = "application/json"
+        try:
+            conn = self._connection()
+            conn.request(method, self.prefix + path, body=payload, headers=headers)
+            response = conn.getresponse()
+            return response.status, response.read()
+        except Exception:
+            self.close()
+            raise
+
+    def get_json(self, path: str):
+        status, data = self.request("GET", path)
+        if status != 200:
+            raise RuntimeError(f"GET {path} 실패: {status} {data[:200]!r}")
+        return json.loads(data)
+
+    def close(self) -> None:
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+
+class Universe:
+    """요청에 사용할 종목 목록 (앞쪽 종목일수록 자주 선택)"""
+
+    def __init__(self, stocks: Dict[str, List[Dict]], zipf: float):
+        self.stocks = stocks
+        self.markets = [market for market in stocks if stocks[market]]
+        self.weights = {
+            market: [1.0 / (rank + 1) ** zipf for rank in range(len(items))]
+            for market, items in stocks.items()
+        }
+
+    def pick(self, rng: random.Random, market: Optional[str] = None) -> Dict:
+        market = market or rng.choice(self.markets)
+        return rng.choices(self.stocks[market], weights=self.weights[market])[0]
+
+    def pick_many(self, rng: random.Random, count: int) -> List[Dict]:
+        """같은 시장에서 서로 다른 종목 count 개 (백테스트는 한 통화로 맞춤)"""
+        market = rng.choice(self.markets)
+        picked: Dict[str, Dict] = {}
+        for _ in range(count * 10):
+            stock = self.pick(rng, market)
+            picked[stock["symbol"]] = stock
+            if len(picked) >= count:
+                break
+        return list(picked.values())
+
+
+def load_universe(client: Client, markets: List[str], per_market: int, zipf: float) -> Universe:
+    stocks = {}
+    for market in markets:
+        data = client.get_json(f"/api/market-symbols/{urllib.parse.quote(market, safe='')}?limit={per_market}")
+        stocks[market] = data["stocks"]
+    client.close()
+    return Universe(stocks, zipf)
+
+
+def _date(days_ago: int) -> str:
+    return (datetime.now() - timedelta(days=days_ago)).strftime("%Y-%m-%d")
+
+
+class Scenario:
+    """경로 이름 → 요청 목록 생성 (한 번의 사용자 동작이 여러 요청일 수 있음)"""
+
+    def __init__(self, universe: Universe, dca_detail: str):
+        self.universe = universe
+        self.dca_detail = dca_detail
+
+    def search(self, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        # 이름 또는 심볼을 한 글자씩 입력
+        stock = self.universe.pick(rng)
+        text = stock["name"] if rng.random() < 0.7 else stock["symbol"]
+        length = min(len(text), rng.randint(2, 6))
+        return [
+            ("GET", f"/api/search?query={urllib.parse.quote(text[:i])}&limit=10", None)
+            for i in range(1, length + 1)
+        ]
+
+    def stock_data(self, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        stock = self.universe.pick(rng)
+        days = rng.choice([90, 365, 365, 1095])
+        query = urllib.parse.urlencode({"symbol": stock["symbol"], "market": stock["market"], "days": days})
+        return [("GET", f"/api/stock-data?{query}", None)]
+
+    def market_symbols(self, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        market = rng.choice(self.universe.markets)
+        return [("GET", f"/api/market-symbols/{urllib.parse.quote(market, safe='')}?limit=100", None)]
+
+    def historical_prices(self, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        stocks = self.universe.pick_many(rng, rng.randint(1, 3))
+        query = urllib.parse.urlencode(
+            {
+                "symbols": ",".join(stock["symbol"] for stock in stocks),
+                "start_date": _date(rng.choice([365, 1095, 1825])),
+            }
+        )
+        return [("GET", f"/api/backtest/historical-prices?{query}", None)]
+
+    def dca(self, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        stocks = self.universe.pick_many(rng, rng.randint(1, 3))
+        symbols = [stock["symbol"] for stock in stocks]
+        share = round(100.0 / len(symbols), 6)
+        body = {
+            "symbols": symbols,
+            "allocation": {symbol: share for symbol in symbols},
+            "start_date": _date(rng.choice([1095, 1825, 3650])),
+            "investment_frequency": rng.choice(["monthly", "monthly", "quarterly"]),
+            "detail": self.dca_detail,
+        }
+        return [("POST", "/api/backtest/dca", body)]
+
+    def build(self, route: str, rng: random.Random) -> List[Tuple[str, str, Optional[Dict]]]:
+        return ROUTES[route](self, rng)
+
+
+ROUTES = {
+    "search": Scenario.search,
+    "stock-data": Scenario.stock_data,
+    "market-symbols": Scenario.market_symbols,
+    "historical-prices": Scenario.historical_prices,
+    "dca": Scenario.dca,
+}
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        name, _, weight = part.strip().partition("=")
+        if name not in ROUTES:
+            raise ValueError(f"알 수 없는 경로 {name} (사용 가능: {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    if not any(weight > 0 for weight in mix.values()):
+        raise ValueError("요청 비중이 모두 0입니다.")
+    return mix
+
+
+def _virtual_user(
+    client: Client,
+    scenario: Scenario,
+    mix: Dict[str, float],
+    rng: random.Random,
+    measure_from: float,
+    stop_at: float,
+    recorder: Recorder,
+) -> None:
+    routes = list(mix)
+    weights = [mix[route] for route in routes]
+    while time.monotonic() < stop_at:
+        route = rng.choices(routes, weights=weights)[0]
+        for method, path, body in scenario.build(route, rng):
+            started = time.monotonic()
+            if started >= stop_at:
+                break
+            try:
+                status, _ = client.request(method, path, body)
+                status = str(status)
+            except Exception as e:
+                status = type(e).__name__
+            if started >= measure_from:
+                recorder.add(route, status, time.monotonic() - started)
+    client.close()
+
+
+def _percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    # nearest-rank 방식
+    index = min(len(sorted_values) - 1, max(0, math.ceil(q / 100.0 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarize(latencies: List[float], statuses: Dict[str, int], seconds: float) -> Dict:
+    values = sorted(latencies)
+    errors = sum(count for status, count in statuses.items() if not (status.isdigit() and int(status) < 500))
+    return {
+        "requests": len(values),
+        "rps": round(len(values) / seconds, 2) if seconds > 0 else 0.0,
+        "error_rate": round(errors / len(values), 4) if values else 0.0,
+        "statuses": dict(sorted(statuses.items())),
+        "p50_ms": round(_percentile(values, 50) * 1000, 1),
+        "p90_ms": round(_percentile(values, 90) * 1000, 1),
+        "p99_ms": round(_percentile(values, 99) * 1000, 1),
+        "max_ms": round(values[-1] * 1000, 1) if values else 0.0,
+    }
+
+
+def run_load(
+    base_url: str,
+    mix: Dict[str, float],
+    concurrency: int,
+    duration: float,
+    warmup: float = 5.0,
+    markets: Optional[List[str]] = None,
+    per_market: int = 300,
+    zipf: float = 1.1,
+    dca_detail: str = "summary",
+    timeout: float = 60.0,
+    seed: Optional[int] = None,
+) -> Dict:
+    """
+    부하를 보내고 경로별 결과 반환
+
+    warmup 초 동안의 요청은 집계하지 않고(캐시 채우기), 이후 duration 초를 측정합니다.
+    오류율은 5xx 응답과 연결 오류의 비율입니다 (4xx 는 정상 응답으로 봄).
+    """
+    universe = load_universe(Client(base_url, timeout), markets or MARKETS, per_market, zipf)
+    scenario = Scenario(universe, dca_detail)
+    master = random.Random(seed)
+
+    started = time.monotonic()
+    measure_from = started + warmup
+    stop_at = measure_from + duration
+    recorders = [Recorder() for _ in range(concurrency)]
+    threads = [
+        threading.Thread(
+            target=_virtual_user,
+            args=(
+                Client(base_url, timeout),
+                scenario,
+                mix,
+                random.Random(master.random()),
+                measure_from,
+                stop_at,
+                recorders[i],
+            ),
+            name=f"loadtest-{i}",
+            daemon=True,
+        )
+        for i in range(concurrency)
+    ]
+    logger.info(f"부하 시작: 동시 {concurrency}, 준비 {warmup}초 + 측정 {duration}초, 조합 {mix}")
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    total = Recorder()
+    for recorder in recorders:
+        total.merge(recorder)
+    # 측정 구간을 넘겨 끝난 요청까지 포함한 실제 측정 시간
+    elapsed = max(duration, time.monotonic() - measure_from)
+
+    routes = {
+        route: _summarize(total.latencies[route], total.statuses[route], elapsed)
+        for route in ROUTES
+        if route in total.latencies
+    }
+    all_statuses: Dict[str, int] = {}
+    for counts in total.statuses.values():
+        for status, count in counts.items():
+            all_statuses[status] = all_statuses.get(status, 0) + count
+    overall = _summarize([v for values in total.latencies.values() for v in values], all_statuses, elapsed)
+
+    return {
+        "url": base_url,
+        "concurrency": concurrency,
+        "duration_seconds": round(elapsed, 2),
+        "mix": mix,
+        "universe": {market: len(items) for market, items in universe.stocks.items()},
+        "routes": routes,
+        "total": overall,
+    }
+
+
+def format_report(result: Dict) -> str:
+    header = f"{'경로':<18} {'요청':>7} {'rps':>8} {'오류율':>7} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}  상태"
+    lines = [
+        f"{result['url']}  동시 {result['concurrency']}  측정 {result['duration_seconds']}초",
+        header,
+        "-" * (len(header) + 10),
+    ]
+    rows = list(result["routes"].items()) + [("전체", result["total"])]
+    for route, stats in rows:
+        statuses = " ".join(f"{status}:{count}" for status, count in stats["statuses"].items())
+        lines.append(
+            f"{route:<18} {stats['requests']:>7} {stats['rps']:>8.1f} {stats['error_rate'] * 100:>6.2f}% "
+            f"{stats['p50_ms']:>8.1f} {stats['p90_ms']:>8.1f} {stats['p99_ms']:>8.1f} {stats['max_ms']:>8.1f}  {statuses}"
+        )
+    lines.append("(지연 시간 단위 ms)")
+    return "\n".join(lines)
+
+
+class LocalServer:
+    """
+    가짜 데이터 제공자로 uvicorn 서버를 임시 디렉토리에서 실행
+
+    서버 출력은 log_path (없으면 버림)로 보내고, 종료할 때는 프로세스 풀 자식까지 함께 정리하도록
+    프로세스 그룹 전체에 신호를 보냅니다.
+    """
+
+    def __init__(self, port: int, workers: int, env: Dict[str, str], log_path: Optional[str] = None):
+        self.port = port
+        self.workers = workers
+        self.env = env
+        self.log_path = log_path
+        self.tmpdir: Optional[str] = None
+        self.process: Optional[subprocess.Popen] = None
+        self._log = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def __enter__(self) -> "LocalServer":
+        self.tmpdir = tempfile.mkdtemp(prefix="stock-loadtest-")
+        env = dict(os.environ)
+        env.update(
+            {
+                "STOCK_DATA_PROVIDER": "fake",
+                "STOCK_CACHE_DIR": os.path.join(self.tmpdir, "cache"),
+                "STOCK_DATA_DIR": os.path.join(self.tmpdir, "data"),
+            }
+        )
+        env.update(self.env)
+        command = [
+            sys.executable, "-m", "uvicorn", "app:app",
+            "--host", "127.0.0.1", "--port", str(self.port),
+            "--workers", str(self.workers), "--log-level", "warning",
+        ]
+        logger.info(f"서버 시작: {' '.join(command)} ({', '.join(f'{k}={v}' for k, v in self.env.items())})")
+        self._log = open(self.log_path, "ab") if self.log_path else subprocess.DEVNULL
+        self.process = subprocess.Popen(
+            command,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            env=env,
+            stdout=self._log,
+            stderr=subprocess.STDOUT,
+            start_new_session=True,
+        )
+
+        deadline = time.monotonic() + STARTUP_TIMEOUT
+        client = Client(self.url, 5)
+        while True:
+            if self.process.poll() is not None:
+                raise RuntimeError(f"서버가 종료됨 (코드 {self.process.returncode})")
+            try:
+                if client.request("GET", "/")[0] == 200:
+                    break
+            except OSError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"서버가 {STARTUP_TIMEOUT}초 안에 준비되지 않음")
+            time.sleep(0.2)
+        client.close()
+        return self
+
+    def _signal_group(self, sig: int) -> None:
+        try:
+            os.killpg(self.process.pid, sig)
+        except ProcessLookupError:
+            pass
+
+    def __exit__(self, *exc) -> None:
+        if self.process is not None:
+            self._signal_group(signal.SIGTERM)
+            try:
+                self.process.wait(timeout=15)
+            except subprocess.TimeoutExpired:
+                pass
+            # 서버가 정리하지 못한 프로세스 풀 자식 종료
+            self._signal_group(signal.SIGKILL)
+            self.process.wait()
+        if self._log not in (None, subprocess.DEVNULL):
+            self._log.close()
+        if self.tmpdir:
+            shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+
+def _parse_env(items: List[str]) -> Dict[str, str]:
+    env = {}
+    for item in items:
+        key, sep, value = item.partition("=")
+        if not sep:
+            raise ValueError(f"--env 는 KEY=VALUE 형식이어야 합니다: {item}")
+        env[key] = value
+    return env
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="API 부하 테스트")
+    target = parser.add_mutually_exclusive_group(required=True)
+    target.add_argument("--url", help="대상 서버 주소 (예: http://localhost:8000)")
+    target.add_argument("--spawn", action="store_true", help="가짜 데이터 제공자로 서버를 직접 실행")
+    parser.add_argument("--workers", type=int, default=1, help="--spawn 시 uvicorn 워커 수 (기본: 1)")
+    parser.add_argument("--port", type=int, default=8765, help="--spawn 시 포트 (기본: 8765)")
+    parser.add_argument("--env", action="append", default=[], help="--spawn 서버 환경 변수 KEY=VALUE (여러 번 지정 가능)")
+    parser.add_argument("--server-log", help="--spawn 서버 출력을 기록할 파일 (기본: 버림)")
+    parser.add_argument("--concurrency", type=int, default=16, help="동시 가상 사용자 수 (기본: 16)")
+    parser.add_argument("--duration", type=float, default=30, help="측정 시간 초 (기본: 30)")
+    parser.add_argument("--warmup", type=float, default=5, help="집계하지 않는 준비 시간 초 (기본: 5)")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"경로별 비중 (기본: {DEFAULT_MIX})")
+    parser.add_argument("--markets", help=f"종목을 고를 시장 (기본: {','.join(MARKETS)})")
+    parser.add_argument("--symbols", type=int, default=300, help="시장별 사용할 종목 수 (기본: 300)")
+    parser.add_argument("--dca-detail", default="summary", help="백테스트 detail 값 (기본: summary)")
+    parser.add_argument("--seed", type=int, help="난수 시드 (같은 값이면 같은 요청 순서)")
+    parser.add_argument("--json", action="store_true", help="결과를 JSON 으로 출력")
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
+    )
+    try:
+        mix = parse_mix(args.mix)
+        env = _parse_env(args.env)
+    except ValueError as e:
+        parser.error(str(e))
+    markets = [m.strip() for m in args.markets.split(",")] if args.markets else None
+
+    def _run(url: str) -> Dict:
+        return run_load(
+            url,
+            mix,
+            args.concurrency,
+            args.duration,
+            warmup=args.warmup,
+            markets=markets,
+            per_market=args.symbols,
+            dca_detail=args.dca_detail,
+            seed=args.seed,
+        )
+
+    if args.spawn:
+        with LocalServer(args.port, args.workers, env, args.server_log) as server:
+            result = _run(server.url)
+        result["workers"] = args.workers
+        result["env"] = env
+    else:
+        result = _run(args.url)
+
+    if args.json:
+        print(json.dumps(result, ensure_ascii=False, indent=2))
+    else:
+        print(format_report(result))
+
+
+if __name__ == "__main__":
+    main()
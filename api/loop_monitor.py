@@ -0,0 +1,203 @@
+"""
+이벤트 루프 지연 측정과 루프를 막는 호출 탐지
+
+워커마다 루프 위에서 LOOP_MONITOR_INTERVAL_SECONDS 마다 깨어나는 heartbeat 태스크가
+예정보다 늦게 깨어난 시간(루프 지연)을 기록합니다.
+별도 감시 스레드는 heartbeat 가 LOOP_BLOCK_THRESHOLD_MS 를 넘게 늦어지면 그 순간 루프 스레드의 스택과
+루프에서 실행 중인 요청(경로 템플릿, trace id)을 잡아 두고, 멈춤이 끝나면 전체 시간과 함께 로그로 남깁니다.
+멈춤은 경로별, 코드 위치(api 모듈 안의 가장 안쪽 프레임)별로 집계되어 /api/admin/event-loop 에서 볼 수 있습니다.
+"""
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Dict, List, Optional
+
+import config
+import tracing
+
+logger = logging.getLogger("stock-api.loop")
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def _blocking_site(frame) -> Optional[str]:
+    """api 모듈 안에서 가장 안쪽 프레임 위치 (파일:줄 함수)"""
+    while frame is not None:
+        filename = frame.f_code.co_filename
+        if os.path.isabs(filename) and os.path.dirname(filename) == config.BASE_DIR:
+            return f"{os.path.basename(filename)}:{frame.f_lineno} {frame.f_code.co_name}"
+        frame = frame.f_back
+    return None
+
+
+class LoopMonitor:
+    """워커 프로세스 이벤트 루프 하나의 지연 측정과 멈춤 기록"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._samples: deque = deque(maxlen=max(1, config.LOOP_LAG_SAMPLES))
+        self._recent: deque = deque(maxlen=max(1, config.LOOP_STALL_HISTORY))
+        self._by_route: Dict[str, Dict] = {}
+        self._by_site: Dict[str, Dict] = {}
+        self._stats = {"beats": 0, "max_lag_ms": 0.0, "stalls": 0, "blocked_ms_total": 0.0}
+        # heartbeat 가 깨어나야 하는 시각 (time.monotonic 기준)
+        self._due: Optional[float] = None
+        self._stall: Optional[Dict] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+
+    # ======== 시작 ========
+    def start(self) -> None:
+        """현재 이벤트 루프에 heartbeat 태스크와 감시 스레드 시작 (워커 시작 시 한 번)"""
+        if self._task is not None or config.LOOP_MONITOR_INTERVAL_SECONDS <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._task = self._loop.create_task(self._heartbeat())
+        if config.LOOP_BLOCK_THRESHOLD_MS > 0:
+            threading.Thread(target=self._watch, name="loop-watchdog", daemon=True).start()
+
+    # ======== heartbeat (루프) ========
+    async def _heartbeat(self) -> None:
+        interval = config.LOOP_MONITOR_INTERVAL_SECONDS
+        while True:
+            self._due = time.monotonic() + interval
+            await asyncio.sleep(interval)
+            lag_ms = max(0.0, time.monotonic() - self._due) * 1000
+            with self._lock:
+                self._samples.append(lag_ms)
+                self._stats["beats"] += 1
+                self._stats["max_lag_ms"] = max(self._stats["max_lag_ms"], lag_ms)
+                stall, self._stall = self._stall, None
+            if stall is not None:
+                self._finish_stall(stall, lag_ms)
+
+    # ======== 감시 스레드 ========
+    def _watch(self) -> None:
+        threshold = config.LOOP_BLOCK_THRESHOLD_MS / 1000
+        poll = max(0.005, threshold / 4)
+        while True:
+            time.sleep(poll)
+            due = self._due
+            if due is None or time.monotonic() - due < threshold:
+                continue
+            with self._lock:
+                if self._stall is not None or self._due != due:
+                    continue
+            try:
+                stall = self._capture(due)
+            except Exception as e:
+                logger.warning(f"이벤트 루프 멈춤 스택 수집 실패: {str(e)}")
+                continue
+            with self._lock:
+                # 수집하는 동안 루프가 다시 돌았으면 버림
+                if self._due == due and self._stall is None:
+                    self._stall = stall
+
+    def _capture(self, due: float) -> Dict:
+        """멈춘 루프 스레드의 스택과 처리 중인 요청"""
+        frame = sys._current_frames().get(self._loop_thread)
+        route = None
+        trace_id = None
+        task = asyncio.current_task(self._loop)
+        active = tracing.active_request(task) if task is not None else None
+        if active is not None:
+            scope, root = active
+            route = tracing.route_name(scope)
+            trace_id = root.trace.trace_id
+            root.set("event_loop.stalled", True)
+        return {
+            "started_at": time.time() - (time.monotonic() - due),
+            "route": route,
+            "trace_id": trace_id,
+            "task": task.get_name() if task is not None else None,
+            "site": _blocking_site(frame),
+            "stack": "".join(traceback.format_stack(frame)) if frame is not None else None,
+        }
+
+    def _finish_stall(self, stall: Dict, lag_ms: float) -> None:
+        stall["duration_ms"] = round(lag_ms, 1)
+        route = stall["route"] or "(요청 밖)"
+        site = stall["site"] or "(api 밖)"
+        with self._lock:
+            self._recent.append(stall)
+            self._stats["stalls"] += 1
+            self._stats["blocked_ms_total"] += lag_ms
+            for table, key in ((self._by_route, route), (self._by_site, site)):
+                entry = table.setdefault(key, {"stalls": 0, "blocked_ms_total": 0.0, "max_ms": 0.0})
+                entry["stalls"] += 1
+                entry["blocked_ms_total"] += lag_ms
+                entry["max_ms"] = max(entry["max_ms"], lag_ms)
+        trace = f" (trace {stall['trace_id']})" if stall["trace_id"] else ""
+        logger.warning(f"이벤트 루프 {lag_ms:.1f}ms 멈춤: {route} @ {site}{trace}\n{stall['stack'] or ''}".rstrip())
+
+    # ======== 조회 ========
+    def status(self, recent: int = 10, stacks: bool = False) -> Dict:
+        """지연 분포와 멈춤 집계 (경로/코드 위치는 막은 시간 합계 순)"""
+        with self._lock:
+            samples = list(self._samples)
+            stats = dict(self._stats)
+            by_route = {key: dict(value) for key, value in self._by_route.items()}
+            by_site = {key: dict(value) for key, value in self._by_site.items()}
+            stalls = list(self._recent)[-recent:] if recent > 0 else []
+
+        def _ranked(table: Dict[str, Dict]) -> List[Dict]:
+            rows = [
+                {
+                    "key": key,
+                    "stalls": value["stalls"],
+                    "blocked_ms_total": round(value["blocked_ms_total"], 1),
+                    "max_ms": round(value["max_ms"], 1),
+                }
+                for key, value in table.items()
+            ]
+            return sorted(rows, key=lambda r: -r["blocked_ms_total"])
+
+        return {
+            "pid": os.getpid(),
+            "running": self._task is not None and not self._task.done(),
+            "interval_ms": config.LOOP_MONITOR_INTERVAL_SECONDS * 1000,
+            "threshold_ms": config.LOOP_BLOCK_THRESHOLD_MS,
+            "lag_ms": {
+                "samples": len(samples),
+                "current": round(samples[-1], 2) if samples else 0.0,
+                "p50": round(_percentile(samples, 0.50), 2),
+                "p95": round(_percentile(samples, 0.95), 2),
+                "p99": round(_percentile(samples, 0.99), 2),
+                "window_max": round(max(samples), 2) if samples else 0.0,
+                "max": round(stats["max_lag_ms"], 2),
+            },
+            "beats": stats["beats"],
+            "stalls": stats["stalls"],
+            "blocked_ms_total": round(stats["blocked_ms_total"], 1),
+            "by_route": _ranked(by_route),
+            "by_site": _ranked(by_site),
+            "recent": [
+                {key: value for key, value in stall.items() if stacks or key != "stack"}
+                for stall in reversed(stalls)
+            ],
+        }
+
+
+_monitor = LoopMonitor()
+
+
+def start_loop_monitor() -> None:
+    """워커 이벤트 루프 감시 시작 (startup 이벤트에서 호출)"""
+    _monitor.start()
+
+
+def status(recent: int = 10, stacks: bool = False) -> Dict:
+    """이 워커의 루프 지연 분포와 멈춤 기록"""
+    return _monitor.status(recent, stacks)
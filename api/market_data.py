@@ -0,0 +1,668 @@
+"""
+종목 목록/가격 데이터 조회 계층
+
+FinanceDataReader 호출을 한 곳으로 모으고, 결과를 워커 간 공유 스냅샷 캐시에 저장합니다.
+같은 시장 목록이나 종목 시세는 여러 워커가 동시에 요청해도 한 번만 가져옵니다.
+업스트림 호출은 소스별 속도 제한과 서킷 브레이커를 거치며, 존재하지 않는 심볼은 잠시 기억해 다시 조회하지 않습니다.
+백그라운드 갱신은 일괄(BATCH) 우선순위로 호출하므로 대화형 요청이 먼저 토큰을 받습니다.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+import listing_changes
+import memory
+import tracing
+from shared_cache import LockTimeout, SharedSnapshotCache, Snapshot
+from peak_index import PeakIndex, peak_indexes
+from resilience import (
+    BATCH,
+    CircuitBreaker,
+    CircuitOpenError,
+    DeadlineExceeded,
+    RateLimited,
+    SymbolNotFound,
+    UpstreamUnavailable,
+    check_deadline,
+    get_breaker,
+    get_limiter,
+    negative_cache,
+    priority,
+    remaining_budget,
+)
+from symbol_table import SymbolRecord, SymbolTable
+
+if config.DATA_PROVIDER == "fake":
+    import fake_provider as fdr
+else:
+    import FinanceDataReader as fdr
+
+logger = logging.getLogger("stock-api.data")
+
+LISTINGS = "listings"
+PRICES = "prices"
+# 일괄 수집 대상 심볼 목록 (이 심볼의 가격 스냅샷은 PRICE_CACHE_MAX_SYMBOLS 정리에서 제외)
+PINNED_PRICES = "pinned-prices.json"
+
+PRICE_FIELDS = ["Open", "High", "Low", "Close", "Volume"]
+
+cache = SharedSnapshotCache(config.CACHE_DIR)
+
+# 종목 목록 매핑은 심볼 테이블과 검색 색인이 참조하므로 집계만 하고, 시세 매핑은 예산 초과 시 해제
+memory.register("snapshots:listings", lambda: cache.memory_entries(LISTINGS))
+memory.register("snapshots:prices", lambda: cache.memory_entries(PRICES), cache.release)
+
+# 프로세스별 심볼 테이블 (스냅샷 식별자가 바뀌면 다시 구성)
+_symbol_tables: Dict[str, Tuple[tuple, SymbolTable]] = {}
+
+# 백그라운드 시세 갱신 (같은 심볼은 동시에 하나만)
+_revalidate_executor = ThreadPoolExecutor(
+    max_workers=config.REVALIDATE_WORKERS, thread_name_prefix="revalidate"
+)
+_revalidating = set()
+_revalidate_lock = threading.Lock()
+
+# 시간 예산이 있는 업스트림 호출 (예산이 지나면 기다리지 않고, 호출은 끝까지 실행됨)
+_provider_executor = ThreadPoolExecutor(
+    max_workers=config.PROVIDER_CALL_WORKERS, thread_name_prefix="provider"
+)
+# 진행 중인 업스트림 호출 (같은 호출은 새로 시작하지 않고 합류)
+_inflight_calls: Dict[tuple, Future] = {}
+_inflight_lock = threading.RLock()
+
+
+# ======== 요청 시간 예산 ========
+def _admit(source: str) -> None:
+    """새 업스트림 호출 전 호출 토큰 대기 후 서킷 확인 (대기 시간은 현재 span 에 기록)"""
+    tracing.annotate("rate_limit_wait_ms", round(get_limiter(source).acquire() * 1000, 3))
+    get_breaker(source).check()
+
+
+def _call_provider(what: str, source: str, fn, *args):
+    """
+    업스트림 호출 (요청 시간 예산이 있으면 남은 시간까지만 기다림)
+
+    예산이 지나 기다리지 않은 호출도 끝까지 실행되며, 그동안 같은 호출은 새로 시작하지 않고
+    진행 중인 호출의 결과를 기다리므로 응답이 늦은 업스트림에 호출이 쌓이지 않습니다.
+    호출 토큰과 서킷 확인은 새로 호출하는 쪽만 거치고, 진행 중인 호출에 합류하면 건너뜁니다.
+    """
+    key = (fn.__name__, args)
+    with _inflight_lock:
+        future = _inflight_calls.get(key)
+    if future is None and remaining_budget() is None:
+        _admit(source)
+        return fn(*args)
+
+    check_deadline(what)
+    leader = False
+    if future is None:
+        _admit(source)
+    with _inflight_lock:
+        future = _inflight_calls.get(key)
+        if future is None:
+            leader = True
+            future = _inflight_calls[key] = _provider_executor.submit(fn, *args)
+            future.add_done_callback(lambda done: _forget_call(key, done))
+        else:
+            tracing.annotate("joined", True)
+
+    budget = remaining_budget()
+    try:
+        return future.result(timeout=budget)
+    except FutureTimeout:
+        tracing.annotate("deadline_exceeded", True)
+        if leader:
+            # 호출자가 기다리기를 그만뒀을 뿐 업스트림 장애는 아니므로 시험 호출 슬롯만 풀고,
+            # 실제 성공/실패는 호출이 끝날 때 기록
+            breaker = get_breaker(source)
+            breaker.release_trial()
+            future.add_done_callback(lambda done: _record_outcome(breaker, done))
+        raise DeadlineExceeded(f"{what}: 요청 시간 예산 초과 ({budget:.1f}초)") from None
+
+
+def _record_outcome(breaker: CircuitBreaker, future: Future) -> None:
+    """기다리는 호출자가 없어진 업스트림 호출의 결과를 서킷에 기록"""
+    if future.exception() is None:
+        breaker.record_success()
+    else:
+        breaker.record_failure()
+
+
+def _forget_call(key: tuple, future: Future) -> None:
+    with _inflight_lock:
+        if _inflight_calls.get(key) is future:
+            del _inflight_calls[key]
+
+
+@contextmanager
+def _exclusive(namespace: str, key: str):
+    """cache.exclusive 와 같으나 요청 시간 예산이 있으면 그때까지만 잠금을 기다림"""
+    try:
+        with cache.exclusive(namespace, key, timeout=remaining_budget()):
+            yield
+    except LockTimeout as e:
+        raise DeadlineExceeded(f"{namespace}/{key} 갱신 대기 중 요청 시간 예산 초과") from e
+
+
+# ======== 업스트림 소스 ========
+def listing_source(market: str) -> str:
+    """종목 목록 업스트림 소스 이름 (서킷 브레이커 단위)"""
+    if market in ["KOSPI", "KOSDAQ", "KRX", "KONEX"]:
+        return "listing:KRX"
+    if market.startswith("ETF"):
+        return f"listing:{market}"
+    return "listing:US"
+
+
+def price_source(symbol: str) -> str:
+    """시세 업스트림 소스 이름 (서킷 브레이커 단위)"""
+    if "/" in symbol:
+        return "prices:FX"
+    if symbol.isdigit() or (len(symbol) == 6 and symbol.isalnum()):
+        return "prices:KR"
+    return "prices:US"
+
+
+def _fetch_listing(market: str) -> pd.DataFrame:
+    if (LISTINGS, market) in negative_cache:
+        raise SymbolNotFound(f"시장 {market}을(를) 찾을 수 없습니다.")
+
+    source = listing_source(market)
+    with tracing.span("provider.listing", source=source, market=market) as current:
+        breaker = get_breaker(source)
+        try:
+            df = _call_provider(f"시장 {market} 종목 목록 조회", source, fdr.StockListing, market)
+        except (CircuitOpenError, DeadlineExceeded, RateLimited):
+            raise
+        except Exception as e:
+            if market not in config.ALL_MARKETS:
+                # 지원하지 않는 시장 코드는 업스트림 장애로 보지 않음
+                breaker.record_success()
+                negative_cache.add((LISTINGS, market))
+                raise SymbolNotFound(f"시장 {market}을(를) 찾을 수 없습니다.") from e
+            breaker.record_failure()
+            raise UpstreamUnavailable(f"시장 {market} 종목 목록 조회 실패: {str(e)}") from e
+
+        breaker.record_success()
+        current.set("rows", len(df))
+        return df
+
+
+def _fetch_prices(symbol: str, start: str, end: str) -> pd.DataFrame:
+    source = price_source(symbol)
+    with tracing.span("provider.prices", source=source, symbol=symbol, start=start, end=end) as current:
+        breaker = get_breaker(source)
+        try:
+            df = _call_provider(f"심볼 {symbol} 시세 조회", source, fdr.DataReader, symbol, start, end)
+        except (CircuitOpenError, DeadlineExceeded, RateLimited):
+            raise
+        except Exception as e:
+            if is_listed(symbol) is False:
+                breaker.record_success()
+                negative_cache.add((PRICES, symbol))
+                raise SymbolNotFound(f"심볼 {symbol}을(를) 찾을 수 없습니다.") from e
+            breaker.record_failure()
+            raise UpstreamUnavailable(f"심볼 {symbol} 시세 조회 실패: {str(e)}") from e
+
+        breaker.record_success()
+        current.set("rows", len(df))
+        if df.empty and is_listed(symbol) is False:
+            negative_cache.add((PRICES, symbol))
+            raise SymbolNotFound(f"심볼 {symbol}을(를) 찾을 수 없습니다.")
+        return df
+
+
+# ======== 종목 목록 ========
+def _changes_path(market: str) -> str:
+    return cache.path(LISTINGS, market)[: -len(".snap")] + ".changes.json"
+
+
+def _store_listing(market: str) -> Snapshot:
+    """
+    fdr에서 종목 목록을 가져와 심볼 테이블 스냅샷으로 저장
+
+    이전 스냅샷과 비교해 바뀐 것이 없으면 다시 쓰지 않고(확인 시각만 기록) 이전 스냅샷을 반환합니다.
+    바뀌었으면 버전을 올려 저장하고 변경분을 변경 로그에 남깁니다.
+    """
+    table = SymbolTable.from_listing(_fetch_listing(market), market)
+
+    previous = cache.get(LISTINGS, market, force=True)
+    diff = None
+    version = 0
+    if _is_current(previous):
+        version = previous.meta.get("version", 0)
+        diff = listing_changes.diff_tables(SymbolTable.from_snapshot(previous), table)
+        if diff.empty and version > 0:
+            listing_changes.record(_changes_path(market), market, version, None)
+            logger.info(f"시장 {market} 종목 목록 변경 없음: {len(table)}개 (버전 {version})")
+            return previous
+
+    snapshot = cache.put(
+        LISTINGS,
+        market,
+        table.to_columns(),
+        {
+            "market": market,
+            "count": len(table),
+            "format": SymbolTable.FORMAT,
+            "fetched_at": time.time(),
+            "version": version + 1,
+        },
+    )
+    listing_changes.record(_changes_path(market), market, version + 1, diff if version > 0 else None)
+    if diff is not None and version > 0:
+        logger.info(
+            f"시장 {market} 종목 목록 스냅샷 저장: {len(table)}개 (버전 {version + 1}, "
+            f"상장 {len(diff.added)}, 폐지 {len(diff.removed)}, 이름 변경 {len(diff.renamed)})"
+        )
+    else:
+        logger.info(f"시장 {market} 종목 목록 스냅샷 저장: {len(table)}개 (버전 {version + 1})")
+    return snapshot
+
+
+def _checked_at(market: str, snapshot: Snapshot) -> float:
+    """종목 목록을 마지막으로 확인한 시각 (변경이 없으면 스냅샷은 그대로이므로 변경 로그 기준)"""
+    log = listing_changes.load_log(_changes_path(market))
+    checked_at = log.get("checked_at", 0) if log and log["version"] == snapshot.meta.get("version") else 0
+    return max(snapshot.meta["fetched_at"], checked_at)
+
+
+def _is_current(snapshot: Optional[Snapshot]) -> bool:
+    return snapshot is not None and snapshot.meta.get("format") == SymbolTable.FORMAT
+
+
+def refresh_listing(market: str) -> Snapshot:
+    """종목 목록 스냅샷 강제 갱신"""
+    with _exclusive(LISTINGS, market):
+        return _store_listing(market)
+
+
+def get_listing_snapshot(market: str) -> Snapshot:
+    """종목 목록 스냅샷 반환 (없으면 한 프로세스만 가져와 저장)"""
+    snapshot = cache.get(LISTINGS, market)
+    if _is_current(snapshot):
+        return snapshot
+
+    with _exclusive(LISTINGS, market):
+        # 잠금을 기다리는 동안 다른 워커가 저장했을 수 있음
+        snapshot = cache.get(LISTINGS, market, force=True)
+        if not _is_current(snapshot):
+            snapshot = _store_listing(market)
+    return snapshot
+
+
+def get_symbol_table(market: str) -> SymbolTable:
+    """시장 심볼 테이블 반환 (목록이 바뀌었으면 새로 상장된 심볼을 부재 캐시에서 제거)"""
+    snapshot = get_listing_snapshot(market)
+
+    cached = _symbol_tables.get(market)
+    if cached and cached[0] == snapshot.identity:
+        return cached[1]
+
+    table = SymbolTable.from_snapshot(snapshot)
+    if cached:
+        for record in listing_changes.diff_tables(cached[1], table).listed():
+            negative_cache.discard((PRICES, record.symbol))
+    _symbol_tables[market] = (snapshot.identity, table)
+    return table
+
+
+def get_listing_changes(market: str, since: int) -> Dict:
+    """since 버전 이후의 종목 목록 변경분 (오래된 버전이면 full_resync)"""
+    table = get_symbol_table(market)
+    log = listing_changes.load_log(_changes_path(market))
+    if log is None or log["version"] < table.version:
+        # 로그가 없으면 현재 테이블 버전에서 새로 시작한 것으로 봄
+        log = {"version": table.version, "base_version": table.version, "entries": []}
+
+    full_resync, changes = listing_changes.changes_since(log, since)
+    return {"market": market, "version": log["version"], "since": since, "full_resync": full_resync, **changes}
+
+
+def find_symbol(symbol: str, markets: List[str]) -> Optional[SymbolRecord]:
+    """주어진 시장 순서대로 심볼을 찾아 첫 번째 일치 종목 반환"""
+    with tracing.span("symbol.resolve", symbol=symbol) as current:
+        for probes, market in enumerate(markets, 1):
+            try:
+                with tracing.span("symbol.probe", market=market):
+                    record = get_symbol_table(market).find(symbol)
+                if record is not None:
+                    current.set("market", market)
+                    current.set("probes", probes)
+                    return record
+            except Exception as e:
+                logger.warning(f"{market} 시장에서 심볼 검색 중 오류: {str(e)}")
+        current.set("probes", len(markets))
+        return None
+
+
+def is_listed(symbol: str) -> Optional[bool]:
+    """
+    기본 시장 목록에 심볼이 있는지 여부
+
+    통화쌍처럼 목록에 없는 형식이거나 목록을 불러오지 못한 시장이 있으면 None 을 반환합니다.
+    """
+    if "/" in symbol:
+        return None
+
+    undetermined = False
+    for market in config.ALL_MARKETS:
+        try:
+            if get_symbol_table(market).find(symbol) is not None:
+                return True
+        except Exception:
+            undetermined = True
+    return None if undetermined else False
+
+
+# ======== 가격 시계열 ========
+def _today() -> pd.Timestamp:
+    return pd.Timestamp(datetime.now().date())
+
+
+def _contains(snapshot: Optional[Snapshot], start: pd.Timestamp) -> bool:
+    """스냅샷이 요청 시작일부터의 시세를 가지고 있는지 확인 (최신 여부는 무관)"""
+    return snapshot is not None and start >= pd.Timestamp(snapshot.meta["start"])
+
+
+def _age(snapshot: Snapshot) -> float:
+    return time.time() - snapshot.meta["fetched_at"]
+
+
+def _covers(snapshot: Optional[Snapshot], start: pd.Timestamp, end: pd.Timestamp) -> bool:
+    """스냅샷이 요청 기간을 최신 상태로 포함하는지 확인"""
+    if not _contains(snapshot, start):
+        return False
+
+    meta = snapshot.meta
+    if end > pd.Timestamp(meta["through"]):
+        return False
+
+    # 가져온 날 이전의 시세는 확정된 값이므로 그대로 사용
+    fetched_day = pd.Timestamp(datetime.fromtimestamp(meta["fetched_at"]).date())
+    if end < fetched_day:
+        return True
+    return _age(snapshot) < config.PRICE_REFRESH_SECONDS
+
+
+def _frame_from_snapshot(snapshot: Snapshot, start=None, end=None, stale: bool = False) -> pd.DataFrame:
+    dates = snapshot.columns["dates"]
+    lo = 0 if start is None else int(np.searchsorted(dates, np.datetime64(start, "ns"), "left"))
+    hi = len(dates) if end is None else int(np.searchsorted(dates, np.datetime64(end, "ns"), "right"))
+
+    df = pd.DataFrame(
+        {field: np.array(snapshot.columns[field][lo:hi]) for field in snapshot.meta["fields"]},
+        index=pd.DatetimeIndex(np.array(dates[lo:hi]), name="Date"),
+    )
+    df.attrs["stale"] = stale
+    return df
+
+
+def _store_prices(symbol: str, snapshot: Optional[Snapshot], start: pd.Timestamp) -> Optional[Snapshot]:
+    """부족한 구간만 fdr에서 가져와 기존 시계열과 합친 뒤 저장"""
+    today = _today()
+
+    if snapshot is not None and start >= pd.Timestamp(snapshot.meta["start"]):
+        # 마지막 거래일부터 다시 가져와 장중 값이었을 수 있는 마지막 봉을 덮어씀
+        existing = _frame_from_snapshot(snapshot)
+        fetch_start = existing.index[-1]
+        range_start = pd.Timestamp(snapshot.meta["start"])
+    else:
+        existing = None
+        fetch_start = start
+        if snapshot is not None:
+            fetch_start = min(start, pd.Timestamp(snapshot.meta["start"]))
+        range_start = fetch_start
+
+    fetched = _fetch_prices(symbol, fetch_start.strftime("%Y-%m-%d"), today.strftime("%Y-%m-%d"))
+
+    if existing is not None:
+        fields = snapshot.meta["fields"]
+        if not fetched.empty:
+            fields = [f for f in fields if f in fetched.columns]
+            fetched = pd.concat([existing[existing.index < fetch_start][fields], fetched[fields]])
+        else:
+            fetched = existing
+    elif fetched.empty:
+        return None
+    else:
+        fields = [f for f in PRICE_FIELDS if f in fetched.columns]
+        fetched = fetched[fields]
+
+    fetched = fetched[~fetched.index.duplicated(keep="last")].sort_index()
+    columns = {"dates": fetched.index.values.astype("datetime64[ns]")}
+    for field in fields:
+        columns[field] = fetched[field].to_numpy(dtype=np.float64)
+
+    return cache.put(
+        PRICES,
+        symbol,
+        columns,
+        {
+            "symbol": symbol,
+            "fields": fields,
+            "start": range_start.strftime("%Y-%m-%d"),
+            "through": today.strftime("%Y-%m-%d"),
+            "fetched_at": time.time(),
+        },
+    )
+
+
+def _revalidate(symbol: str, start: pd.Timestamp) -> None:
+    """백그라운드에서 시세 스냅샷 갱신 (이미 진행 중이면 무시)"""
+    with _revalidate_lock:
+        if symbol in _revalidating:
+            return
+        _revalidating.add(symbol)
+
+    def _task():
+        try:
+            with priority(BATCH), _exclusive(PRICES, symbol):
+                snapshot = cache.get(PRICES, symbol, force=True)
+                if not _covers(snapshot, start, _today()):
+                    _store_prices(symbol, snapshot, start)
+        except Exception as e:
+            logger.warning(f"심볼 {symbol} 백그라운드 시세 갱신 실패: {str(e)}")
+        finally:
+            with _revalidate_lock:
+                _revalidating.discard(symbol)
+
+    _revalidate_executor.submit(_task)
+
+
+def _price_history(symbol: str, start_date, end_date=None) -> pd.DataFrame:
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize() if end_date else _today()
+    end = min(end, _today())
+
+    if (PRICES, symbol) in negative_cache:
+        raise SymbolNotFound(f"심볼 {symbol}을(를) 찾을 수 없습니다.")
+
+    snapshot = cache.get(PRICES, symbol)
+    if _covers(snapshot, start, end):
+        tracing.annotate("cache", "hit")
+        return _frame_from_snapshot(snapshot, start, end)
+
+    if _contains(snapshot, start) and _age(snapshot) < config.PRICE_STALE_GRACE_SECONDS:
+        tracing.annotate("cache", "stale")
+        _revalidate(symbol, start)
+        return _frame_from_snapshot(snapshot, start, end, stale=True)
+
+    tracing.annotate("cache", "miss")
+    try:
+        with _exclusive(PRICES, symbol):
+            snapshot = cache.get(PRICES, symbol, force=True)
+            if not _covers(snapshot, start, end):
+                snapshot = _store_prices(symbol, snapshot, start)
+    except UpstreamUnavailable as e:
+        if not _contains(snapshot, start):
+            raise
+        logger.warning(f"심볼 {symbol} 시세 갱신 실패, 마지막 시세 반환: {str(e)}")
+        tracing.annotate("cache", "fallback")
+        return _frame_from_snapshot(snapshot, start, end, stale=True)
+
+    if snapshot is None:
+        df = pd.DataFrame(columns=PRICE_FIELDS, index=pd.DatetimeIndex([], name="Date"))
+        df.attrs["stale"] = False
+        return df
+    return _frame_from_snapshot(snapshot, start, end)
+
+
+def get_price_history(symbol: str, start_date, end_date=None) -> pd.DataFrame:
+    """
+    일별 시세 반환 (fdr.DataReader 와 같은 형식)
+
+    공유 스냅샷이 요청 기간을 포함하면 그대로 잘라 쓰고,
+    부족하면 한 프로세스만 fdr에서 가져와 스냅샷을 교체합니다.
+    갱신 주기가 지난 스냅샷은 유예 시간 동안 즉시 반환하면서 백그라운드에서 갱신하고,
+    업스트림 장애 시에는 마지막으로 받은 시세를 반환합니다.
+    이 두 경우 결과의 attrs["stale"] 이 True 입니다.
+    """
+    with tracing.span("prices.resolve", symbol=symbol):
+        return _price_history(symbol, start_date, end_date)
+
+
+def refresh_prices(symbol: str, start_date) -> Optional[Snapshot]:
+    """
+    시세 스냅샷을 오늘까지 최신으로 갱신 (일괄 수집용)
+
+    요청 경로와 달리 유예 시간 동안의 지난 시세를 그대로 두지 않고 바로 가져옵니다.
+    """
+    start = pd.Timestamp(start_date).normalize()
+    if (PRICES, symbol) in negative_cache:
+        raise SymbolNotFound(f"심볼 {symbol}을(를) 찾을 수 없습니다.")
+
+    with _exclusive(PRICES, symbol):
+        snapshot = cache.get(PRICES, symbol, force=True)
+        if _covers(snapshot, start, _today()):
+            return snapshot
+        return _store_prices(symbol, snapshot, start)
+
+
+def refresh_latest(symbol: str, max_age: float, days: int) -> Optional[Snapshot]:
+    """
+    시세 스냅샷을 max_age 초 이내로 갱신 (실시간 시세 확인용)
+
+    다른 워커가 방금 갱신한 스냅샷은 그대로 사용하므로 워커 수와 무관하게 종목당 주기마다 한 번만 가져오며,
+    기존 스냅샷이 있으면 마지막 거래일부터만 받습니다. 스냅샷이 없으면 최근 days 일부터 가져옵니다.
+    """
+    if (PRICES, symbol) in negative_cache:
+        raise SymbolNotFound(f"심볼 {symbol}을(를) 찾을 수 없습니다.")
+
+    snapshot = cache.get(PRICES, symbol)
+    if snapshot is not None and _age(snapshot) < max_age:
+        return snapshot
+
+    with _exclusive(PRICES, symbol):
+        snapshot = cache.get(PRICES, symbol, force=True)
+        if snapshot is not None and _age(snapshot) < max_age:
+            return snapshot
+        if snapshot is not None:
+            start = pd.Timestamp(snapshot.meta["start"])
+        else:
+            start = _today() - pd.Timedelta(days=days)
+        return _store_prices(symbol, snapshot, start)
+
+
+def get_peak_index(symbol: str) -> Optional[PeakIndex]:
+    """저장된 시세 스냅샷에 대한 구간 최고가 색인 (스냅샷이 없으면 None)"""
+    snapshot = cache.get(PRICES, symbol)
+    if snapshot is None or "High" not in snapshot.columns:
+        return None
+    return peak_indexes.get(
+        symbol, snapshot.identity, snapshot.columns["dates"], snapshot.columns["High"]
+    )
+
+
+def peak_between(symbol: str, start_date=None, end_date=None) -> Optional[Tuple[float, pd.Timestamp]]:
+    """start ~ end 사이 최고가와 그 날짜 (시세 스냅샷 기준)"""
+    index = get_peak_index(symbol)
+    if index is None:
+        return None
+    return index.max_between(start_date, end_date)
+
+
+# ======== 일괄 수집 심볼 고정 ========
+def _load_pins() -> Dict[str, List[str]]:
+    """시장별 고정 심볼 (파일이 없으면 빈 dict)"""
+    try:
+        with open(os.path.join(cache.root, PINNED_PRICES), "r", encoding="utf-8") as f:
+            pins = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"일괄 수집 심볼 목록을 읽지 못했습니다: {str(e)}")
+        return {}
+    if not isinstance(pins, dict):
+        logger.warning("일괄 수집 심볼 목록 형식이 올바르지 않아 무시합니다.")
+        return {}
+    return pins
+
+
+def pin_prices(listed: Dict[str, Iterable[str]]) -> None:
+    """
+    가격 스냅샷 정리에서 제외할 심볼을 시장별로 교체
+
+    이번 수집에서 종목 목록을 확인한 시장만 바꾸고, 다른 시장(일부 시장만 수집했거나 목록 조회에 실패한 시장)의
+    고정 심볼은 그대로 둡니다.
+    """
+    path = os.path.join(cache.root, PINNED_PRICES)
+    with cache.exclusive(PRICES, PINNED_PRICES):
+        pins = _load_pins()
+        pins.update({market: sorted(set(symbols)) for market, symbols in listed.items()})
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(pins, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+
+def pinned_prices() -> Set[str]:
+    """가격 스냅샷 정리에서 제외할 심볼 (모든 시장의 고정 심볼 합집합, 일괄 수집을 한 적이 없으면 빈 집합)"""
+    return {symbol for symbols in _load_pins().values() for symbol in symbols}
+
+
+# ======== 쓰기 담당 워커 ========
+def _refresh_due() -> None:
+    """오래된 종목 목록 스냅샷 갱신 및 가격 스냅샷 정리"""
+    for market in config.ALL_MARKETS:
+        try:
+            snapshot = cache.get(LISTINGS, market)
+            if not _is_current(snapshot) or time.time() - _checked_at(market, snapshot) >= config.LISTING_REFRESH_SECONDS:
+                refresh_listing(market)
+        except Exception as e:
+            logger.error(f"시장 {market} 종목 목록 갱신 중 오류 발생: {str(e)}")
+
+    # 일괄 수집한 종목은 PRICE_CACHE_MAX_SYMBOLS 와 관계없이 유지하고 나머지 조회분만 정리
+    cache.prune(PRICES, config.PRICE_CACHE_MAX_SYMBOLS, keep=pinned_prices())
+
+
+def _refresh_loop() -> None:
+    while True:
+        try:
+            if cache.try_acquire_writer():
+                with priority(BATCH):
+                    _refresh_due()
+        except Exception as e:
+            logger.error(f"스냅샷 갱신 작업 중 오류 발생: {str(e)}")
+        time.sleep(config.WRITER_POLL_SECONDS)
+
+
+def start_background_refresh() -> threading.Thread:
+    """쓰기 담당 워커 선출 및 주기적 갱신 스레드 시작"""
+    thread = threading.Thread(target=_refresh_loop, name="snapshot-refresh", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,202 @@
+"""
+프로세스 메모리 사용량 집계와 예산 관리
+
+각 캐시는 register() 로 항목 목록(키, 바이트 수, 마지막 사용 시각, 사용 횟수)과 삭제 함수를 등록합니다.
+등록된 캐시 전체 크기가 MEMORY_BUDGET_MB 를 넘으면 모든 캐시의 항목을 한 줄로 세워
+오래 사용하지 않았고 사용 횟수가 적은 항목부터 목표 크기 아래가 될 때까지 삭제합니다.
+예산과 집계는 워커 프로세스별입니다.
+"""
+import logging
+import math
+import os
+import threading
+import time
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger("stock-api.memory")
+
+# (키, 바이트 수, 마지막 사용 시각(monotonic), 사용 횟수)
+Entry = Tuple[Hashable, int, float, int]
+
+
+class UsageTracker:
+    """캐시 항목별 마지막 사용 시각과 사용 횟수"""
+
+    def __init__(self):
+        self._usage: Dict[Hashable, List] = {}
+        self._lock = threading.Lock()
+
+    def touch(self, key: Hashable) -> None:
+        now = time.monotonic()
+        with self._lock:
+            usage = self._usage.get(key)
+            if usage is None:
+                self._usage[key] = [now, 1]
+            else:
+                usage[0] = now
+                usage[1] += 1
+
+    def forget(self, key: Hashable) -> None:
+        with self._lock:
+            self._usage.pop(key, None)
+
+    def get(self, key: Hashable) -> Tuple[float, int]:
+        with self._lock:
+            usage = self._usage.get(key)
+        return (usage[0], usage[1]) if usage is not None else (0.0, 0)
+
+
+# 캐시 이름 → (항목 목록 함수, 항목 삭제 함수 - None 이면 집계만)
+_caches: Dict[str, Tuple[Callable[[], List[Entry]], Optional[Callable[[Hashable], None]]]] = {}
+_caches_lock = threading.Lock()
+
+_evictions = {"runs": 0, "entries": 0, "freed_bytes": 0, "last_run_at": None}
+_enforce_lock = threading.Lock()
+
+
+def register(
+    name: str,
+    entries: Callable[[], List[Entry]],
+    evict: Optional[Callable[[Hashable], None]] = None,
+) -> None:
+    """캐시 등록 (같은 이름이면 교체)"""
+    with _caches_lock:
+        _caches[name] = (entries, evict)
+
+
+def process_rss() -> Optional[int]:
+    """현재 프로세스 상주 메모리 (바이트, 확인할 수 없으면 None)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        import resource
+
+        # /proc 이 없는 환경(macOS)에서는 최대 사용량으로 대신함
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+    except (ImportError, OSError):
+        return None
+
+
+def budget_bytes() -> int:
+    return int(config.MEMORY_BUDGET_MB * 1024 * 1024)
+
+
+def _collect() -> Dict[str, Tuple[List[Entry], Optional[Callable[[Hashable], None]]]]:
+    with _caches_lock:
+        caches = dict(_caches)
+    collected = {}
+    for name, (entries, evict) in caches.items():
+        try:
+            collected[name] = (entries(), evict)
+        except Exception as e:
+            logger.warning(f"캐시 {name} 메모리 집계 실패: {str(e)}")
+    return collected
+
+
+def report(top: int = 5) -> Dict:
+    """캐시별 항목 수와 크기 (큰 항목 top 개 포함), 프로세스 RSS"""
+    now = time.monotonic()
+    caches = {}
+    total = 0
+    for name, (entries, evict) in _collect().items():
+        nbytes = sum(entry[1] for entry in entries)
+        total += nbytes
+        largest = sorted(entries, key=lambda entry: entry[1], reverse=True)[:top]
+        caches[name] = {
+            "entries": len(entries),
+            "bytes": nbytes,
+            "evictable": evict is not None,
+            "largest": [
+                {
+                    "key": str(key),
+                    "bytes": size,
+                    "idle_seconds": round(now - last_used, 1) if hits else None,
+                    "hits": hits,
+                }
+                for key, size, last_used, hits in largest
+            ],
+        }
+    return {
+        "pid": os.getpid(),
+        "rss_bytes": process_rss(),
+        "cache_bytes": total,
+        "budget_bytes": budget_bytes(),
+        "caches": caches,
+        "evictions": dict(_evictions),
+    }
+
+
+def _eviction_score(last_used: float, hits: int, now: float) -> float:
+    """클수록 먼저 삭제 (사용하지 않은 시간을 사용 횟수의 로그로 나눔)"""
+    return (now - last_used) / math.log2(2 + hits)
+
+
+def enforce(budget: Optional[int] = None) -> Dict:
+    """캐시 전체 크기가 예산을 넘으면 목표 비율 아래가 될 때까지 삭제 후 결과 반환"""
+    budget = budget_bytes() if budget is None else budget
+    with _enforce_lock:
+        collected = _collect()
+        total = sum(entry[1] for entries, _ in collected.values() for entry in entries)
+        result = {"before_bytes": total, "after_bytes": total, "evicted": 0, "freed_bytes": 0}
+        if budget <= 0 or total <= budget:
+            return result
+
+        now = time.monotonic()
+        target = budget * config.MEMORY_EVICT_TARGET_RATIO
+        candidates = [
+            (_eviction_score(last_used, hits, now), name, key, size)
+            for name, (entries, evict) in collected.items()
+            if evict is not None
+            for key, size, last_used, hits in entries
+        ]
+        candidates.sort(key=lambda candidate: candidate[0], reverse=True)
+
+        evicted = {}
+        for _, name, key, size in candidates:
+            if total <= target:
+                break
+            try:
+                collected[name][1](key)
+            except Exception as e:
+                logger.warning(f"캐시 {name} 항목 {key} 삭제 실패: {str(e)}")
+                continue
+            total -= size
+            result["evicted"] += 1
+            result["freed_bytes"] += size
+            evicted[name] = evicted.get(name, 0) + 1
+
+        result["after_bytes"] = total
+        _evictions["runs"] += 1
+        _evictions["entries"] += result["evicted"]
+        _evictions["freed_bytes"] += result["freed_bytes"]
+        _evictions["last_run_at"] = time.time()
+
+    logger.info(
+        f"메모리 예산 초과로 캐시 정리: {result['before_bytes']} → {result['after_bytes']} 바이트 "
+        f"(예산 {budget}, 삭제 {evicted})"
+    )
+    return result
+
+
+def _monitor_loop() -> None:
+    while True:
+        time.sleep(config.MEMORY_CHECK_SECONDS)
+        try:
+            enforce()
+        except Exception as e:
+            logger.error(f"메모리 예산 확인 중 오류 발생: {str(e)}")
+
+
+def start_memory_monitor() -> Optional[threading.Thread]:
+    """메모리 예산이 설정된 경우 주기적 확인 스레드 시작"""
+    if budget_bytes() <= 0:
+        return None
+    thread = threading.Thread(target=_monitor_loop, name="memory-monitor", daemon=True)
+    thread.start()
+    return thread
@@ -0,0 +1,177 @@
+"""
+구간 최고가 색인
+
+고가 배열을 일정 크기 블록으로 나누고 블록 최고가 위치에 대한 희소 테이블(sparse table)을 둡니다.
+임의의 두 날짜 사이 최고가와 그 날짜를 블록 두 개 스캔 + O(1) 테이블 조회로 구하며,
+새 봉이 추가되면 바뀐 블록 이후만 다시 계산합니다.
+"""
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+import config
+import memory
+
+BLOCK_SIZE = 64
+
+
+class PeakIndex:
+    """한 종목의 고가 시계열에 대한 구간 최고가 색인"""
+
+    def __init__(self):
+        self.dates = np.empty(0, dtype="datetime64[ns]")
+        self.highs = np.empty(0, dtype=np.float64)
+        self._block_arg = np.empty(0, dtype=np.int64)
+        # _levels[k][j]: 블록 j ~ j + 2^k - 1 중 최고가 위치
+        self._levels: List[np.ndarray] = []
+
+    def __len__(self) -> int:
+        return len(self.highs)
+
+    @property
+    def nbytes(self) -> int:
+        return self._block_arg.nbytes + sum(level.nbytes for level in self._levels)
+
+    def update(self, dates: np.ndarray, highs: np.ndarray) -> None:
+        """새 시계열 반영 (기존과 같은 앞부분은 그대로 두고 바뀐 블록부터 재계산)"""
+        highs = np.asarray(highs, dtype=np.float64)
+        if np.isnan(highs).any():
+            highs = np.where(np.isnan(highs), -np.inf, highs)
+
+        common = min(len(self.highs), len(highs))
+        same = (self.dates[:common] == dates[:common]) & (self.highs[:common] == highs[:common])
+        prefix = common if same.all() else int(np.argmin(same))
+
+        self.dates = dates
+        self.highs = highs
+        if prefix == len(highs) and len(self._block_arg) == -(-len(highs) // BLOCK_SIZE):
+            return
+        self._rebuild_from(prefix // BLOCK_SIZE)
+
+    def _better(self, left: np.ndarray, right: np.ndarray) -> np.ndarray:
+        """두 위치 중 고가가 더 큰 쪽 (같으면 앞쪽)"""
+        return np.where(self.highs[right] > self.highs[left], right, left)
+
+    def _rebuild_from(self, first_block: int) -> None:
+        n = len(self.highs)
+        block_count = -(-n // BLOCK_SIZE)
+
+        # 바뀐 블록들의 최고가 위치
+        start = first_block * BLOCK_SIZE
+        tail = self.highs[start:]
+        padded = np.full((block_count - first_block) * BLOCK_SIZE, -np.inf)
+        padded[: len(tail)] = tail
+        tail_arg = padded.reshape(-1, BLOCK_SIZE).argmax(axis=1) + start + np.arange(
+            block_count - first_block
+        ) * BLOCK_SIZE
+        self._block_arg = np.concatenate([self._block_arg[:first_block], tail_arg])
+
+        # 희소 테이블은 바뀐 블록을 포함하는 항목부터 재계산
+        levels = [self._block_arg]
+        width = 1
+        while width * 2 <= block_count:
+            prev = levels[-1]
+            size = block_count - width * 2 + 1
+            keep = max(0, min(first_block - width * 2 + 1, size))
+            old = self._levels[len(levels)] if len(levels) < len(self._levels) else None
+            head = old[:keep] if old is not None and len(old) >= keep else None
+            if head is None:
+                keep = 0
+                head = np.empty(0, dtype=np.int64)
+            j = np.arange(keep, size)
+            levels.append(np.concatenate([head, self._better(prev[j], prev[j + width])]))
+            width *= 2
+        self._levels = levels
+
+    def _argmax_blocks(self, lo_block: int, hi_block: int) -> int:
+        k = (hi_block - lo_block + 1).bit_length() - 1
+        level = self._levels[k]
+        left, right = level[lo_block], level[hi_block - (1 << k) + 1]
+        return int(right) if self.highs[right] > self.highs[left] else int(left)
+
+    def argmax(self, lo: int, hi: int) -> int:
+        """위치 lo ~ hi (포함) 중 최고가 위치 (같으면 앞쪽)"""
+        lo, hi = int(lo), int(hi)
+        lo_block, hi_block = lo // BLOCK_SIZE, hi // BLOCK_SIZE
+        if hi_block - lo_block <= 1:
+            return lo + int(np.argmax(self.highs[lo : hi + 1]))
+
+        left_end = (lo_block + 1) * BLOCK_SIZE
+        right_start = hi_block * BLOCK_SIZE
+        candidates = [
+            lo + int(np.argmax(self.highs[lo:left_end])),
+            self._argmax_blocks(lo_block + 1, hi_block - 1),
+            right_start + int(np.argmax(self.highs[right_start : hi + 1])),
+        ]
+        best = candidates[0]
+        for candidate in candidates[1:]:
+            if self.highs[candidate] > self.highs[best]:
+                best = candidate
+        return best
+
+    def max_between(self, start=None, end=None) -> Optional[Tuple[float, pd.Timestamp]]:
+        """start ~ end 날짜(포함) 사이 최고가와 그 날짜 (데이터가 없으면 None)"""
+        lo = 0 if start is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(start), "ns"), "left"))
+        hi = len(self.dates) if end is None else int(np.searchsorted(self.dates, np.datetime64(pd.Timestamp(end), "ns"), "right"))
+        if lo >= hi:
+            return None
+
+        i = self.argmax(lo, hi - 1)
+        if not np.isfinite(self.highs[i]):
+            return None
+        return float(self.highs[i]), pd.Timestamp(self.dates[i])
+
+    def all_time_high(self) -> Optional[Tuple[float, pd.Timestamp]]:
+        """저장된 전체 기간 최고가와 그 날짜"""
+        return self.max_between()
+
+
+class PeakIndexCache:
+    """종목별 색인 (시세 스냅샷이 바뀌면 증분 갱신, 최근 사용 순으로 최대 개수 유지)"""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[tuple, PeakIndex]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.usage = memory.UsageTracker()
+
+    def get(self, symbol: str, identity: tuple, dates: np.ndarray, highs: np.ndarray) -> PeakIndex:
+        self.usage.touch(symbol)
+        with self._lock:
+            entry = self._entries.pop(symbol, None)
+            if entry is not None and entry[0] == identity:
+                index = entry[1]
+            else:
+                index = entry[1] if entry is not None else PeakIndex()
+                index.update(dates, highs)
+
+            self._entries[symbol] = (identity, index)
+            while len(self._entries) > self.max_entries:
+                evicted, _ = self._entries.popitem(last=False)
+                self.usage.forget(evicted)
+            return index
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @property
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(index.nbytes for _, index in self._entries.values())
+
+    def memory_entries(self) -> List[memory.Entry]:
+        with self._lock:
+            entries = [(symbol, index.nbytes) for symbol, (_, index) in self._entries.items()]
+        return [(symbol, nbytes, *self.usage.get(symbol)) for symbol, nbytes in entries]
+
+    def evict(self, symbol: str) -> None:
+        with self._lock:
+            self._entries.pop(symbol, None)
+        self.usage.forget(symbol)
+
+
+peak_indexes = PeakIndexCache(config.PEAK_INDEX_MAX_SYMBOLS)
+memory.register("peak_index", peak_indexes.memory_entries, peak_indexes.evict)
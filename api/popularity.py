@@ -0,0 +1,51 @@
+"""
+종목 인기도 점수
+
+검색 결과 정렬에 사용합니다.
+- 설정 파일(POPULARITY_FILE, {"심볼": 점수} 형식 JSON)의 고정 점수
+- 이 프로세스에서 종목 데이터가 조회된 횟수
+"""
+import json
+import logging
+import os
+import threading
+from collections import Counter
+from typing import Dict
+
+import config
+
+logger = logging.getLogger("stock-api.popularity")
+
+
+class PopularityScores:
+    """고정 점수 + 조회 횟수 기반 인기도"""
+
+    def __init__(self, path: str, hit_weight: float):
+        self.path = path
+        self.hit_weight = hit_weight
+        self._static: Dict[str, float] = {}
+        self._hits: Counter = Counter()
+        self._lock = threading.Lock()
+        self.reload()
+
+    def reload(self) -> None:
+        """고정 점수 파일 다시 읽기 (파일이 없으면 비움)"""
+        if not self.path or not os.path.exists(self.path):
+            self._static = {}
+            return
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                self._static = {str(k): float(v) for k, v in json.load(f).items()}
+            logger.info(f"인기도 점수 {len(self._static)}개 로드: {self.path}")
+        except Exception as e:
+            logger.warning(f"인기도 점수 파일 로드 실패: {str(e)}")
+
+    def record(self, symbol: str) -> None:
+        with self._lock:
+            self._hits[symbol] += 1
+
+    def score(self, symbol: str) -> float:
+        return self._static.get(symbol, 0.0) + self._hits.get(symbol, 0) * self.hit_weight
+
+
+scores = PopularityScores(config.POPULARITY_FILE, config.POPULARITY_HIT_WEIGHT)
@@ -0,0 +1,83 @@
+from fastapi import APIRouter, HTTPException, Query
+from fastapi.responses import StreamingResponse
+import asyncio
+import json
+import logging
+import traceback
+
+import config
+from quotes import hub
+
+# 로깅 설정
+logger = logging.getLogger("stock-api.quotes")
+
+# 라우터 생성
+router = APIRouter(
+    prefix="/api/quotes",
+    tags=["quotes"],
+)
+
+
+def _format_event(kind: str, data) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+async def _stream(subscriber):
+    try:
+        # 연결이 끊기면 브라우저 EventSource 가 3초 뒤 다시 연결
+        yield "retry: 3000\n\n"
+        while True:
+            try:
+                await asyncio.wait_for(subscriber.event.wait(), timeout=config.QUOTE_KEEPALIVE_SECONDS)
+            except asyncio.TimeoutError:
+                yield ": keepalive\n\n"
+                continue
+            for quote in subscriber.drain():
+                yield _format_event("error" if "error" in quote else "quote", quote)
+    finally:
+        hub.unsubscribe(subscriber)
+
+
+@router.get("/stream")
+async def stream_quotes(
+    symbols: str = Query(..., description="쉼표로 구분된 종목 코드 목록 (예: '005930,AAPL')"),
+):
+    """
+    종목 시세를 Server-Sent Events 로 구독합니다.
+
+    - **symbols**: 쉼표로 구분된 종목 코드 목록 (최대 QUOTE_MAX_SYMBOLS 개)
+
+    구독 직후 알고 있는 시세를 보내고, 이후 QUOTE_POLL_SECONDS 마다 확인하여 바뀐 종목만
+    `quote` 이벤트(현재가, 전일 종가, 기간 고점, 고점 대비 하락률)로 보냅니다.
+    찾을 수 없는 종목은 `error` 이벤트로 한 번 알립니다.
+    """
+    try:
+        symbol_list = list(dict.fromkeys(s.strip() for s in symbols.split(",") if s.strip()))
+        if not symbol_list:
+            raise HTTPException(status_code=400, detail="종목을 하나 이상 지정해야 합니다.")
+        if len(symbol_list) > config.QUOTE_MAX_SYMBOLS:
+            raise HTTPException(
+                status_code=400,
+                detail=f"종목은 최대 {config.QUOTE_MAX_SYMBOLS}개까지 구독할 수 있습니다.",
+            )
+
+        logger.info(f"시세 구독: symbols={symbol_list}")
+        subscriber = hub.subscribe(symbol_list)
+        return StreamingResponse(
+            _stream(subscriber),
+            media_type="text/event-stream",
+            headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"시세 구독 중 오류 발생: {str(e)}")
+        logger.error(traceback.format_exc())
+        raise HTTPException(status_code=500, detail=f"시세 구독 중 오류 발생: {str(e)}")
+
+
+@router.get("/status")
+async def get_quote_status():
+    """이 워커의 구독자 수, 확인 중인 종목 수와 확인 통계를 반환합니다."""
+    return {"status": "success", "data": hub.status()}
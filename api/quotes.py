@@ -0,0 +1,234 @@
+"""
+실시간 시세 구독
+
+클라이언트는 SSE 로 종목을 구독하고, 워커마다 하나인 QuoteHub 가 구독 중인 종목을
+구독자 수와 무관하게 QUOTE_POLL_SECONDS 마다 한 번씩 확인하여 바뀐 시세만 보냅니다.
+
+- 확인은 market_data.refresh_latest 로 하므로 다른 워커가 방금 갱신한 종목은 업스트림을 호출하지 않음
+- 고점은 종목별로 기억해 두고 새 거래일 고가만 반영 (기간이 지나 빠지는 경우에만 구간 최고가 색인으로 다시 계산)
+- 느린 구독자에게는 종목별 최신 값만 남기므로 대기열이 쌓이지 않음
+"""
+import asyncio
+import contextvars
+import logging
+import time
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+import config
+import market_data
+from resilience import BATCH, SymbolNotFound, UpstreamUnavailable, priority
+
+logger = logging.getLogger("stock-api.quotes")
+
+
+class Subscriber:
+    """SSE 연결 하나 (아직 보내지 않은 종목별 최신 시세)"""
+
+    def __init__(self, symbols: List[str]):
+        self.symbols = symbols
+        self.pending: Dict[str, Dict] = {}
+        self.event = asyncio.Event()
+
+    def push(self, quote: Dict) -> None:
+        self.pending[quote["symbol"]] = quote
+        self.event.set()
+
+    def drain(self) -> List[Dict]:
+        self.event.clear()
+        pending, self.pending = self.pending, {}
+        return list(pending.values())
+
+
+class _Peak:
+    """기간 고점 (마지막 봉을 제외한 확정 거래일 기준)"""
+
+    __slots__ = ("value", "date", "window_start", "through")
+
+    def __init__(self, value: float, date: pd.Timestamp, window_start: pd.Timestamp, through: pd.Timestamp):
+        self.value = value
+        self.date = date
+        self.window_start = window_start
+        self.through = through
+
+
+class QuoteHub:
+    """
+    워커 프로세스의 구독 관리와 종목별 주기적 시세 확인
+
+    구독 상태는 이벤트 루프에서만 바꾸고, 시세 계산(_fetch_quote)은 종목당 하나의 스레드에서만 실행됩니다.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[Subscriber]] = {}
+        self._latest: Dict[str, Dict] = {}
+        self._peaks: Dict[str, _Peak] = {}
+        self._inflight: Set[str] = set()
+        self._task: Optional[asyncio.Task] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._stats = {"polls": 0, "published": 0, "failures": 0, "last_cycle_ms": None}
+
+    # ======== 구독 ========
+    def subscribe(self, symbols: List[str]) -> Subscriber:
+        subscriber = Subscriber(symbols)
+        for symbol in symbols:
+            subscribers = self._subscribers.setdefault(symbol, set())
+            subscribers.add(subscriber)
+            if symbol in self._latest:
+                subscriber.push(self._latest[symbol])
+            elif len(subscribers) == 1:
+                # 처음 구독된 종목은 다음 주기를 기다리지 않고 바로 확인
+                self._spawn_poll(symbol)
+        self._ensure_running()
+        return subscriber
+
+    def unsubscribe(self, subscriber: Subscriber) -> None:
+        for symbol in subscriber.symbols:
+            subscribers = self._subscribers.get(symbol)
+            if subscribers is None:
+                continue
+            subscribers.discard(subscriber)
+            if not subscribers:
+                del self._subscribers[symbol]
+                self._latest.pop(symbol, None)
+                self._peaks.pop(symbol, None)
+
+    def status(self) -> Dict:
+        return {
+            "subscribers": len({s for subscribers in self._subscribers.values() for s in subscribers}),
+            "symbols": len(self._subscribers),
+            "poll_seconds": config.QUOTE_POLL_SECONDS,
+            **self._stats,
+        }
+
+    # ======== 주기적 확인 ========
+    # 확인 태스크는 구독을 시작한 요청보다 오래 살아남으므로 그 요청의 trace/시간 예산을 물려받지 않도록
+    # 빈 컨텍스트에서 시작
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._semaphore = asyncio.Semaphore(max(1, config.QUOTE_POLL_CONCURRENCY))
+            self._task = asyncio.get_running_loop().create_task(self._poll_loop(), context=contextvars.Context())
+
+    def _spawn_poll(self, symbol: str) -> None:
+        self._ensure_running()
+        asyncio.get_running_loop().create_task(self._poll(symbol), context=contextvars.Context())
+
+    async def _poll_loop(self) -> None:
+        while self._subscribers:
+            started = time.monotonic()
+            await asyncio.gather(*(self._poll(symbol) for symbol in list(self._subscribers)))
+            elapsed = time.monotonic() - started
+            self._stats["last_cycle_ms"] = round(elapsed * 1000, 1)
+            await asyncio.sleep(max(0.0, config.QUOTE_POLL_SECONDS - elapsed))
+        self._task = None
+
+    async def _poll(self, symbol: str) -> None:
+        if symbol in self._inflight:
+            return
+        self._inflight.add(symbol)
+        try:
+            async with self._semaphore:
+                if symbol not in self._subscribers:
+                    return
+                quote = await asyncio.to_thread(self._fetch_quote, symbol)
+            self._stats["polls"] += 1
+        except Exception as e:
+            self._stats["failures"] += 1
+            logger.warning(f"심볼 {symbol} 시세 확인 실패: {str(e)}")
+            return
+        finally:
+            self._inflight.discard(symbol)
+        self._publish(quote)
+
+    def _publish(self, quote: Dict) -> None:
+        symbol = quote["symbol"]
+        subscribers = self._subscribers.get(symbol)
+        if not subscribers or self._latest.get(symbol) == quote:
+            return
+        self._latest[symbol] = quote
+        self._stats["published"] += 1
+        for subscriber in subscribers:
+            subscriber.push(quote)
+
+    # ======== 시세 계산 (스레드) ========
+    def _fetch_quote(self, symbol: str) -> Dict:
+        stale = False
+        try:
+            with priority(BATCH):
+                snapshot = market_data.refresh_latest(symbol, config.QUOTE_POLL_SECONDS, config.QUOTE_PEAK_DAYS)
+        except SymbolNotFound:
+            return {"symbol": symbol, "error": f"심볼 {symbol}을(를) 찾을 수 없습니다."}
+        except UpstreamUnavailable:
+            snapshot = market_data.cache.get(market_data.PRICES, symbol)
+            if snapshot is None:
+                return {"symbol": symbol, "error": "데이터 제공처 장애로 시세를 확인할 수 없습니다."}
+            stale = True
+
+        if snapshot is None or len(snapshot.columns["dates"]) == 0:
+            return {"symbol": symbol, "error": f"심볼 {symbol}의 시세가 없습니다."}
+
+        dates = snapshot.columns["dates"]
+        close = snapshot.columns["Close"]
+        highs = snapshot.columns["High"] if "High" in snapshot.columns else close
+        last = pd.Timestamp(dates[-1])
+        price = float(close[-1])
+
+        peak_value, peak_date = self._peak(symbol, dates, highs)
+        if not np.isfinite(peak_value) or float(highs[-1]) >= peak_value:
+            peak_value, peak_date = float(highs[-1]), last
+
+        previous = float(close[-2]) if len(close) > 1 else None
+        return {
+            "symbol": symbol,
+            "price": price,
+            "date": last.strftime("%Y-%m-%d"),
+            "previous_close": previous,
+            "change_pct": round((price / previous - 1) * 100, 4) if previous else None,
+            "peak_price": peak_value,
+            "peak_date": peak_date.strftime("%Y-%m-%d"),
+            "drop_pct": round((1 - price / peak_value) * 100, 4) if peak_value > 0 else None,
+            "stale": stale,
+        }
+
+    def _peak(self, symbol: str, dates: np.ndarray, highs: np.ndarray):
+        """
+        마지막 봉을 제외한 기간 고점
+
+        새 봉이 생겨 기간 시작일이 앞으로 움직여도 기존 고점 날짜가 기간 안에 남아 있으면
+        새로 확정된 거래일만 비교하고, 고점이 기간 밖으로 밀려났거나 시세가 되돌려졌을 때만 전체 구간을 다시 찾습니다.
+        """
+        if len(dates) < 2:
+            return float("nan"), None
+        window_start = pd.Timestamp(dates[-1]).normalize() - pd.Timedelta(days=config.QUOTE_PEAK_DAYS)
+        through = pd.Timestamp(dates[-2])
+        peak = self._peaks.get(symbol)
+
+        if (
+            peak is None
+            or window_start < peak.window_start
+            or peak.date < window_start
+            or through < peak.through
+        ):
+            found = market_data.peak_between(symbol, window_start, through)
+            if found is None:
+                return float("nan"), None
+            peak = _Peak(found[0], found[1], window_start, through)
+        else:
+            if through > peak.through:
+                lo = int(np.searchsorted(dates, np.datetime64(peak.through, "ns"), "right"))
+                hi = len(dates) - 1
+                if lo < hi:
+                    segment = highs[lo:hi]
+                    i = lo + int(np.where(np.isfinite(segment), segment, -np.inf).argmax())
+                    if highs[i] > peak.value:
+                        peak = _Peak(float(highs[i]), pd.Timestamp(dates[i]), window_start, through)
+            peak.window_start = window_start
+            peak.through = through
+
+        self._peaks[symbol] = peak
+        return peak.value, peak.date
+
+
+hub = QuoteHub()
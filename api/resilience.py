@@ -0,0 +1,492 @@
+"""
+업스트림 장애 대응 도구
+
+- NegativeCache: 존재하지 않는 심볼/시장을 짧은 TTL 동안 기억하여 반복 조회 차단
+- CircuitBreaker: 업스트림 소스별로 연속 실패 시 일정 시간 즉시 실패 처리
+- TokenBucket: 업스트림 소스별 호출 속도 제한 (대화형 요청이 일괄 작업보다 먼저 토큰을 받음)
+- SharedTokenStore: 같은 캐시 디렉토리를 쓰는 프로세스끼리 호출 토큰을 나눠 씀
+- deadline: 요청 시간 예산 (업스트림 호출과 토큰/잠금 대기가 남은 시간까지만 기다림)
+"""
+import asyncio
+import contextvars
+import heapq
+import itertools
+import logging
+import os
+import re
+import struct
+import threading
+import time
+from collections import OrderedDict, deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import config
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+
+logger = logging.getLogger("stock-api.resilience")
+
+
+class SymbolNotFound(LookupError):
+    """업스트림이 응답했지만 해당 심볼/시장이 존재하지 않음"""
+
+
+class UpstreamUnavailable(Exception):
+    """업스트림 소스 장애 (응답 실패 또는 서킷 열림)"""
+
+
+class CircuitOpenError(UpstreamUnavailable):
+    """서킷이 열려 있어 업스트림 호출을 건너뜀"""
+
+
+class RateLimited(UpstreamUnavailable):
+    """최대 대기 시간 안에 업스트림 호출 토큰을 얻지 못함"""
+
+
+class DeadlineExceeded(UpstreamUnavailable):
+    """요청 시간 예산 안에 업스트림 호출을 마치지 못함"""
+
+
+# 호출 우선순위 (값이 작을수록 먼저)
+INTERACTIVE = 0
+BATCH = 1
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BATCH: "batch"}
+
+_priority = contextvars.ContextVar("upstream_priority", default=INTERACTIVE)
+
+
+@contextmanager
+def priority(level: int):
+    """이 블록 안의 업스트림 호출 우선순위 지정 (기본: 대화형)"""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def current_priority() -> int:
+    return _priority.get()
+
+
+# 요청 시간 예산 만료 시각 (time.monotonic 기준, 없으면 제한 없음)
+_deadline: "contextvars.ContextVar[Optional[float]]" = contextvars.ContextVar("request_deadline", default=None)
+
+
+@contextmanager
+def deadline(seconds: Optional[float]):
+    """
+    이 블록 안의 업스트림 호출 시간 예산 지정
+
+    바깥에 더 짧은 예산이 있으면 그것을 따르며, asyncio.to_thread 로 넘긴 작업에도 이어집니다.
+    seconds 가 None 이면 바깥 예산을 그대로 사용합니다.
+    """
+    current = _deadline.get()
+    if seconds is not None:
+        expires_at = time.monotonic() + seconds
+        current = expires_at if current is None else min(current, expires_at)
+    token = _deadline.set(current)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget() -> Optional[float]:
+    """남은 요청 시간 예산 (초, 예산이 없으면 None)"""
+    expires_at = _deadline.get()
+    if expires_at is None:
+        return None
+    return max(0.0, expires_at - time.monotonic())
+
+
+def check_deadline(what: str) -> None:
+    """예산을 다 썼으면 DeadlineExceeded"""
+    if remaining_budget() == 0.0:
+        raise DeadlineExceeded(f"{what}: 요청 시간 예산 초과")
+
+
+def request_budget(seconds: Optional[float]) -> float:
+    """요청별 시간 예산 (지정하지 않으면 기본값, 최대값으로 제한)"""
+    if seconds is None:
+        return config.REQUEST_DEADLINE_SECONDS
+    return min(seconds, config.REQUEST_DEADLINE_MAX_SECONDS)
+
+
+async def gather_within_deadline(calls: List[Tuple[Any, Callable, tuple]]) -> Tuple[Dict[Any, Any], List[Any]]:
+    """
+    (키, 함수, 인자) 작업들을 스레드에서 동시에 실행하고 현재 요청 시간 예산 안에 끝난 결과만 모음
+
+    (키 -> 결과 또는 예외, 예산 안에 끝나지 못한 키 목록)을 반환합니다.
+    끝나지 못한 작업은 기다리지 않으며(스레드는 계속 실행됨), 예산 초과로 실패한 작업도 건너뛴 것으로 봅니다.
+    """
+    if not calls:
+        return {}, []
+    tasks = {asyncio.ensure_future(asyncio.to_thread(fn, *args)): key for key, fn, args in calls}
+
+    done, pending = await asyncio.wait(tasks, timeout=remaining_budget())
+    for task in pending:
+        task.cancel()
+
+    results: Dict[Any, Any] = {}
+    skipped = [tasks[task] for task in pending]
+    for task in done:
+        error = task.exception()
+        if isinstance(error, DeadlineExceeded):
+            skipped.append(tasks[task])
+        else:
+            results[tasks[task]] = error if error is not None else task.result()
+
+    order = {key: i for i, (key, _, _) in enumerate(calls)}
+    skipped.sort(key=order.__getitem__)
+    return results, skipped
+
+
+def max_wait_for(level: int) -> float:
+    """우선순위별 최대 대기 시간 (초)"""
+    if level == INTERACTIVE:
+        return config.UPSTREAM_MAX_WAIT_INTERACTIVE_SECONDS
+    return config.UPSTREAM_MAX_WAIT_BATCH_SECONDS
+
+
+class NegativeCache:
+    """존재하지 않는 항목을 TTL 동안 기억 (오래된 항목부터 최대 개수 유지)"""
+
+    def __init__(self, ttl: float, max_entries: int):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = time.monotonic() + self.ttl
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            expires_at = self._entries.get(key)
+            if expires_at is None:
+                return False
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return False
+            return True
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class CircuitBreaker:
+    """연속 실패가 임계값을 넘으면 열리고, 대기 후 한 번의 시험 호출로 닫힘"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def allow(self) -> bool:
+        """호출 가능 여부 (열린 상태에서 대기 시간이 지나면 시험 호출 1회 허용)"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return True
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            return False
+
+    def check(self) -> None:
+        """호출 불가능하면 CircuitOpenError 발생"""
+        if not self.allow():
+            raise CircuitOpenError(f"업스트림 {self.name} 서킷이 열려 있습니다.")
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.state != self.CLOSED:
+                logger.info(f"업스트림 {self.name} 서킷 닫힘")
+            self.state = self.CLOSED
+            self.failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    logger.warning(f"업스트림 {self.name} 서킷 열림 (연속 실패 {self.failures}회)")
+                self.state = self.OPEN
+                self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """시험 호출의 결과를 기다리지 않게 되었을 때 다음 시험 호출 허용 (성공/실패는 기록하지 않음)"""
+        with self._lock:
+            if self.state == self.HALF_OPEN:
+                self._trial_in_flight = False
+
+    def status(self) -> Dict:
+        return {"name": self.name, "state": self.state, "failures": self.failures}
+
+
+class SharedTokenStore:
+    """
+    프로세스 간 공유 토큰 수 (소스별 파일에 토큰 수와 마지막 갱신 시각 기록, flock 으로 보호)
+
+    uvicorn 워커와 프로세스 풀 자식이 같은 파일에서 토큰을 가져가므로 소스별 호출 수가 호스트 전체에서 제한됩니다.
+    """
+
+    _FORMAT = struct.Struct("<dd")
+
+    def __init__(self, path: str):
+        self.path = path
+        self._fd: Optional[int] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    def _open(self) -> int:
+        # 파일 잠금은 열린 파일 단위이므로 프로세스마다 따로 엶
+        if self._fd is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+            self._pid = os.getpid()
+        return self._fd
+
+    def _update(self, rate: float, burst: float, take: bool) -> Tuple[float, float]:
+        with self._lock:
+            fd = self._open()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                now = time.time()
+                data = os.pread(fd, self._FORMAT.size, 0)
+                tokens, updated = self._FORMAT.unpack(data) if len(data) == self._FORMAT.size else (burst, now)
+                tokens = min(burst, tokens + max(0.0, now - min(updated, now)) * rate)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                if take:
+                    if wait == 0.0:
+                        tokens -= 1
+                    os.pwrite(fd, self._FORMAT.pack(tokens, now), 0)
+                return tokens, wait
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def take(self, rate: float, burst: float) -> float:
+        """토큰 하나를 가져오면 0, 모자라면 다음 토큰이 생길 때까지 남은 시간(초)"""
+        return self._update(rate, burst, take=True)[1]
+
+    def peek(self, rate: float, burst: float) -> float:
+        """현재 남은 토큰 수"""
+        return self._update(rate, burst, take=False)[0]
+
+
+class TokenBucket:
+    """
+    토큰 버킷 속도 제한 (초당 rate 개, 최대 burst 개까지 모아 둠)
+
+    기다리는 호출은 (우선순위, 도착 순서) 대기열의 맨 앞만 토큰을 가져갈 수 있으므로
+    일괄 작업이 대기열을 채워도 대화형 요청이 먼저 처리됩니다.
+    store 를 주면 토큰을 프로세스 안이 아니라 공유 파일에서 가져옵니다 (우선순위는 프로세스 안에서만 적용).
+    """
+
+    # 대기 시간 분위수 계산에 사용하는 최근 표본 수
+    RECENT_WAITS = 1000
+
+    def __init__(self, name: str, rate: float, burst: float, store: Optional[SharedTokenStore] = None):
+        self.name = name
+        self.rate = rate
+        self.burst = max(1.0, burst)
+        self.store = store
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+        self._waiters = []
+        self._sequence = itertools.count()
+        self._cond = threading.Condition()
+        self._stats = {
+            level: {
+                "waiting": 0,
+                "max_waiting": 0,
+                "acquired": 0,
+                "timeouts": 0,
+                "wait_total": 0.0,
+                "wait_max": 0.0,
+                "recent": deque(maxlen=self.RECENT_WAITS),
+            }
+            for level in PRIORITY_NAMES
+        }
+
+    def _refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _take(self) -> float:
+        """토큰 하나를 가져오면 0, 모자라면 다음 토큰이 생길 때까지 남은 시간(초)"""
+        if self.store is not None:
+            return self.store.take(self.rate, self.burst)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def acquire(self, level: Optional[int] = None, max_wait: Optional[float] = None) -> float:
+        """
+        토큰 하나를 얻을 때까지 대기 후 대기 시간(초) 반환
+
+        우선순위를 지정하지 않으면 현재 컨텍스트의 우선순위를 사용하고,
+        최대 대기 시간을 넘기면 RateLimited 를 발생시킵니다.
+        """
+        if self.rate <= 0:
+            return 0.0
+        level = current_priority() if level is None else level
+        max_wait = max_wait_for(level) if max_wait is None else max_wait
+        # 요청 시간 예산이 더 짧으면 그때까지만 대기
+        budget = remaining_budget()
+        limited_by_deadline = budget is not None and budget < max_wait
+        if limited_by_deadline:
+            max_wait = budget
+        stats = self._stats[level]
+
+        started = time.monotonic()
+        deadline = started + max_wait
+        entry = (level, next(self._sequence))
+        with self._cond:
+            heapq.heappush(self._waiters, entry)
+            stats["waiting"] += 1
+            stats["max_waiting"] = max(stats["max_waiting"], stats["waiting"])
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    first = self._waiters[0] == entry
+                    next_token = self._take() if first else None
+                    if next_token == 0.0:
+                        heapq.heappop(self._waiters)
+                        # 토큰이 남았으면 다음 대기 호출도 바로 진행
+                        self._cond.notify_all()
+                        waited = now - started
+                        stats["acquired"] += 1
+                        stats["wait_total"] += waited
+                        stats["wait_max"] = max(stats["wait_max"], waited)
+                        stats["recent"].append(waited)
+                        return waited
+
+                    remaining = deadline - now
+                    if remaining <= 0:
+                        self._waiters.remove(entry)
+                        heapq.heapify(self._waiters)
+                        self._cond.notify_all()
+                        stats["timeouts"] += 1
+                        if limited_by_deadline:
+                            raise DeadlineExceeded(f"업스트림 {self.name} 호출 대기 중 요청 시간 예산 초과")
+                        raise RateLimited(
+                            f"업스트림 {self.name} 호출 대기 시간 초과 "
+                            f"({PRIORITY_NAMES[level]}, {max_wait:.1f}초, 대기 {len(self._waiters)}건)"
+                        )
+
+                    # 맨 앞이면 다음 토큰이 생길 때까지, 아니면 앞 호출이 끝날 때까지 대기
+                    timeout = remaining
+                    if first:
+                        timeout = min(remaining, next_token)
+                    self._cond.wait(timeout)
+            finally:
+                stats["waiting"] -= 1
+
+    def status(self) -> Dict:
+        with self._cond:
+            self._refill(time.monotonic())
+            priorities = {}
+            for level, stats in self._stats.items():
+                recent = sorted(stats["recent"])
+                priorities[PRIORITY_NAMES[level]] = {
+                    "waiting": stats["waiting"],
+                    "max_waiting": stats["max_waiting"],
+                    "acquired": stats["acquired"],
+                    "timeouts": stats["timeouts"],
+                    "wait_avg_ms": stats["wait_total"] / stats["acquired"] * 1000 if stats["acquired"] else 0.0,
+                    "wait_p95_ms": recent[int(len(recent) * 0.95) - 1] * 1000 if recent else 0.0,
+                    "wait_max_ms": stats["wait_max"] * 1000,
+                }
+            return {
+                "name": self.name,
+                "rate": self.rate,
+                "burst": self.burst,
+                "shared": self.store is not None,
+                "tokens": round(self.store.peek(self.rate, self.burst) if self.store is not None else self.tokens, 3),
+                "queue_depth": len(self._waiters),
+                "priorities": priorities,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+negative_cache = NegativeCache(config.NEGATIVE_CACHE_TTL_SECONDS, config.NEGATIVE_CACHE_MAX_ENTRIES)
+
+
+def get_breaker(source: str) -> CircuitBreaker:
+    """업스트림 소스별 서킷 브레이커"""
+    with _breakers_lock:
+        breaker = _breakers.get(source)
+        if breaker is None:
+            breaker = CircuitBreaker(
+                source, config.CIRCUIT_FAILURE_THRESHOLD, config.CIRCUIT_RESET_SECONDS
+            )
+            _breakers[source] = breaker
+        return breaker
+
+
+def breaker_status() -> Dict[str, Dict]:
+    with _breakers_lock:
+        return {name: breaker.status() for name, breaker in _breakers.items()}
+
+
+_limiters: Dict[str, TokenBucket] = {}
+_limiters_lock = threading.Lock()
+
+
+def _shared_store(source: str) -> Optional[SharedTokenStore]:
+    if config.UPSTREAM_RATE_SCOPE != "shared" or fcntl is None:
+        return None
+    safe_source = re.sub(r"[^0-9A-Za-z._-]", "_", source)
+    return SharedTokenStore(os.path.join(config.CACHE_DIR, "ratelimit", f"{safe_source}.bucket"))
+
+
+def get_limiter(source: str) -> TokenBucket:
+    """업스트림 소스별 호출 속도 제한 (UPSTREAM_RATE_SCOPE 가 shared 이면 캐시 디렉토리를 쓰는 프로세스 전체 기준)"""
+    with _limiters_lock:
+        limiter = _limiters.get(source)
+        if limiter is None:
+            limiter = TokenBucket(
+                source,
+                config.UPSTREAM_RATE_OVERRIDES.get(source, config.UPSTREAM_RATE_PER_SECOND),
+                config.UPSTREAM_BURST,
+                _shared_store(source),
+            )
+            _limiters[source] = limiter
+        return limiter
+
+
+def limiter_status() -> Dict[str, Dict]:
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {limiter.name: limiter.status() for limiter in limiters}
@@ -0,0 +1,141 @@
+"""
+종목 묶음 위험 지표 (변동성, 최대 낙폭, 상관/공분산 행렬)
+
+시세는 backtest_engine.load_panel 의 정렬된 패널을 사용하므로 같은 묶음의 백테스트와 캐시를 공유합니다.
+수익률은 종목별 실제 거래일에만 두고(휴장일은 NaN, 다음 거래일 수익률에 포함),
+상관/공분산은 두 종목이 함께 거래한 날만으로 계산합니다(pairwise).
+종목 쌍별 합계를 행렬 곱으로 한 번에 구하므로 종목 수가 많아도 반복문이 없습니다.
+"""
+import logging
+from typing import Dict, List
+
+import numpy as np
+
+import tracing
+from backtest_engine import NoPriceData, PriceSeries, aligned_prices, load_panel
+
+logger = logging.getLogger("stock-api.risk")
+
+# 연율화에 사용하는 연간 거래일 수
+TRADING_DAYS = 252
+
+
+def daily_returns(series: List[PriceSeries]):
+    """공통 달력과 종목별 일간 수익률 행렬 [날짜, 종목] (그 종목의 거래일이 아니면 NaN)"""
+    calendar, prices = aligned_prices(series)
+    traded = np.zeros(prices.shape, dtype=bool)
+    for j, s in enumerate(series):
+        traded[np.searchsorted(calendar, s.dates), j] = True
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = prices[1:] / prices[:-1] - 1.0
+    returns[~traded[1:]] = np.nan
+    return calendar, prices, returns
+
+
+def pairwise_moments(returns: np.ndarray, min_overlap: int):
+    """
+    종목 쌍별 (공통 거래일 수, 공분산, 상관계수) 행렬
+
+    공통 거래일이 min_overlap 보다 적은 쌍은 NaN 입니다.
+    """
+    valid = np.isfinite(returns)
+    x = np.where(valid, returns, 0.0)
+    m = valid.astype(np.float64)
+
+    n = m.T @ m  # 공통 거래일 수
+    sx = x.T @ m  # sx[i, j]: i, j 가 함께 거래한 날의 i 수익률 합
+    sxx = (x * x).T @ m
+    sxy = x.T @ x
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cov = (sxy - sx * sx.T / n) / (n - 1)
+        # 상관계수는 같은 공통 거래일의 분산으로 나눔
+        var = (sxx - sx * sx / n) / (n - 1)
+        corr = cov / np.sqrt(var * var.T)
+
+    insufficient = n < max(min_overlap, 2)
+    cov[insufficient] = np.nan
+    corr[insufficient] = np.nan
+    np.clip(corr, -1.0, 1.0, out=corr)
+    diagonal = np.arange(len(n))
+    corr[diagonal, diagonal] = np.where(insufficient[diagonal, diagonal], np.nan, 1.0)
+    return n.astype(np.int64), cov, corr
+
+
+def drawdowns(prices: np.ndarray):
+    """종목별 최대 낙폭 비율과 (고점, 저점) 위치 (가격 행렬은 상장 전 NaN)"""
+    running_peak = np.fmax.accumulate(prices, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdown = 1.0 - prices / running_peak
+    filled = np.where(np.isfinite(drawdown), drawdown, -np.inf)
+    trough = filled.argmax(axis=0)
+    # 저점 이전 구간의 최고가 위치
+    before_trough = np.arange(len(prices))[:, None] <= trough[None, :]
+    peak = np.where(before_trough & np.isfinite(prices), prices, -np.inf).argmax(axis=0)
+    return filled.max(axis=0), peak, trough
+
+
+def _matrix(values: np.ndarray, digits: int) -> List[List]:
+    return [[round(float(v), digits) if np.isfinite(v) else None for v in row] for row in values]
+
+
+def risk_matrix(symbols: List[str], start_date: str, end_date: str, currency: str, min_overlap: int) -> Dict:
+    """
+    종목별 변동성/수익률/최대 낙폭과 상관·공분산 행렬
+
+    변동성, 공분산, 수익률은 연율화 값이고 비율 값은 % 단위입니다.
+    프로세스 풀에서 실행되므로 결과는 JSON 으로 바로 보낼 수 있는 기본 타입만 사용합니다.
+    """
+    with tracing.span("backtest.load_series", symbols=len(symbols), currency=currency):
+        price_data = load_panel(symbols, start_date, end_date, currency)
+    if not price_data:
+        raise NoPriceData("요청한 종목들에 대한 데이터를 찾을 수 없습니다.")
+
+    found = list(price_data)
+    series = [price_data[s] for s in found]
+    with tracing.span("compute.risk_matrix", symbols=len(found)):
+        calendar, prices, returns = daily_returns(series)
+        _, cov, corr = pairwise_moments(returns, min_overlap)
+        observations = np.isfinite(returns).sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.nansum(returns, axis=0) / observations
+            variance = np.nansum((returns - mean) ** 2, axis=0) / (observations - 1)
+        volatility = np.sqrt(np.where(observations >= 2, variance, np.nan) * TRADING_DAYS)
+        max_drawdown, peak, trough = drawdowns(prices)
+
+        off_diagonal = corr[~np.eye(len(found), dtype=bool)]
+        off_diagonal = off_diagonal[np.isfinite(off_diagonal)]
+
+    dates = np.datetime_as_string(calendar, unit="D")
+    stats = []
+    for j, s in enumerate(series):
+        years = (s.dates[-1] - s.dates[0]) / np.timedelta64(1, "D") / 365.25
+        annual_return = (s.close[-1] / s.close[0]) ** (1.0 / years) - 1.0 if years > 0 else np.nan
+        stats.append(
+            {
+                "symbol": s.symbol,
+                "currency": s.currency,
+                "first_date": str(np.datetime_as_string(s.dates[0], unit="D")),
+                "observations": int(observations[j]),
+                "volatility": round(float(volatility[j]) * 100, 4) if np.isfinite(volatility[j]) else None,
+                "annual_return": round(float(annual_return) * 100, 4) if np.isfinite(annual_return) else None,
+                "max_drawdown": round(float(max_drawdown[j]) * 100, 4),
+                "peak_date": str(dates[peak[j]]),
+                "trough_date": str(dates[trough[j]]),
+            }
+        )
+
+    return {
+        "currency": currency,
+        "symbols": found,
+        "missing": [s for s in symbols if s not in price_data],
+        "period": {
+            "start_date": str(dates[0]),
+            "end_date": str(dates[-1]),
+            "trading_days": len(calendar),
+        },
+        "min_overlap_days": min_overlap,
+        "stats": stats,
+        "average_correlation": round(float(off_diagonal.mean()), 4) if len(off_diagonal) else None,
+        "correlation": _matrix(corr, 4),
+        "covariance": _matrix(cov * TRADING_DAYS, 8),
+    }
@@ -0,0 +1,298 @@
+"""
+여러 uvicorn 워커가 공유하는 메모리 매핑 스냅샷 캐시
+
+- 종목 목록과 가격 시계열을 컬럼 단위 바이너리 파일로 저장합니다.
+- 모든 워커는 파일을 읽기 전용으로 mmap 하므로 같은 페이지 캐시를 공유합니다.
+- 갱신은 임시 파일에 쓴 뒤 os.replace 로 원자적으로 교체합니다.
+- 파일 잠금으로 같은 항목은 한 프로세스만 가져오도록 합니다.
+"""
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+import config
+from memory import Entry, UsageTracker
+
+try:
+    import fcntl
+except ImportError:  # Windows 에서는 프로세스 간 잠금 없이 동작
+    fcntl = None
+
+logger = logging.getLogger("stock-api.cache")
+
+_MAGIC = b"STKSNAP1"
+_ALIGN = 8
+# 시간 제한이 있는 잠금 재시도 간격 (초)
+_LOCK_POLL_SECONDS = 0.02
+
+
+class LockTimeout(TimeoutError):
+    """시간 제한 안에 항목 잠금을 얻지 못함"""
+
+
+# ======== 문자열 컬럼 ========
+def encode_strings(values: Iterable) -> Tuple[np.ndarray, np.ndarray]:
+    """문자열 목록을 UTF-8 바이트 배열과 오프셋 배열로 변환"""
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    if encoded:
+        offsets[1:] = np.cumsum([len(b) for b in encoded])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+    return blob, offsets
+
+
+class StringColumn:
+    """바이트 배열 + 오프셋으로 저장된 읽기 전용 문자열 컬럼"""
+
+    __slots__ = ("blob", "offsets")
+
+    def __init__(self, blob: np.ndarray, offsets: np.ndarray):
+        self.blob = blob
+        self.offsets = offsets
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: int) -> str:
+        start, end = self.offsets[i], self.offsets[i + 1]
+        return self.blob[start:end].tobytes().decode("utf-8")
+
+    def tolist(self) -> List[str]:
+        raw = self.blob.tobytes()
+        offs = self.offsets.tolist()
+        return [raw[offs[i] : offs[i + 1]].decode("utf-8") for i in range(len(offs) - 1)]
+
+
+# ======== 스냅샷 파일 ========
+def write_snapshot(path: str, columns: Dict[str, np.ndarray], meta: Dict) -> None:
+    """컬럼 배열들을 하나의 스냅샷 파일로 저장 (원자적 교체)"""
+    specs = {}
+    chunks = []
+    offset = 0
+    for name, arr in columns.items():
+        arr = np.ascontiguousarray(arr)
+        data = arr.tobytes()
+        specs[name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        pad = (-len(data)) % _ALIGN
+        chunks.append(data + b"\0" * pad)
+        offset += len(data) + pad
+
+    header = json.dumps({"columns": specs, "meta": meta}, ensure_ascii=False).encode("utf-8")
+    header += b" " * ((-(len(_MAGIC) + 4 + len(header))) % _ALIGN)
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(struct.pack("<I", len(header)))
+            f.write(header)
+            for chunk in chunks:
+                f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+class Snapshot:
+    """읽기 전용으로 매핑된 스냅샷 (컬럼은 mmap 위의 NumPy 뷰)"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            st = os.fstat(f.fileno())
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.path = path
+        self.identity = (st.st_ino, st.st_mtime_ns)
+        self.nbytes = st.st_size
+
+        if self._mm[: len(_MAGIC)] != _MAGIC:
+            raise ValueError(f"스냅샷 형식이 올바르지 않습니다: {path}")
+
+        (header_len,) = struct.unpack_from("<I", self._mm, len(_MAGIC))
+        header_start = len(_MAGIC) + 4
+        header = json.loads(self._mm[header_start : header_start + header_len].decode("utf-8"))
+        base = header_start + header_len
+
+        self.meta: Dict = header["meta"]
+        self.columns: Dict[str, np.ndarray] = {}
+        self._file_offsets: Dict[str, int] = {}
+        for name, spec in header["columns"].items():
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            count = int(np.prod(shape)) if shape else 1
+            self.columns[name] = np.frombuffer(
+                self._mm, dtype=dtype, count=count, offset=base + spec["offset"]
+            ).reshape(shape)
+            self._file_offsets[name] = base + spec["offset"]
+
+    @property
+    def buffer(self) -> mmap.mmap:
+        """매핑된 파일 전체 (mmap.find 등 복사 없는 검색용)"""
+        return self._mm
+
+    def column_offset(self, name: str) -> int:
+        """컬럼 데이터가 시작하는 파일 내 위치"""
+        return self._file_offsets[name]
+
+    def strings(self, name: str) -> StringColumn:
+        """`{name}_blob`, `{name}_offsets` 컬럼을 문자열 컬럼으로 반환"""
+        return StringColumn(self.columns[f"{name}_blob"], self.columns[f"{name}_offsets"])
+
+
+# ======== 공유 캐시 ========
+class SharedSnapshotCache:
+    """네임스페이스/키 단위로 스냅샷을 저장하고 프로세스별로 매핑을 재사용"""
+
+    def __init__(self, root: str):
+        self.root = root
+        self._mapped: Dict[str, Tuple[Snapshot, float]] = {}
+        self._lock = threading.Lock()
+        self.usage = UsageTracker()
+        self._writer_file = None
+
+    def path(self, namespace: str, key: str) -> str:
+        safe_key = re.sub(r"[^0-9A-Za-z._-]", "_", key)
+        return os.path.join(self.root, namespace, f"{safe_key}.snap")
+
+    def get(self, namespace: str, key: str, force: bool = False) -> Optional[Snapshot]:
+        """매핑된 스냅샷 반환 (다른 워커가 교체했다면 새로 매핑)"""
+        path = self.path(namespace, key)
+        now = time.monotonic()
+        self.usage.touch(path)
+
+        with self._lock:
+            cached = self._mapped.get(path)
+        if cached and not force and now - cached[1] < config.SNAPSHOT_CHECK_SECONDS:
+            return cached[0]
+
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._mapped.pop(path, None)
+            return None
+
+        if cached and cached[0].identity == (st.st_ino, st.st_mtime_ns):
+            snapshot = cached[0]
+        else:
+            snapshot = Snapshot(path)
+
+        with self._lock:
+            self._mapped[path] = (snapshot, now)
+        return snapshot
+
+    def memory_entries(self, namespace: str) -> List[Entry]:
+        """이 프로세스가 매핑 중인 네임스페이스 스냅샷 (키는 캐시 디렉토리 기준 상대 경로)"""
+        directory = os.path.join(self.root, namespace) + os.sep
+        with self._lock:
+            mapped = [(path, snapshot) for path, (snapshot, _) in self._mapped.items() if path.startswith(directory)]
+        return [
+            (os.path.relpath(path, self.root), snapshot.nbytes, *self.usage.get(path))
+            for path, snapshot in mapped
+        ]
+
+    def release(self, key: str) -> None:
+        """매핑 해제 (파일은 유지하며 다음 조회 때 다시 매핑)"""
+        path = os.path.join(self.root, key)
+        with self._lock:
+            self._mapped.pop(path, None)
+        self.usage.forget(path)
+
+    def put(self, namespace: str, key: str, columns: Dict[str, np.ndarray], meta: Dict) -> Snapshot:
+        """스냅샷 저장 후 새로 매핑한 스냅샷 반환"""
+        write_snapshot(self.path(namespace, key), columns, meta)
+        return self.get(namespace, key, force=True)
+
+    @contextmanager
+    def exclusive(self, namespace: str, key: str, timeout: Optional[float] = None):
+        """같은 항목을 갱신하는 프로세스가 하나뿐이도록 잠금 (timeout 안에 얻지 못하면 LockTimeout)"""
+        lock_path = self.path(namespace, key) + ".lock"
+        os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+        with open(lock_path, "a") as lock_file:
+            if fcntl and timeout is None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+            elif fcntl:
+                give_up_at = time.monotonic() + timeout
+                while True:
+                    try:
+                        fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        break
+                    except OSError:
+                        if time.monotonic() >= give_up_at:
+                            raise LockTimeout(f"{namespace}/{key} 잠금 대기 시간 초과")
+                        time.sleep(_LOCK_POLL_SECONDS)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+    def try_acquire_writer(self) -> bool:
+        """쓰기 담당 워커 잠금 시도 (획득하면 프로세스 종료 시까지 유지)"""
+        if self._writer_file is not None:
+            return True
+
+        os.makedirs(self.root, exist_ok=True)
+        lock_file = open(os.path.join(self.root, "writer.lock"), "a")
+        if fcntl:
+            try:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+
+        self._writer_file = lock_file
+        logger.info(f"스냅샷 쓰기 담당 워커로 선출됨: pid={os.getpid()}")
+        return True
+
+    def paths(self, namespace: str) -> List[str]:
+        """네임스페이스에 저장된 스냅샷 파일 경로 목록"""
+        directory = os.path.join(self.root, namespace)
+        if not os.path.isdir(directory):
+            return []
+        return [
+            os.path.join(directory, name)
+            for name in os.listdir(directory)
+            if name.endswith(".snap")
+        ]
+
+    def prune(self, namespace: str, max_entries: int, keep: Iterable[str] = ()) -> int:
+        """
+        오래 갱신되지 않은 스냅샷부터 삭제하여 최대 개수 유지
+
+        keep 에 있는 키의 스냅샷은 개수에 넣지 않고 삭제하지도 않습니다.
+        """
+        kept = {self.path(namespace, key) for key in keep}
+        paths = [p for p in self.paths(namespace) if p not in kept]
+        if len(paths) <= max_entries:
+            return 0
+
+        def _mtime(p):
+            try:
+                return os.stat(p).st_mtime
+            except FileNotFoundError:
+                return 0
+
+        paths.sort(key=_mtime)
+        removed = 0
+        for path in paths[: len(paths) - max_entries]:
+            try:
+                os.remove(path)
+                removed += 1
+            except FileNotFoundError:
+                continue
+        logger.info(f"{namespace} 스냅샷 {removed}개 정리")
+        return removed
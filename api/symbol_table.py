@@ -0,0 +1,188 @@
+"""
+배열 기반 종목 심볼 테이블
+
+fdr 종목 목록에서 심볼/종목명/검색 키만 뽑아 연속된 바이트 배열로 보관합니다.
+컬럼 이름 추정은 테이블을 만들 때 한 번만 수행하며,
+스냅샷에서 복원한 테이블은 mmap 위의 배열을 그대로 사용합니다.
+"""
+import unicodedata
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from shared_cache import Snapshot, StringColumn, encode_strings
+
+# 시장 종류별 심볼/종목명 컬럼 후보 (앞에 있을수록 우선)
+ETF_SYMBOL_COLUMNS = ["티커", "Symbol", "Code", "code", "symbol"]
+ETF_NAME_COLUMNS = ["종목명", "Name", "name"]
+STOCK_SYMBOL_COLUMNS = ["Symbol", "Code", "code", "symbol", "티커"]
+STOCK_NAME_COLUMNS = ["Name", "Name(KOR)", "korean_name", "name", "종목명"]
+
+# 검색 키 구분자 (공백 문자로 취급되므로 정규화된 검색어에는 나타나지 않음)
+KEY_SEPARATOR = "\x1f"
+ROW_TERMINATOR = "\x1e"
+
+
+def normalize_key(text: str) -> str:
+    """검색용 정규화 (NFKC, 대소문자 무시, 공백 제거)"""
+    return "".join(unicodedata.normalize("NFKC", str(text)).casefold().split())
+
+
+def guess_columns(columns: List[str], market: str) -> Tuple[Optional[str], Optional[str]]:
+    """종목 목록에서 심볼/종목명 컬럼 추정"""
+    if market.startswith("ETF"):
+        symbol_candidates, name_candidates = ETF_SYMBOL_COLUMNS, ETF_NAME_COLUMNS
+    else:
+        symbol_candidates, name_candidates = STOCK_SYMBOL_COLUMNS, STOCK_NAME_COLUMNS
+
+    symbol_col = next((col for col in symbol_candidates if col in columns), None)
+    name_col = next((col for col in name_candidates if col in columns), None)
+    return symbol_col, name_col
+
+
+class SymbolRecord:
+    """심볼 테이블의 한 행"""
+
+    __slots__ = ("symbol", "name", "market", "row")
+
+    def __init__(self, symbol: str, name: str, market: str, row: int):
+        self.symbol = symbol
+        self.name = name
+        self.market = market
+        self.row = row
+
+    def to_dict(self) -> Dict[str, str]:
+        return {"symbol": self.symbol, "name": self.name, "market": self.market}
+
+    def __repr__(self) -> str:
+        return f"SymbolRecord({self.symbol!r}, {self.name!r}, {self.market!r})"
+
+
+class SymbolTable:
+    """한 시장의 심볼/종목명/검색 키 테이블"""
+
+    # 스냅샷 형식 버전 (컬럼 구성이 바뀌면 올려서 기존 스냅샷을 다시 만들게 함)
+    FORMAT = 2
+
+    def __init__(
+        self,
+        market: str,
+        columns: Dict[str, np.ndarray],
+        haystack: Optional[Tuple[object, int]] = None,
+        version: int = 0,
+    ):
+        self.market = market
+        # 종목 목록 버전 (변경 내역 동기화 기준, 스냅샷에서 복원한 경우에만 의미 있음)
+        self.version = version
+        self.symbols = StringColumn(columns["symbol_blob"], columns["symbol_offsets"])
+        self.names = StringColumn(columns["name_blob"], columns["name_offsets"])
+        self.keys = StringColumn(columns["search_key_blob"], columns["search_key_offsets"])
+        self._sorted_symbols = columns["symbol_sorted"]
+        self._symbol_order = columns["symbol_order"]
+        # 검색 대상 버퍼와 검색 키 시작 위치 (mmap 이면 복사 없이 find 사용)
+        self._haystack = haystack or (self.keys.blob.tobytes(), 0)
+
+    @classmethod
+    def from_listing(cls, listing: pd.DataFrame, market: str) -> "SymbolTable":
+        """fdr 종목 목록으로 테이블 생성"""
+        columns = listing.columns.tolist()
+        symbol_col, name_col = guess_columns(columns, market)
+        if not symbol_col or not name_col:
+            raise ValueError(f"시장 {market}에서 적절한 컬럼을 찾을 수 없습니다. 컬럼: {columns}")
+
+        symbols = [str(s) for s in listing[symbol_col].tolist()]
+        names = [str(n) for n in listing[name_col].tolist()]
+        keys = [
+            normalize_key(s) + KEY_SEPARATOR + normalize_key(n) + ROW_TERMINATOR
+            for s, n in zip(symbols, names)
+        ]
+
+        encoded_symbols = np.array([s.encode("utf-8") for s in symbols], dtype=bytes)
+        order = np.argsort(encoded_symbols, kind="stable").astype(np.int32)
+
+        symbol_blob, symbol_offsets = encode_strings(symbols)
+        name_blob, name_offsets = encode_strings(names)
+        key_blob, key_offsets = encode_strings(keys)
+
+        return cls(
+            market,
+            {
+                "symbol_blob": symbol_blob,
+                "symbol_offsets": symbol_offsets,
+                "name_blob": name_blob,
+                "name_offsets": name_offsets,
+                "search_key_blob": key_blob,
+                "search_key_offsets": key_offsets,
+                "symbol_sorted": encoded_symbols[order],
+                "symbol_order": order,
+            },
+        )
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Snapshot) -> "SymbolTable":
+        """mmap 스냅샷 위에 테이블 구성 (배열 복사 없음)"""
+        haystack = (snapshot.buffer, snapshot.column_offset("search_key_blob"))
+        return cls(snapshot.meta["market"], snapshot.columns, haystack, snapshot.meta.get("version", 0))
+
+    def to_columns(self) -> Dict[str, np.ndarray]:
+        """스냅샷 저장용 컬럼"""
+        return {
+            "symbol_blob": self.symbols.blob,
+            "symbol_offsets": self.symbols.offsets,
+            "name_blob": self.names.blob,
+            "name_offsets": self.names.offsets,
+            "search_key_blob": self.keys.blob,
+            "search_key_offsets": self.keys.offsets,
+            "symbol_sorted": self._sorted_symbols,
+            "symbol_order": self._symbol_order,
+        }
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __iter__(self) -> Iterator[SymbolRecord]:
+        for row, (symbol, name) in enumerate(zip(self.symbols.tolist(), self.names.tolist())):
+            yield SymbolRecord(symbol, name, self.market, row)
+
+    def record(self, row: int) -> SymbolRecord:
+        return SymbolRecord(self.symbols[row], self.names[row], self.market, row)
+
+    def find(self, symbol: str) -> Optional[SymbolRecord]:
+        """심볼이 정확히 일치하는 종목 (정렬 배열 이진 탐색)"""
+        key = symbol.encode("utf-8")
+        i = int(np.searchsorted(self._sorted_symbols, key))
+        if i < len(self._sorted_symbols) and self._sorted_symbols[i] == key:
+            return self.record(int(self._symbol_order[i]))
+        return None
+
+    def row_map(self, other: "SymbolTable") -> np.ndarray:
+        """이 테이블 각 행과 심볼이 같은 other 테이블의 행 (없으면 -1)"""
+        result = np.full(len(self), -1, dtype=np.int64)
+        if len(self) == 0 or len(other) == 0:
+            return result
+        pos = np.searchsorted(other._sorted_symbols, self._sorted_symbols)
+        pos = np.minimum(pos, len(other) - 1)
+        found = other._sorted_symbols[pos] == self._sorted_symbols
+        result[self._symbol_order[found]] = other._symbol_order[pos[found]]
+        return result
+
+    def search(self, query: str, limit: Optional[int] = None) -> List[SymbolRecord]:
+        """심볼 또는 종목명에 검색어가 포함된 종목 (목록 순서 유지)"""
+        needle = normalize_key(query).encode("utf-8")
+        if not needle:
+            count = len(self) if limit is None else min(limit, len(self))
+            return [self.record(row) for row in range(count)]
+
+        buffer, base = self._haystack
+        offsets = self.keys.offsets
+        end = base + int(offsets[-1])
+
+        results = []
+        pos = buffer.find(needle, base, end)
+        while pos >= 0 and (limit is None or len(results) < limit):
+            row = int(np.searchsorted(offsets, pos - base, side="right")) - 1
+            results.append(self.record(row))
+            # 같은 종목에서 다시 찾지 않도록 다음 행부터 검색
+            pos = buffer.find(needle, base + int(offsets[row + 1]), end)
+        return results
@@ -0,0 +1,15 @@
+"""
+테스트 공통 환경 (가짜 데이터 제공자, 임시 캐시/데이터 디렉토리)
+
+config 가 import 시점에 환경 변수를 읽으므로 테스트 모듈보다 먼저 설정합니다.
+"""
+import os
+import sys
+import tempfile
+
+_TMP = tempfile.mkdtemp(prefix="stock-api-test-")
+os.environ["STOCK_DATA_PROVIDER"] = "fake"
+os.environ["STOCK_CACHE_DIR"] = os.path.join(_TMP, "cache")
+os.environ["STOCK_DATA_DIR"] = os.path.join(_TMP, "data")
+os.environ["FAKE_PROVIDER_LATENCY_MS"] = "0"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,107 @@
+"""
+half-open 시험 호출이 요청 시간 예산을 넘겼을 때 서킷이 다시 시험 호출을 허용하는지 확인
+
+python -m pytest -q api/tests
+"""
+import time
+
+import pytest
+
+import config
+import market_data
+import resilience
+from resilience import CircuitBreaker, DeadlineExceeded, UpstreamUnavailable, deadline
+
+RESET = 0.2
+
+
+@pytest.fixture
+def symbol(monkeypatch):
+    listing = market_data.fdr.StockListing("KOSPI")
+    code = str(listing.iloc[0]["Code"])
+    monkeypatch.setattr(config, "CIRCUIT_FAILURE_THRESHOLD", 1)
+    monkeypatch.setattr(config, "CIRCUIT_RESET_SECONDS", RESET)
+    monkeypatch.setattr(resilience, "_breakers", {})
+    return code
+
+
+def _slow_reader(delay):
+    original = market_data.fdr.DataReader
+
+    def DataReader(symbol, start=None, end=None):
+        time.sleep(delay)
+        return original(symbol, start, end)
+
+    return DataReader
+
+
+def _failing_reader(symbol, start=None, end=None):
+    raise RuntimeError("upstream down")
+
+
+def _wait_idle(timeout=2.0):
+    """버려진 업스트림 호출이 모두 끝날 때까지 대기"""
+    limit = time.monotonic() + timeout
+    while market_data._inflight_calls and time.monotonic() < limit:
+        time.sleep(0.01)
+    time.sleep(0.02)
+
+
+def _open(breaker, symbol, monkeypatch):
+    with monkeypatch.context() as patch:
+        patch.setattr(market_data.fdr, "DataReader", _failing_reader)
+        with pytest.raises(UpstreamUnavailable):
+            market_data._fetch_prices(symbol, "2020-01-01", "2020-02-01")
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_deadline_during_half_open_trial_releases_slot(symbol, monkeypatch):
+    breaker = resilience.get_breaker(market_data.price_source(symbol))
+    _open(breaker, symbol, monkeypatch)
+
+    # 대기 시간이 지난 뒤의 시험 호출이 예산을 넘기면 슬롯만 풀림
+    time.sleep(RESET + 0.05)
+    with monkeypatch.context() as patch:
+        patch.setattr(market_data.fdr, "DataReader", _slow_reader(0.3))
+        with deadline(0.05), pytest.raises(DeadlineExceeded):
+            market_data._fetch_prices(symbol, "2020-01-01", "2020-03-01")
+        assert breaker.state == CircuitBreaker.HALF_OPEN
+        assert not breaker._trial_in_flight
+        _wait_idle()
+
+    # 버려진 시험 호출이 성공했으므로 서킷이 닫힘
+    assert breaker.state == CircuitBreaker.CLOSED
+    df = market_data._fetch_prices(symbol, "2020-01-01", "2020-04-01")
+    assert not df.empty
+
+
+def test_abandoned_trial_failure_reopens_circuit(symbol, monkeypatch):
+    breaker = resilience.get_breaker(market_data.price_source(symbol))
+    _open(breaker, symbol, monkeypatch)
+
+    time.sleep(RESET + 0.05)
+
+    def slow_failure(symbol, start=None, end=None):
+        time.sleep(0.3)
+        raise RuntimeError("upstream down")
+
+    with monkeypatch.context() as patch:
+        patch.setattr(market_data.fdr, "DataReader", slow_failure)
+        with deadline(0.05), pytest.raises(DeadlineExceeded):
+            market_data._fetch_prices(symbol, "2020-01-01", "2020-03-01")
+        _wait_idle()
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+def test_deadline_timeouts_keep_closed_circuit_closed(symbol, monkeypatch):
+    breaker = resilience.get_breaker(market_data.price_source(symbol))
+    with monkeypatch.context() as patch:
+        patch.setattr(market_data.fdr, "DataReader", _slow_reader(0.3))
+        for month in range(2, 6):
+            with deadline(0.05), pytest.raises(DeadlineExceeded):
+                market_data._fetch_prices(symbol, "2020-01-01", f"2020-0{month}-01")
+            assert breaker.state == CircuitBreaker.CLOSED
+        _wait_idle()
+
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.failures == 0
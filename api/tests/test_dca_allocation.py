@@ -0,0 +1,101 @@
+"""
+적립식 백테스트 결과를 기존(엔진 분리 전) 매수 루프와 비교
+
+비중 합계가 100% 이면 기존과 같은 결과가 나와야 하고, 100% 미만이면 기존에는 사라지던
+비중 없는 금액이 현금으로 남아 다음 정기 투자에 더해지므로 결과가 달라집니다.
+
+python -m pytest -q api/tests
+"""
+import math
+
+import pandas as pd
+import pytest
+
+import backtest_engine
+import market_data
+from backtest_routes import BacktestDCARequest
+
+START = "2015-01-05"
+END = "2020-01-01"
+
+
+def _baseline_dca(request: BacktestDCARequest, end_date: str, keep_unallocated: bool):
+    """기존 backtest_dca 매수 루프 (keep_unallocated 면 비중 없는 금액을 현금으로 남김)"""
+    price_data = {s: market_data.fdr.DataReader(s, request.start_date, end_date) for s in request.symbols}
+    investment_dates = backtest_engine.investment_schedule(request.start_date, end_date, request.investment_frequency)
+    fee_ratio = request.fee_rate / 100.0
+    shares = {s: 0 for s in request.symbols}
+    cash = 0.0
+
+    def _buy(amount, date):
+        leftover = 0.0
+        allocated = 0.0
+        for symbol in request.symbols:
+            df = price_data[symbol]
+            valid = df.index[df.index >= date]
+            pct = request.allocation.get(symbol, 0) / 100.0
+            if len(valid) == 0 or pct <= 0:
+                continue
+            invest = amount * pct
+            price = df.loc[valid[0]]["Close"]
+            fee = invest * fee_ratio
+            bought = math.floor((invest - fee) / price)
+            shares[symbol] += bought
+            leftover += invest - (bought * price + fee)
+            allocated += invest
+        if keep_unallocated:
+            leftover += amount - allocated
+        return leftover
+
+    if request.initial_amount > 0:
+        cash += _buy(request.initial_amount, pd.Timestamp(request.start_date))
+    for date in investment_dates:
+        cash = _buy(request.investment_amount + cash, date)
+
+    final_value = cash + sum(n * price_data[s]["Close"].iloc[-1] for s, n in shares.items())
+    return final_value, shares
+
+
+def _engine_dca(request: BacktestDCARequest):
+    result = backtest_engine.backtest_dca(request, END, "KRW")
+    shares = {row["symbol"]: row["shares"] for row in result["portfolio"] if row["symbol"] in request.symbols}
+    return result["summary"]["final_value"], shares
+
+
+def _request(allocation):
+    return BacktestDCARequest(
+        symbols=list(allocation),
+        allocation=allocation,
+        start_date=START,
+        end_date=END,
+        initial_amount=1000000,
+        investment_amount=100000,
+        investment_frequency="quarterly",
+    )
+
+
+@pytest.fixture
+def symbols():
+    listing = market_data.fdr.StockListing("KOSPI")
+    return [str(code) for code in listing["Code"].iloc[:2]]
+
+
+def test_full_allocation_matches_baseline(symbols):
+    request = _request({symbols[0]: 60, symbols[1]: 40})
+    final_value, shares = _engine_dca(request)
+    expected_value, expected_shares = _baseline_dca(request, END, keep_unallocated=False)
+
+    assert shares == expected_shares
+    assert final_value == pytest.approx(expected_value, rel=1e-9)
+
+
+def test_partial_allocation_keeps_unallocated_cash(symbols):
+    request = _request({symbols[0]: 50, symbols[1]: 30})
+    final_value, shares = _engine_dca(request)
+    kept_value, kept_shares = _baseline_dca(request, END, keep_unallocated=True)
+    dropped_value, _ = _baseline_dca(request, END, keep_unallocated=False)
+
+    # 비중 없는 20% 는 현금으로 남아 다음 투자에 더해지며, 기존 결과(사라짐)보다 커짐
+    assert shares == kept_shares
+    assert final_value == pytest.approx(kept_value, rel=1e-9)
+    assert final_value > dropped_value
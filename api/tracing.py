@@ -0,0 +1,352 @@
+"""
+요청 단위 구간(span) 추적
+
+요청마다 trace 를 만들고 업스트림 호출, 심볼/시세 조회, 계산, 직렬화 구간을 span 으로 기록합니다.
+끝난 trace 는 OTLP/JSON 형식(ExportTraceServiceRequest, 한 줄에 하나)으로 파일에 쓰거나
+OTLP/HTTP 수집기(/v1/traces)로 보내며, TRACE_SLOW_MS 를 넘긴 요청은 span 트리 전체를 로그에 남깁니다.
+
+현재 span 은 contextvars 로 전달되므로 asyncio.to_thread/스레드풀 엔드포인트에도 이어지고,
+프로세스 풀 작업은 call_with_context() 로 자식 프로세스의 span 을 돌려받아 합칩니다.
+trace 밖(백그라운드 스레드 등)에서의 span() 호출은 아무것도 기록하지 않습니다.
+"""
+import asyncio
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import threading
+import time
+import urllib.request
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+import config
+
+logger = logging.getLogger("stock-api.trace")
+
+SERVICE_NAME = "stock-api"
+
+# OTLP span 종류 / 상태 코드
+KIND_INTERNAL = 1
+KIND_SERVER = 2
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+_current_span: "contextvars.ContextVar[Optional[Span]]" = contextvars.ContextVar("trace_span", default=None)
+
+
+def _new_id(nbytes: int) -> str:
+    return os.urandom(nbytes).hex()
+
+
+class Trace:
+    """한 요청의 span 모음 (여러 스레드에서 추가될 수 있음)"""
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or _new_id(16)
+        self.spans: List[Dict] = []
+        self.dropped = 0
+        self._lock = threading.Lock()
+
+    def add(self, record: Dict) -> None:
+        with self._lock:
+            if len(self.spans) >= config.TRACE_MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append(record)
+
+    def extend(self, records: List[Dict]) -> None:
+        for record in records:
+            self.add(record)
+
+
+class Span:
+    """진행 중인 구간 (끝나면 trace 에 기록)"""
+
+    __slots__ = ("trace", "span_id", "parent_id", "name", "kind", "attributes", "start_ns", "_perf_ns", "status", "message")
+
+    def __init__(self, trace: Trace, name: str, parent_id: Optional[str], kind: int, attributes: Dict):
+        self.trace = trace
+        self.span_id = _new_id(8)
+        self.parent_id = parent_id
+        self.name = name
+        self.kind = kind
+        self.attributes = attributes
+        self.start_ns = time.time_ns()
+        self._perf_ns = time.perf_counter_ns()
+        self.status = STATUS_OK
+        self.message = None
+
+    def set(self, key: str, value) -> None:
+        self.attributes[key] = value
+
+    def error(self, error: BaseException) -> None:
+        self.status = STATUS_ERROR
+        self.message = f"{type(error).__name__}: {error}"
+
+    def finish(self) -> Dict:
+        record = {
+            "trace_id": self.trace.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "kind": self.kind,
+            "start_ns": self.start_ns,
+            "end_ns": self.start_ns + time.perf_counter_ns() - self._perf_ns,
+            "attributes": self.attributes,
+            "status": self.status,
+            "message": self.message,
+        }
+        self.trace.add(record)
+        return record
+
+
+class _NoopSpan:
+    def set(self, key: str, value) -> None:
+        pass
+
+    def error(self, error: BaseException) -> None:
+        pass
+
+
+_NOOP = _NoopSpan()
+
+
+@contextmanager
+def span(name: str, **attributes):
+    """현재 trace 안에 하위 구간 기록 (trace 밖이면 아무것도 하지 않음)"""
+    parent = _current_span.get()
+    if parent is None:
+        yield _NOOP
+        return
+
+    current = Span(parent.trace, name, parent.span_id, KIND_INTERNAL, attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.error(e)
+        raise
+    finally:
+        _current_span.reset(token)
+        current.finish()
+
+
+def annotate(key: str, value) -> None:
+    """현재 span 에 속성 추가 (trace 밖이면 무시)"""
+    current = _current_span.get()
+    if current is not None:
+        current.set(key, value)
+
+
+# ======== 프로세스 풀 전달 ========
+def remote_context() -> Optional[Tuple[str, str]]:
+    """자식 프로세스로 넘길 (trace_id, 현재 span_id)"""
+    current = _current_span.get()
+    if current is None:
+        return None
+    return current.trace.trace_id, current.span_id
+
+
+def call_with_context(context: Optional[Tuple[str, str]], fn, *args):
+    """자식 프로세스에서 부모 trace 를 이어 fn 실행 후 (결과, span 기록 목록) 반환"""
+    if context is None:
+        return fn(*args), []
+
+    trace = Trace(context[0])
+    root = Span(trace, fn.__name__, context[1], KIND_INTERNAL, {"pid": os.getpid()})
+    token = _current_span.set(root)
+    try:
+        result = fn(*args)
+    finally:
+        _current_span.reset(token)
+        root.finish()
+    return result, trace.spans
+
+
+def adopt(records: List[Dict]) -> None:
+    """자식 프로세스에서 받은 span 기록을 현재 trace 에 추가"""
+    current = _current_span.get()
+    if current is not None and records:
+        current.trace.extend(records)
+
+
+# ======== 출력 ========
+def _otlp_value(value) -> Dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def to_otlp(trace: Trace) -> Dict:
+    """OTLP/JSON ExportTraceServiceRequest"""
+    spans = []
+    for record in trace.spans:
+        item = {
+            "traceId": record["trace_id"],
+            "spanId": record["span_id"],
+            "name": record["name"],
+            "kind": record["kind"],
+            "startTimeUnixNano": str(record["start_ns"]),
+            "endTimeUnixNano": str(record["end_ns"]),
+            "attributes": [
+                {"key": key, "value": _otlp_value(value)} for key, value in record["attributes"].items()
+            ],
+            "status": {"code": record["status"]},
+        }
+        if record["parent_id"]:
+            item["parentSpanId"] = record["parent_id"]
+        if record["message"]:
+            item["status"]["message"] = record["message"]
+        spans.append(item)
+
+    return {
+        "resourceSpans": [
+            {
+                "resource": {
+                    "attributes": [
+                        {"key": "service.name", "value": {"stringValue": SERVICE_NAME}},
+                        {"key": "process.pid", "value": {"intValue": str(os.getpid())}},
+                    ]
+                },
+                "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": spans}],
+            }
+        ]
+    }
+
+
+def format_tree(trace: Trace) -> str:
+    """span 트리를 시작 순서대로 들여쓴 문자열"""
+    children: Dict[Optional[str], List[Dict]] = {}
+    known = {record["span_id"] for record in trace.spans}
+    for record in sorted(trace.spans, key=lambda r: r["start_ns"]):
+        parent = record["parent_id"] if record["parent_id"] in known else None
+        children.setdefault(parent, []).append(record)
+
+    lines = []
+
+    def _walk(parent: Optional[str], depth: int) -> None:
+        for record in children.get(parent, []):
+            duration = (record["end_ns"] - record["start_ns"]) / 1e6
+            attributes = " ".join(f"{key}={value}" for key, value in record["attributes"].items())
+            error = f" [오류 {record['message']}]" if record["status"] == STATUS_ERROR else ""
+            lines.append(f"{duration:9.1f}ms {'  ' * depth}{record['name']} {attributes}{error}".rstrip())
+            _walk(record["span_id"], depth + 1)
+
+    _walk(None, 0)
+    if trace.dropped:
+        lines.append(f"(span {trace.dropped}개 생략)")
+    return "\n".join(lines)
+
+
+_export_queue: "queue.Queue[Dict]" = queue.Queue(maxsize=1000)
+_exporter: Optional[threading.Thread] = None
+_exporter_lock = threading.Lock()
+
+
+def _export_loop() -> None:
+    while True:
+        payload = _export_queue.get()
+        line = json.dumps(payload, ensure_ascii=False)
+        if config.TRACE_FILE:
+            try:
+                with open(config.TRACE_FILE, "a", encoding="utf-8") as f:
+                    f.write(line + "\n")
+            except OSError as e:
+                logger.warning(f"trace 파일 기록 실패: {str(e)}")
+        if config.TRACE_OTLP_ENDPOINT:
+            try:
+                request = urllib.request.Request(
+                    config.TRACE_OTLP_ENDPOINT.rstrip("/") + "/v1/traces",
+                    data=line.encode("utf-8"),
+                    headers={"Content-Type": "application/json"},
+                )
+                urllib.request.urlopen(request, timeout=5).close()
+            except Exception as e:
+                logger.warning(f"trace 전송 실패: {str(e)}")
+
+
+def _export(trace: Trace) -> None:
+    global _exporter
+    with _exporter_lock:
+        if _exporter is None:
+            _exporter = threading.Thread(target=_export_loop, name="trace-export", daemon=True)
+            _exporter.start()
+    try:
+        _export_queue.put_nowait(to_otlp(trace))
+    except queue.Full:
+        logger.warning("trace 내보내기 대기열이 가득 차 버림")
+
+
+def _finish_trace(trace: Trace, root: Dict) -> None:
+    duration_ms = (root["end_ns"] - root["start_ns"]) / 1e6
+    slow = 0 < config.TRACE_SLOW_MS <= duration_ms and not root["attributes"].get("http.streaming")
+    if slow:
+        logger.warning(f"느린 요청 {duration_ms:.1f}ms: {root['name']} (trace {trace.trace_id})\n{format_tree(trace)}")
+    if (config.TRACE_FILE or config.TRACE_OTLP_ENDPOINT) and (slow or random.random() < config.TRACE_SAMPLE_RATE):
+        _export(trace)
+
+
+# ======== ASGI 미들웨어 ========
+# 이벤트 루프 태스크 -> 진행 중인 요청 (scope, 루트 span), 다른 스레드에서 루프를 멈춘 요청을 찾을 때 사용
+_active_requests: Dict[object, Tuple[Dict, Span]] = {}
+
+
+def route_name(scope: Dict) -> str:
+    """라우터가 scope 에 채운 경로 템플릿 (/api/stock-data, /api/backtest/jobs/{job_id}), 라우팅 전이면 실제 경로"""
+    route = scope.get("route")
+    if route is not None and getattr(route, "path", None):
+        return f"{scope['method']} {route.path}"
+    return f"{scope['method']} {scope['path']}"
+
+
+def active_request(task) -> Optional[Tuple[Dict, Span]]:
+    """이벤트 루프 태스크가 처리 중인 요청 (scope, 루트 span)"""
+    return _active_requests.get(task)
+
+
+class TracingMiddleware:
+    """HTTP 요청마다 루트 span 을 열고 끝나면 느린 요청 로그와 내보내기 처리"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace()
+        root = Span(trace, route_name(scope), None, KIND_SERVER, {"http.method": scope["method"]})
+        token = _current_span.set(root)
+        task = asyncio.current_task()
+        _active_requests[task] = (scope, root)
+
+        async def _send(message):
+            if message["type"] == "http.response.start":
+                root.set("http.status_code", message["status"])
+                for name, value in message.get("headers", []):
+                    if name.lower() == b"content-type" and value.startswith(b"text/event-stream"):
+                        # 연결 시간만큼 길어지므로 느린 요청으로 보지 않음
+                        root.set("http.streaming", True)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        except BaseException as e:
+            root.error(e)
+            raise
+        finally:
+            _current_span.reset(token)
+            _active_requests.pop(task, None)
+            root.name = route_name(scope)
+            root.set("http.target", scope["path"])
+            if root.attributes.get("http.status_code", 200) >= 500:
+                root.status = STATUS_ERROR
+            _finish_trace(trace, root.finish())
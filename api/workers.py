@@ -0,0 +1,73 @@
+"""
+CPU 작업용 프로세스 풀
+
+백테스트/시뮬레이션처럼 CPU를 오래 쓰는 계산을 이벤트 루프 밖의 별도 프로세스에서 실행합니다.
+풀은 처음 사용할 때 만들어지고, 동기 엔드포인트와 비동기 작업(jobs.py)이 같은 풀을 함께 사용하므로
+동시에 계산되는 작업 수가 PROCESS_POOL_WORKERS 로 제한됩니다.
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import config
+import tracing
+from resilience import current_priority, priority
+
+logger = logging.getLogger("stock-api.workers")
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _context():
+    # 스레드가 있는 서버 프로세스를 fork 하면 잠금 상태가 복제될 수 있으므로 forkserver/spawn 사용
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+
+
+def pool_size() -> int:
+    return config.PROCESS_POOL_WORKERS or os.cpu_count() or 1
+
+
+def get_pool() -> ProcessPoolExecutor:
+    """공용 프로세스 풀 (처음 호출 시 생성)"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=pool_size(), mp_context=_context())
+            logger.info(f"프로세스 풀 시작: 워커 {pool_size()}개")
+        return _pool
+
+
+def _call(context, level: int, fn, *args):
+    """자식 프로세스에서 호출한 쪽의 업스트림 우선순위와 trace 를 이어 fn 실행"""
+    with priority(level):
+        return tracing.call_with_context(context, fn, *args)
+
+
+async def run(fn, *args):
+    """
+    프로세스 풀에서 함수를 실행하고 이벤트 루프를 막지 않고 결과를 기다림
+
+    요청 trace 안이면 자식 프로세스의 span 을 받아 현재 trace 에 합치고,
+    자식 프로세스의 업스트림 호출(시세 조회)도 호출한 쪽과 같은 우선순위로 토큰을 기다립니다.
+    """
+    context = tracing.remote_context()
+    with tracing.span("compute.pool", function=fn.__name__):
+        result, spans = await asyncio.wrap_future(
+            get_pool().submit(_call, context, current_priority(), fn, *args)
+        )
+        tracing.adopt(spans)
+    return result
+
+
+def shutdown() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+            _pool = None
@@ -26,6 +26,66 @@ async function fetchMarketSymbols(marketCode) {
     }
 }
 
+/**
+ * 특정 시장의 since 버전 이후 종목 변경분을 가져옵니다.
+ */
+async function fetchMarketChanges(marketCode, since) {
+    const response = await axios.get(`${FASTAPI_URL}/api/market-symbols/${marketCode}/changes`, {
+        params: { since },
+    });
+    return response.data;
+}
+
+/**
+ * 저장된 시장 데이터 파일을 읽습니다. (없거나 읽을 수 없으면 null)
+ */
+async function readMarketFile(filePath) {
+    try {
+        return JSON.parse(await fs.readFile(filePath, 'utf8'));
+    } catch (error) {
+        return null;
+    }
+}
+
+/**
+ * 저장된 종목 목록에 변경분(신규 상장, 상장 폐지, 종목명 변경)을 반영합니다.
+ */
+function applyMarketChanges(marketData, changes) {
+    const removed = new Set(changes.removed.map((item) => item.symbol));
+    const renamed = new Map(changes.renamed.map((item) => [item.symbol, item.name]));
+
+    const stocks = marketData.stocks
+        .filter((stock) => !removed.has(stock.symbol))
+        .map((stock) => (renamed.has(stock.symbol) ? { ...stock, name: renamed.get(stock.symbol) } : stock));
+    for (const item of changes.added) {
+        stocks.push({ symbol: item.symbol, name: item.name, market: marketData.market });
+    }
+
+    return { ...marketData, stocks, count: stocks.length, version: changes.version };
+}
+
+/**
+ * 시장 종목 목록을 최신 버전으로 맞춥니다.
+ * 저장된 버전이 있으면 변경분만 받아 반영하고, 바뀐 것이 없으면 null 을 반환합니다.
+ */
+async function syncMarketSymbols(marketCode, stored) {
+    if (stored && Number.isInteger(stored.version)) {
+        const changes = await fetchMarketChanges(marketCode, stored.version);
+        if (!changes.full_resync) {
+            const changed = changes.added.length + changes.removed.length + changes.renamed.length;
+            if (changed === 0 && changes.version === stored.version) {
+                return null;
+            }
+            console.log(
+                `${marketCode} 시장 변경분 반영: 상장 ${changes.added.length}, 폐지 ${changes.removed.length}, 이름 변경 ${changes.renamed.length}`
+            );
+            return applyMarketChanges(stored, changes);
+        }
+    }
+
+    return fetchMarketSymbols(marketCode);
+}
+
 /**
  * 데이터 디렉토리가 없으면 생성합니다.
  */
@@ -51,11 +111,15 @@ async function fetchAndStoreMarketData() {
         // 각 시장별 종목 정보 가져오기
         for (const marketCode of MARKET_CODES) {
             try {
-                // 시장 데이터 가져오기
-                const marketData = await fetchMarketSymbols(marketCode);
+                // 저장된 버전 이후 바뀐 종목만 반영 (바뀐 것이 없으면 파일을 다시 쓰지 않음)
+                const filePath = path.join(DATA_DIR, `${marketCode}.json`);
+                const marketData = await syncMarketSymbols(marketCode, await readMarketFile(filePath));
+                if (!marketData) {
+                    console.log(`${marketCode} 시장 종목 변경 없음`);
+                    continue;
+                }
 
                 // 개별 시장 데이터를 파일로 저장
-                const filePath = path.join(DATA_DIR, `${marketCode}.json`);
                 await fs.writeFile(
                     filePath,
                     JSON.stringify(marketData, null, 2),